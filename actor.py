@@ -124,6 +124,17 @@ class Actor:
         self._m_rotation = rotation
         self._m_recompute_world_transform = True
 
+    # Bulk loaders: whole transform plus its already computed world matrix
+    def set_transform(self, pos: Vector3D, rotation: Quaternion, scale: float,
+                      world: Matrix4) -> None:
+        self._m_position = pos
+        self._m_rotation = rotation
+        self._m_scale = scale
+        self._m_world_transform = world
+        self._m_recompute_world_transform = False
+        for comp in self._m_components:
+            comp.on_update_world_transform()
+
     def get_world_transform(self) -> Matrix4:
         return self._m_world_transform
 
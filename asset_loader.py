@@ -0,0 +1,244 @@
+from __future__ import annotations
+import sdl2
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from mesh import Mesh
+from texture import Texture
+from texture_bake import BakedTexture
+from startup_profiler import startup_profiler
+
+
+class AssetHandle:
+    """
+    This class is a mesh or texture that is still being loaded.
+
+    It resolves on the GL thread once the asset is uploaded; until then
+    get() returns None. A failed load resolves to None for good.
+    """
+
+    PENDING = 0
+    READY = 1
+    FAILED = 2
+
+    def __init__(self, file_name: str) -> None:
+        self._m_file_name: str = file_name
+        self._m_asset = None
+        self._m_state: int = AssetHandle.PENDING
+
+    # Result is set before the state, so readers never see READY with None
+    def resolve(self, asset) -> None:
+        self._m_asset = asset
+        self._m_state = AssetHandle.READY if asset is not None else AssetHandle.FAILED
+
+    def get(self):
+        return self._m_asset
+
+    def get_file_name(self) -> str:
+        return self._m_file_name
+
+    def is_ready(self) -> bool:
+        return self._m_state == AssetHandle.READY
+
+    def is_failed(self) -> bool:
+        return self._m_state == AssetHandle.FAILED
+
+    def is_done(self) -> bool:
+        return self._m_state != AssetHandle.PENDING
+
+
+class AssetLoader:
+    """
+    This class loads meshes and textures in the background.
+
+    File read, JSON parse, PNG decode and vertex array building run on a
+    thread pool. Finished work is queued, and process_uploads() (called
+    once per frame on the thread owning the GL context) creates the GL
+    objects until the frame's time or byte budget is spent. At least one
+    upload runs per frame, so a large asset still gets through.
+    """
+
+    # Returned by an upload that has to wait for another asset
+    _NOT_READY = object()
+
+    def __init__(self, renderer: Renderer, num_workers: int = 2,
+                 budget_ms: float = 2.0, budget_bytes: int = 8 * 1024 * 1024) -> None:
+        self._m_renderer: Renderer = renderer
+        self._m_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=num_workers, thread_name_prefix="AssetLoader")
+        self._m_budget_ms: float = budget_ms
+        self._m_budget_bytes: int = budget_bytes
+        # (handle, upload function, bytes) ready for the GL thread
+        self._m_uploads: queue.Queue = queue.Queue()
+        # File name -> handle, so each asset loads once
+        self._m_handles: dict = {}
+        self._m_lock: threading.Lock = threading.Lock()
+        self._m_num_pending: int = 0
+
+        # Stats of the last process_uploads()
+        self._m_num_uploaded: int = 0
+        self._m_bytes_uploaded: int = 0
+
+    # Stop workers (queued reads are dropped)
+    def shutdown(self) -> None:
+        self._m_pool.shutdown(wait=True, cancel_futures=True)
+        # Free decoded surfaces nobody will upload
+        while not self._m_uploads.empty():
+            handle, upload, _ = self._m_uploads.get_nowait()
+            surface = getattr(upload, "surface", None)
+            if surface:
+                sdl2.SDL_FreeSurface(surface)
+
+    # Forget finished handles (after the renderer unloaded its assets)
+    def clear(self) -> None:
+        with self._m_lock:
+            self._m_handles = {name: handle for name, handle in self._m_handles.items()
+                               if not handle.is_done()}
+
+    # Drop the handle of an evicted asset, so it loads again
+    def forget(self, file_name: str) -> None:
+        with self._m_lock:
+            handle: AssetHandle = self._m_handles.get(file_name)
+            if handle is not None and handle.is_done():
+                del self._m_handles[file_name]
+
+    def load_mesh(self, file_name: str) -> AssetHandle:
+        return self._submit(file_name, self._read_mesh)
+
+    def load_texture(self, file_name: str) -> AssetHandle:
+        return self._submit(file_name, self._read_texture)
+
+    # Upload finished assets within the frame's budget [GL thread]
+    def process_uploads(self) -> None:
+        start: float = time.perf_counter()
+        self._m_num_uploaded = 0
+        self._m_bytes_uploaded = 0
+        # Meshes waiting on their textures go back at the end
+        deferred: list = []
+        while True:
+            if self._m_num_uploaded > 0 and (
+                    self._m_bytes_uploaded >= self._m_budget_bytes or
+                    (time.perf_counter() - start) * 1000.0 >= self._m_budget_ms):
+                break
+            try:
+                handle, upload, num_bytes = self._m_uploads.get_nowait()
+            except queue.Empty:
+                break
+            upload_start: float = time.perf_counter()
+            asset = upload()
+            if asset is AssetLoader._NOT_READY:
+                deferred.append((handle, upload, num_bytes))
+                continue
+            if not startup_profiler.is_finished():
+                startup_profiler.record("upload " + handle.get_file_name(),
+                                        time.perf_counter() - upload_start)
+            handle.resolve(asset)
+            self._m_num_uploaded += 1
+            self._m_bytes_uploaded += num_bytes
+            with self._m_lock:
+                self._m_num_pending -= 1
+        for item in deferred:
+            self._m_uploads.put(item)
+
+    def set_budget(self, budget_ms: float, budget_bytes: int) -> None:
+        self._m_budget_ms = budget_ms
+        self._m_budget_bytes = budget_bytes
+
+    # Assets requested but not uploaded yet
+    def get_num_pending(self) -> int:
+        return self._m_num_pending
+
+    def get_num_uploaded(self) -> int:
+        return self._m_num_uploaded
+
+    def get_bytes_uploaded(self) -> int:
+        return self._m_bytes_uploaded
+
+    def _submit(self, file_name: str, read) -> AssetHandle:
+        with self._m_lock:
+            handle: AssetHandle = self._m_handles.get(file_name)
+            if handle is not None:
+                return handle
+            handle = AssetHandle(file_name)
+            self._m_handles[file_name] = handle
+            self._m_num_pending += 1
+        self._m_pool.submit(self._run, handle, read)
+        return handle
+
+    # Worker: read/decode, then queue the GL side
+    def _run(self, handle: AssetHandle, read) -> None:
+        start: float = time.perf_counter()
+        try:
+            upload, num_bytes = read(handle.get_file_name())
+        except Exception as error:
+            sdl2.SDL_Log("Asset load failed: {} ({})".format(
+                handle.get_file_name(), error).encode())
+            upload, num_bytes = (lambda: None), 0
+        if not startup_profiler.is_finished():
+            startup_profiler.record("read " + handle.get_file_name(),
+                                    time.perf_counter() - start)
+        self._m_uploads.put((handle, upload, num_bytes))
+
+    def _read_mesh(self, file_name: str) -> tuple:
+        data: dict = Mesh.read(file_name, in_memory=True)
+        if data == None:
+            return (lambda: None), 0
+        # Textures load alongside (shared with other meshes)
+        textures: list = [self._texture_handle(tex_name) for tex_name in data["textures"]]
+
+        def upload():
+            if not all(texture.is_done() for texture in textures):
+                return AssetLoader._NOT_READY
+            mesh: Mesh = Mesh()
+            # Looked up again: a texture may have been evicted since
+            mesh.create(data, [self._m_renderer.get_texture(
+                texture.get_file_name() if texture.get() else "assets/default.png")
+                for texture in textures])
+            self._m_renderer.add_mesh(file_name, mesh)
+            return mesh
+        return upload, Mesh.get_upload_size(data)
+
+    def _read_texture(self, file_name: str) -> tuple:
+        baked_name: str = BakedTexture.find(file_name)
+        if baked_name != None:
+            baked: BakedTexture = BakedTexture.open(baked_name)
+            if baked != None:
+                return self._read_baked_texture(file_name, baked)
+
+        surface: sdl2.SDL_Surface = Texture.decode(file_name)
+        if surface == None:
+            return (lambda: None), 0
+
+        def upload():
+            texture: Texture = Texture()
+            texture.load_from_surface(surface, self._m_renderer.get_upload_ring())
+            sdl2.SDL_FreeSurface(surface)
+            upload.surface = None
+            self._m_renderer.add_texture(file_name, texture)
+            return texture
+        upload.surface = surface
+        return upload, surface.contents.pitch * surface.contents.h
+
+    # Baked: levels are paged in here, uploaded without decode
+    def _read_baked_texture(self, file_name: str, baked: BakedTexture) -> tuple:
+        for level in range(baked.get_num_levels()):
+            # Touch every page off the GL thread
+            baked.get_level(level).sum(dtype="uint64")
+
+        def upload():
+            texture: Texture = Texture()
+            texture.load_baked(baked, self._m_renderer.get_upload_ring())
+            baked.close()
+            self._m_renderer.add_texture(file_name, texture)
+            return texture
+        return upload, baked.get_data_size()
+
+    # Textures the renderer already has resolve at once
+    def _texture_handle(self, file_name: str) -> AssetHandle:
+        texture: Texture = self._m_renderer.find_texture(file_name)
+        if texture is not None:
+            handle: AssetHandle = AssetHandle(file_name)
+            handle.resolve(texture)
+            return handle
+        return self.load_texture(file_name)
@@ -0,0 +1,186 @@
+from __future__ import annotations
+import argparse
+import ctypes
+import os
+import sys
+import time
+
+
+class QuadMesh:
+    """
+    This class stands in for Mesh in MeshComponent.draw_mesh: one quad.
+    """
+
+    def __init__(self, vertex_array: VertexArray) -> None:
+        self._m_vertex_array: VertexArray = vertex_array
+
+    def get_spec_power(self) -> float:
+        return 100.0
+
+    def is_texture_repeat(self) -> bool:
+        return False
+
+    def get_vertex_array(self, lod: int) -> VertexArray:
+        return self._m_vertex_array
+
+
+# Offscreen window and GL 3.3 core context (None on failure)
+def create_context() -> tuple:
+    import sdl2
+    if sdl2.SDL_Init(sdl2.SDL_INIT_VIDEO) != 0:
+        return None
+    sdl2.SDL_GL_SetAttribute(sdl2.SDL_GL_CONTEXT_PROFILE_MASK, sdl2.SDL_GL_CONTEXT_PROFILE_CORE)
+    sdl2.SDL_GL_SetAttribute(sdl2.SDL_GL_CONTEXT_MAJOR_VERSION, 3)
+    sdl2.SDL_GL_SetAttribute(sdl2.SDL_GL_CONTEXT_MINOR_VERSION, 3)
+    window = sdl2.SDL_CreateWindow(b"gl_calls", 0, 0, 64, 64, sdl2.SDL_WINDOW_OPENGL)
+    if not window:
+        return None
+    context = sdl2.SDL_GL_CreateContext(window)
+    if not context:
+        return None
+    return window, context
+
+
+# Nanoseconds per iteration of draw(i) (best of repeats)
+def time_draws(draw, count: int, repeats: int) -> float:
+    from gl_backend import GL
+    best: float = float("inf")
+    for _ in range(repeats):
+        GL.glFinish()
+        start: float = time.perf_counter()
+        for i in range(count):
+            draw(i)
+        best = min(best, time.perf_counter() - start)
+    GL.glFinish()
+    return best / count * 1e9
+
+
+# Per-call and per-draw cost of each path: {name: ns}
+def run(count: int, repeats: int) -> dict:
+    from gl_backend import GL
+    from gl_state import state_cache
+    from maths import Matrix4, Vector3D
+    from mesh_component import MeshComponent
+    from shader import Shader
+    from texture import Texture
+    from vertex_array import VertexArray
+
+    shader: Shader = Shader()
+    if not shader.load("shaders/phong.vert", "shaders/phong.frag"):
+        raise RuntimeError("failed to load shaders/phong")
+    vertices = (ctypes.c_float * 32)(-0.5, 0.5, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0,
+                                     0.5, 0.5, 0.0, 0.0, 0.0, 1.0, 1.0, 0.0,
+                                     0.5, -0.5, 0.0, 0.0, 0.0, 1.0, 1.0, 1.0,
+                                     -0.5, -0.5, 0.0, 0.0, 0.0, 1.0, 0.0, 1.0)
+    indices = (ctypes.c_uint * 6)(0, 1, 2, 2, 3, 0)
+    # Two of each, alternated, so every bind really changes state
+    arrays: list = [VertexArray(vertices, 4, indices, 6) for _ in range(2)]
+    textures: list = [Texture() for _ in range(2)]
+    for texture in textures:
+        texture.create_dynamic(4, 4)
+    meshes: list = [QuadMesh(vertex_array) for vertex_array in arrays]
+    GL.glViewport(0, 0, 1, 1)
+
+    program: int = int(shader._m_shader_program_id)
+    array_ids: list = [int(vertex_array._m_vertex_array_id.value) for vertex_array in arrays]
+    texture_ids: list = [int(texture._m_texture_id.value) for texture in textures]
+    world: Matrix4 = Matrix4.create_scale_matrix_uniform(0.5)
+    loc_world: int = shader.get_uniform_location("uWorldTransform")
+    loc_spec: int = shader.get_uniform_location("uSpecPower")
+    loc_ambient: int = shader.get_uniform_location("uAmbientLight")
+    ambient = (ctypes.c_float * 3)(0.2, 0.2, 0.2)
+
+    calls: dict = {
+        "glUseProgram": lambda i: GL.glUseProgram(program),
+        "glBindVertexArray": lambda i: GL.glBindVertexArray(array_ids[i & 1]),
+        "glBindTexture": lambda i: GL.glBindTexture(GL.GL_TEXTURE_2D, texture_ids[i & 1]),
+        "glUniformMatrix4fv": lambda i: GL.glUniformMatrix4fv(loc_world, 1, GL.GL_TRUE,
+                                                              world.m_mat),
+        "glUniform1f": lambda i: GL.glUniform1f(loc_spec, 100.0),
+        "glUniform3fv": lambda i: GL.glUniform3fv(loc_ambient, 1, ambient),
+        "glDrawElements": lambda i: GL.glDrawElements(GL.GL_TRIANGLES, 6,
+                                                      GL.GL_UNSIGNED_INT, None),
+    }
+
+    def raw_draw(i: int) -> None:
+        GL.glUseProgram(program)
+        GL.glBindVertexArray(array_ids[i & 1])
+        GL.glBindTexture(GL.GL_TEXTURE_2D, texture_ids[i & 1])
+        GL.glUniformMatrix4fv(loc_world, 1, GL.GL_TRUE, world.m_mat)
+        GL.glUniform1f(loc_spec, 100.0)
+        GL.glUniform3fv(loc_ambient, 1, ambient)
+        GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
+
+    # The engine path: Shader setters, state cache, draw_mesh
+    def mesh_draw(i: int) -> None:
+        MeshComponent.draw_mesh(shader, world, meshes[i & 1], textures[i & 1], 0)
+
+    shader.set_active()
+    results: dict = {}
+    for name, call in calls.items():
+        results[name] = time_draws(call, count, repeats)
+    results["per draw (raw calls)"] = time_draws(raw_draw, count, repeats)
+    state_cache.invalidate()
+    shader.set_active()
+    results["per draw (draw_mesh)"] = time_draws(mesh_draw, count, repeats)
+
+    for vertex_array in arrays:
+        vertex_array.delete()
+    for texture in textures:
+        texture.unload()
+    shader.unload()
+    return results
+
+
+# python -m benchmarks.gl_calls [--draws 20000] [--release]
+# [headless by default: offscreen SDL window, EGL context]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Per-draw GL submission cost: "
+                                     "PyOpenGL vs ctypes fast path")
+    parser.add_argument("--draws", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--release", action="store_true",
+                        help="PyOpenGL without error checking (release profile)")
+    parser.add_argument("--window", action="store_true", help="use the normal video driver")
+    args = parser.parse_args(argv[1:])
+    if not args.window:
+        os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+        os.environ.setdefault("PYOPENGL_PLATFORM", "egl")
+
+    # PyOpenGL flags must be set before OpenGL.GL is imported
+    from runtime_profile import RuntimeProfile
+    RuntimeProfile.apply("release" if args.release else "debug")
+    import sdl2
+    from gl_backend import GL
+    from gl_fast_path import GLFastPath
+
+    window_context: tuple = create_context()
+    if window_context is None:
+        print("No GL context: " + sdl2.SDL_GetError().decode())
+        return 1
+    window, context = window_context
+
+    pyopengl: dict = run(args.draws, args.repeats)
+    fast_path: GLFastPath = GLFastPath()
+    if not fast_path.load():
+        print("GL fast path unavailable")
+        return 1
+    fast_path.install(GL)
+    fast: dict = run(args.draws, args.repeats)
+    GL.set_backend(GL.get_backend())
+
+    print("{} (PyOpenGL {})".format(GL.glGetString(GL.GL_RENDERER).decode(),
+                                    "release" if args.release else "debug"))
+    print("{:<24}{:>12}{:>12}{:>10}".format("ns per call", "PyOpenGL", "fast path", "speedup"))
+    for name in pyopengl:
+        print("{:<24}{:>12.0f}{:>12.0f}{:>9.1f}x".format(
+            name, pyopengl[name], fast[name], pyopengl[name] / fast[name]))
+
+    sdl2.SDL_GL_DeleteContext(context)
+    sdl2.SDL_DestroyWindow(window)
+    sdl2.SDL_Quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,82 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from gl_backend import RecordingBackend, set_backend
+from json_parser import json_parser
+from mesh import Mesh
+from mesh_binary import BinaryMesh
+
+
+class NullRenderer:
+    """
+    This class stands in for Renderer when meshes only need textures looked up.
+    """
+
+    def get_texture(self, file_name: str) -> Texture:
+        return None
+
+
+# Synthetic .gpmesh data: random vertices, random triangles
+def make_mesh(num_vertices: int, seed: int = 1) -> dict:
+    rng = np.random.default_rng(seed)
+    vertices: np.ndarray = rng.uniform(-1.0, 1.0, (num_vertices, 8)).round(4)
+    indices: np.ndarray = rng.integers(0, num_vertices, (num_vertices * 2, 3))
+    return {"version": 1, "vertexformat": "PosNormTex", "shader": "BasicMesh",
+            "textures": ["assets/default.png"], "specularPower": 100.0,
+            "vertices": vertices.tolist(), "indices": indices.tolist()}
+
+
+# Seconds to load a mesh file (best of repeats)
+def time_load(file_name: str, repeats: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeats):
+        mesh = Mesh()
+        start: float = time.perf_counter()
+        if not mesh.load(file_name, NullRenderer()):
+            raise RuntimeError("failed to load " + file_name)
+        best = min(best, time.perf_counter() - start)
+        mesh.unload()
+    return best
+
+
+# python -m benchmarks.mesh_load [--vertices 1000000]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Mesh load time benchmark")
+    parser.add_argument("--vertices", type=int, default=1000000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv[1:])
+
+    # No GL context needed: uploads are only recorded
+    set_backend(RecordingBackend())
+    data: dict = make_mesh(args.vertices)
+    with tempfile.TemporaryDirectory() as folder:
+        json_name: str = os.path.join(folder, "bench.gpmesh")
+        binary_name: str = os.path.join(folder, "bench.gpmeshb")
+        with open(json_name, "w") as file_obj:
+            json.dump(data, file_obj)
+        with open(binary_name, "wb") as file_obj:
+            file_obj.write(BinaryMesh.from_gpmesh(data))
+        del data
+
+        print("{} vertices, {} triangles".format(args.vertices, args.vertices * 2))
+        print("{:<24}{:>10}".format("path", "ms"))
+        print("{:<24}{:>10.1f}".format(
+            "gpmesh (" + json_parser.get_name() + ")",
+            time_load(json_name, args.repeats) * 1000.0))
+        if json_parser.get_name() != "json":
+            json_parser.set_parse_func(json.loads, "json")
+            print("{:<24}{:>10.1f}".format(
+                "gpmesh (json)", time_load(json_name, args.repeats) * 1000.0))
+        print("{:<24}{:>10.1f}".format(
+            "gpmeshb (mmap)", time_load(binary_name, args.repeats) * 1000.0))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+from actor import Actor
+from json_parser import json_parser
+from maths import Vector3D, Quaternion
+from scene import Scene
+from world_streamer import spawn_actor
+
+
+class NullRenderer:
+    """
+    This class stands in for Renderer: components are only listed.
+    """
+
+    def __init__(self) -> None:
+        self._m_mesh_comps: list = []
+        self._m_point_lights: list = []
+        self._m_num_requests: int = 0
+
+    def add_mesh_comp(self, mesh: MeshComponent) -> None:
+        self._m_mesh_comps.append(mesh)
+
+    def add_point_light(self, light: PointLightActor) -> None:
+        self._m_point_lights.append(light)
+
+    def get_mesh_async(self, file_name: str) -> None:
+        self._m_num_requests += 1
+
+    def set_ambient_light(self, ambient: Vector3D) -> None:
+        pass
+
+    def get_directional_light(self) -> NullRenderer:
+        return self
+
+    def get_num_requests(self) -> int:
+        return self._m_num_requests
+
+
+class NullGame:
+    """
+    This class stands in for Game: it only keeps the actor list.
+    """
+
+    def __init__(self) -> None:
+        self._m_actors: list = []
+        self._m_renderer: NullRenderer = NullRenderer()
+
+    def add_actor(self, actor: Actor) -> None:
+        self._m_actors.append(actor)
+
+    def get_actors(self) -> list:
+        return self._m_actors
+
+    def get_renderer(self) -> NullRenderer:
+        return self._m_renderer
+
+
+# Synthetic .gpscene data: mesh actors on a grid, a few point lights
+def make_scene(num_actors: int, num_meshes: int = 8, seed: int = 1) -> dict:
+    rng = np.random.default_rng(seed)
+    positions: np.ndarray = rng.uniform(-50000.0, 50000.0, (num_actors, 3)).round(2)
+    rotations: np.ndarray = rng.normal(size=(num_actors, 4))
+    rotations /= np.linalg.norm(rotations, axis=1, keepdims=True)
+    meshes: np.ndarray = rng.integers(0, num_meshes, num_actors)
+    actors: list = []
+    for i in range(num_actors):
+        entry: dict = {"position": positions[i].tolist(),
+                       "rotation": rotations[i].round(6).tolist(),
+                       "scale": float(rng.uniform(1.0, 10.0))}
+        if i % 100 == 0:
+            entry.update({"type": "pointLight", "color": [1.0, 0.9, 0.8], "radius": 300.0})
+        else:
+            entry.update({"type": "mesh", "mesh": "assets/mesh{}.gpmesh".format(meshes[i])})
+        actors.append(entry)
+    return {"version": 1, "ambientLight": [0.2, 0.2, 0.2], "actors": actors}
+
+
+# Per-actor path: what hard-coded loading did (setters, one asset
+# request per actor, world transforms computed one by one)
+def load_per_actor(file_name: str, game: NullGame) -> None:
+    data: dict = json_parser.load(file_name)
+    for entry in data["actors"]:
+        spawn_actor(game, entry).compute_world_transform()
+
+
+# Bulk path: columns, unique assets once, world transforms from arrays
+def load_bulk(file_name: str, game: NullGame) -> None:
+    scene: Scene = Scene.load(file_name)
+    scene.instantiate(game)
+    scene.close()
+
+
+# Seconds to load a scene into a fresh game (best of repeats)
+def time_load(load, file_name: str, repeats: int) -> tuple:
+    best: float = float("inf")
+    requests: int = 0
+    for _ in range(repeats):
+        game: NullGame = NullGame()
+        start: float = time.perf_counter()
+        load(file_name, game)
+        best = min(best, time.perf_counter() - start)
+        requests = game.get_renderer().get_num_requests()
+    return best, requests
+
+
+# Largest difference between bulk and per-actor world transforms
+def max_transform_error(file_name: str, count: int) -> float:
+    data: dict = json_parser.load(file_name)
+    scene: Scene = Scene.from_json(data)
+    game: NullGame = NullGame()
+    bulk: list = scene.instantiate_batch(game, [None] * len(scene.get_assets()), 0, count)
+    error: float = 0.0
+    for actor, entry in zip(bulk, data["actors"]):
+        reference: Actor = Actor(game)
+        reference.set_position(Vector3D(*entry["position"]))
+        reference.set_scale(entry["scale"])
+        rotation: Quaternion = Quaternion()
+        rotation.x, rotation.y, rotation.z, rotation.w = entry["rotation"]
+        reference.set_rotation(rotation)
+        reference.compute_world_transform()
+        a: np.ndarray = np.frombuffer(bytes(actor.get_world_transform().m_mat), np.float32)
+        b: np.ndarray = np.frombuffer(bytes(reference.get_world_transform().m_mat), np.float32)
+        error = max(error, float(np.abs(a - b).max() / max(np.abs(b).max(), 1.0)))
+    return error
+
+
+# python -m benchmarks.scene_load [--actors 100000]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Scene load time: per actor vs bulk")
+    parser.add_argument("--actors", type=int, default=100000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv[1:])
+
+    data: dict = make_scene(args.actors)
+    with tempfile.TemporaryDirectory() as folder:
+        json_name: str = os.path.join(folder, "bench.gpscene")
+        binary_name: str = os.path.join(folder, "bench.gpsceneb")
+        with open(json_name, "w") as file_obj:
+            json.dump(data, file_obj)
+        with open(binary_name, "wb") as file_obj:
+            file_obj.write(Scene.from_json(data).compile())
+        del data
+
+        print("{} actors ({} lights)".format(args.actors, (args.actors + 99) // 100))
+        print("{:<28}{:>10}{:>12}".format("path", "ms", "requests"))
+        for name, load, file_name in (("per actor (gpscene)", load_per_actor, json_name),
+                                      ("bulk (gpscene)", load_bulk, json_name),
+                                      ("bulk (gpsceneb)", load_bulk, binary_name)):
+            seconds, requests = time_load(load, file_name, args.repeats)
+            print("{:<28}{:>10.1f}{:>12}".format(name, seconds * 1000.0, requests))
+        print("max world transform error   {:.2e}".format(max_transform_error(json_name, 1000)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
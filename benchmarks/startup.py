@@ -0,0 +1,100 @@
+from __future__ import annotations
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Marks the child's result line among SDL log output
+RESULT_PREFIX = "STARTUP_RESULT "
+
+
+# Child process: start the game like main.py and run frames until every
+# asset is in; prints the startup profile as one JSON line
+def run_child(release: bool, max_frames: int) -> int:
+    if release:
+        sys.argv.append("--release")
+    import main     # Profiled imports run here
+    from startup_profiler import startup_profiler
+
+    game = main.Game()
+    if not game.initialize():
+        game.shutdown()
+        return 1
+    frames: int = 0
+    while not startup_profiler.is_finished() and frames < max_frames:
+        game.run_frame()
+        frames += 1
+    result: dict = {"first_frame": startup_profiler.get_time_to_first_frame(),
+                    "assets_ready": startup_profiler.get_time_to_assets_ready(),
+                    "frames": frames, "steps": startup_profiler.get_totals()}
+    game.shutdown()
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+# Startup profile of one fresh process (None if it failed)
+def run_once(release: bool, max_frames: int, env: dict) -> dict:
+    command: list = [sys.executable, "-m", "benchmarks.startup", "--child",
+                     "--max-frames", str(max_frames)]
+    if release:
+        command.append("--release")
+    process = subprocess.run(command, env=env, capture_output=True, text=True)
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    sys.stderr.write(process.stderr[-2000:])
+    return None
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    return values[len(values) // 2] if values else 0.0
+
+
+# python -m benchmarks.startup [--runs 5]
+# [headless by default: offscreen SDL window, EGL context, no audio]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Time to first frame: debug vs release")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-frames", type=int, default=600)
+    parser.add_argument("--window", action="store_true", help="use the normal video driver")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--release", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv[1:])
+    if args.child:
+        return run_child(args.release, args.max_frames)
+
+    env: dict = dict(os.environ)
+    if not args.window:
+        env.setdefault("SDL_VIDEODRIVER", "offscreen")
+        env.setdefault("SDL_AUDIODRIVER", "dummy")
+        env.setdefault("PYOPENGL_PLATFORM", "egl")
+
+    results: dict = {}
+    for profile in ("debug", "release"):
+        runs: list = []
+        for _ in range(args.runs):
+            result: dict = run_once(profile == "release", args.max_frames, env)
+            if result is None:
+                print("{} startup failed".format(profile))
+                return 1
+            runs.append(result)
+        results[profile] = runs
+
+    steps: list = list(results["debug"][0]["steps"])
+    print("median of {} runs (ms)".format(args.runs))
+    print("{:<36}{:>10}{:>10}".format("step", "debug", "release"))
+    for step in steps:
+        print("{:<36}{:>10.1f}{:>10.1f}".format(
+            step[:35], *(median([run["steps"].get(step, 0.0) for run in results[profile]]) * 1000.0
+                         for profile in ("debug", "release"))))
+    for key, name in (("first_frame", "time to first frame"), ("assets_ready", "time to all assets")):
+        print("{:<36}{:>10.1f}{:>10.1f}".format(
+            name, *(median([run[key] or 0.0 for run in results[profile]]) * 1000.0
+                    for profile in ("debug", "release"))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,257 @@
+from __future__ import annotations
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+# Marks the child's result line among SDL log output
+RESULT_PREFIX = "STRESS_RESULT "
+SCENE_NAMES = ("static", "movers", "sprites", "churn", "hierarchy")
+# Metric -> +1 if higher is better, -1 if lower is better
+METRICS = {"frame_ms_p50": -1, "frame_ms_p95": -1, "frame_ms_p99": -1,
+           "update_ms_mean": -1, "actor_updates_per_sec": 1, "draw_calls": -1,
+           "alloc_kb_per_frame": -1, "retained_kb_per_frame": -1}
+
+
+# Nearest-rank percentile (p in [0, 100]) of sorted values
+def percentile(values: list, p: float) -> float:
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+# Child process: one scene in a fresh game; prints its metrics as one JSON line
+def run_child(args: argparse.Namespace) -> int:
+    # PyOpenGL flags must be set before OpenGL.GL is imported
+    from runtime_profile import RuntimeProfile
+    RuntimeProfile.apply("release" if args.release else "debug")
+    from gl_backend import GL, RecordingBackend, set_backend
+    from benchmarks.stress_scenes import StressGame
+
+    recorder: RecordingBackend = None
+    if not args.gl:
+        recorder = RecordingBackend()
+        set_backend(recorder)
+    game: StressGame = StressGame(args.scene, args.count, headless=not args.gl,
+                                  fast_gl=args.fast_gl)
+    if not game.initialize():
+        game.shutdown()
+        return 1
+    game.set_fixed_delta_time(1.0 / 60.0)
+    renderer: Renderer = game.get_renderer()
+
+    # Warm up: assets in, caches filled
+    for _ in range(args.warmup):
+        game.run_frame()
+    while renderer.get_asset_loader().get_num_pending() != 0:
+        game.run_frame()
+
+    # Timed frames
+    renderer.get_frame_stats().clear()
+    if recorder:
+        recorder.reset()
+    frame_times: list = []
+    num_actors: int = 0
+    num_draw_calls: int = 0
+    collections: int = sum(stats["collections"] for stats in gc.get_stats())
+    for _ in range(args.frames):
+        num_actors += len(game.get_actors())
+        start: float = time.perf_counter()
+        game.run_frame()
+        if args.gl:
+            GL.glFinish()
+        frame_times.append((time.perf_counter() - start) * 1000.0)
+        num_draw_calls += renderer.get_num_draw_calls()
+    collections = sum(stats["collections"] for stats in gc.get_stats()) - collections
+    update_ms: float = renderer.get_frame_stats().get_mean("update")
+    gl_calls: dict = recorder.get_call_counts() if recorder else {}
+
+    # Allocations, in frames of their own [tracing slows everything down]
+    tracemalloc.start()
+    allocated: int = 0
+    retained: int = tracemalloc.get_traced_memory()[0]
+    for _ in range(args.alloc_frames):
+        before: int = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        game.run_frame()
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    retained = tracemalloc.get_traced_memory()[0] - retained
+    tracemalloc.stop()
+
+    frame_times.sort()
+    result: dict = {
+        "actors": num_actors / args.frames,
+        "frame_ms_mean": sum(frame_times) / len(frame_times),
+        "frame_ms_p50": percentile(frame_times, 50.0),
+        "frame_ms_p95": percentile(frame_times, 95.0),
+        "frame_ms_p99": percentile(frame_times, 99.0),
+        "frame_ms_max": frame_times[-1],
+        "update_ms_mean": update_ms,
+        "actor_updates_per_sec": num_actors / args.frames / max(update_ms / 1000.0, 1e-9),
+        "draw_calls": num_draw_calls / args.frames,
+        "triangles": renderer.get_num_triangles(),
+        "alloc_kb_per_frame": allocated / max(args.alloc_frames, 1) / 1024.0,
+        "retained_kb_per_frame": retained / max(args.alloc_frames, 1) / 1024.0,
+        "gc_collections": collections}
+    if recorder:
+        result["gl_calls"] = sum(gl_calls.values()) / args.frames
+        result["gl_draw_calls"] = sum(count for name, count in gl_calls.items()
+                                      if name.startswith("glDraw")) / args.frames
+    else:
+        result["gl_renderer"] = GL.glGetString(GL.GL_RENDERER).decode()
+    game.shutdown()
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+# Metrics of one scene in a fresh process (None if it failed)
+def run_scene(scene: str, args: argparse.Namespace, env: dict) -> dict:
+    command: list = [sys.executable, "-m", "benchmarks.stress", "run", "--child",
+                     "--scene", scene, "--count", str(args.count),
+                     "--frames", str(args.frames), "--warmup", str(args.warmup),
+                     "--alloc-frames", str(args.alloc_frames)]
+    for flag in ("gl", "release", "fast_gl"):
+        if getattr(args, flag):
+            command.append("--" + flag.replace("_", "-"))
+    process = subprocess.run(command, env=env, capture_output=True, text=True)
+    for line in process.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    sys.stderr.write(process.stderr[-2000:])
+    return None
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.child:
+        return run_child(args)
+
+    env: dict = dict(os.environ)
+    env.setdefault("SDL_AUDIODRIVER", "dummy")
+    if not args.gl:
+        env.setdefault("SDL_VIDEODRIVER", "dummy")
+    elif not args.window:
+        env.setdefault("SDL_VIDEODRIVER", "offscreen")
+        env.setdefault("PYOPENGL_PLATFORM", "egl")
+
+    scenes: list = args.scenes.split(",") if args.scenes else list(SCENE_NAMES)
+    results: dict = {"version": 1, "mode": "gl" if args.gl else "headless",
+                     "count": args.count, "frames": args.frames,
+                     "profile": "release" if args.release else "debug",
+                     "fast_gl": args.fast_gl, "python": platform.python_version(),
+                     "machine": platform.machine(), "scenes": {}}
+    print("{:<12}{:>8}{:>9}{:>9}{:>9}{:>14}{:>8}{:>11}".format(
+        "scene", "actors", "p50 ms", "p95 ms", "p99 ms", "updates/s", "draws", "alloc KB"))
+    for scene in scenes:
+        metrics: dict = run_scene(scene, args, env)
+        if metrics is None:
+            print("{} failed".format(scene))
+            return 1
+        results["scenes"][scene] = metrics
+        print("{:<12}{:>8.0f}{:>9.2f}{:>9.2f}{:>9.2f}{:>14.0f}{:>8.0f}{:>11.1f}".format(
+            scene, metrics["actors"], metrics["frame_ms_p50"], metrics["frame_ms_p95"],
+            metrics["frame_ms_p99"], metrics["actor_updates_per_sec"],
+            metrics["draw_calls"], metrics["alloc_kb_per_frame"]))
+
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump(results, file, indent=1)
+    if args.baseline:
+        return compare_files(args.baseline, results, args.threshold)
+    return 0
+
+
+# Regressions of results against baseline, worse by more than threshold %:
+# [(scene, metric, baseline value, value, change %)]
+def find_regressions(baseline: dict, results: dict, threshold: float) -> list:
+    regressions: list = []
+    for scene, metrics in results["scenes"].items():
+        base: dict = baseline["scenes"].get(scene)
+        if base is None:
+            continue
+        for metric, direction in METRICS.items():
+            if metric not in base or metric not in metrics:
+                continue
+            old: float = base[metric]
+            new: float = metrics[metric]
+            if old == 0.0:
+                change: float = 0.0 if new == 0.0 else float("inf")
+            else:
+                change = (new - old) / abs(old) * 100.0
+            if -direction * change > threshold:
+                regressions.append((scene, metric, old, new, change))
+    return regressions
+
+
+# Print every regression; 1 if there are any
+def compare_files(baseline_name: str, results, threshold: float) -> int:
+    with open(baseline_name) as file:
+        baseline: dict = json.load(file)
+    if isinstance(results, str):
+        with open(results) as file:
+            results = json.load(file)
+    for key in ("mode", "count", "profile"):
+        if baseline.get(key) != results.get(key):
+            print("warning: {} differs ({} in baseline, {} now)".format(
+                key, baseline.get(key), results.get(key)))
+
+    regressions: list = find_regressions(baseline, results, threshold)
+    if not regressions:
+        print("no regressions beyond {:.0f}% against {}".format(threshold, baseline_name))
+        return 0
+    print("{} regression(s) beyond {:.0f}% against {}".format(
+        len(regressions), threshold, baseline_name))
+    for scene, metric, old, new, change in regressions:
+        print("  {:<12}{:<24}{:>12.3f} -> {:>12.3f}  ({:+.1f}%)".format(
+            scene, metric, old, new, change))
+    return 1
+
+
+# python -m benchmarks.stress run [--gl] [--count 1000] [--out results.json]
+#                                 [--baseline benchmarks/stress_baseline.json]
+# python -m benchmarks.stress compare baseline.json results.json [--threshold 10]
+# [headless by default: dummy SDL video, GL calls recorded, not executed]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Stress scenes: frame times, actor updates, "
+                                     "draw calls and allocations")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run scenes, optionally compare")
+    run_parser.add_argument("--scenes", help="comma separated, of: " + ",".join(SCENE_NAMES))
+    run_parser.add_argument("--count", type=int, default=1000, help="actors per scene")
+    run_parser.add_argument("--frames", type=int, default=300)
+    run_parser.add_argument("--warmup", type=int, default=30)
+    run_parser.add_argument("--alloc-frames", type=int, default=20)
+    run_parser.add_argument("--gl", action="store_true",
+                            help="render with a GL context (software on headless machines)")
+    run_parser.add_argument("--window", action="store_true",
+                            help="with --gl: use the normal video driver")
+    run_parser.add_argument("--release", action="store_true",
+                            help="PyOpenGL without error checking (release profile)")
+    run_parser.add_argument("--fast-gl", action="store_true", help="with --gl: GL fast path")
+    run_parser.add_argument("--out", help="write results as JSON")
+    run_parser.add_argument("--baseline", help="compare with this results file")
+    run_parser.add_argument("--threshold", type=float, default=10.0,
+                            help="regression threshold in percent")
+    run_parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    run_parser.add_argument("--scene", help=argparse.SUPPRESS)
+
+    compare_parser = commands.add_parser("compare", help="compare results with a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=10.0,
+                                help="regression threshold in percent")
+
+    args = parser.parse_args(argv[1:])
+    if args.command == "compare":
+        return compare_files(args.baseline, args.results, args.threshold)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,154 @@
+from __future__ import annotations
+import random
+
+from actor import Actor, State
+from camera_actor import CameraActor
+from component import Component
+from game import Game
+from maths import Vector3D, Quaternion
+from mesh_component import MeshComponent
+from move_component import MoveComponent
+from scene import Scene
+from sprite_component import SpriteComponent
+
+MESH_FILE = "assets/cube.gpmesh"
+SPRITE_FILE = "assets/default.png"
+
+
+class FollowComponent(Component):
+    """
+    This class keeps its owner at an offset from a parent actor.
+
+    Actors have no parent/child links; a chain of these makes a
+    hierarchy whose transforms depend on each other in update order.
+    """
+
+    def __init__(self, owner: Actor, parent: Actor, offset: Vector3D,
+                 twist: Quaternion) -> None:
+        super().__init__(owner, 20)
+        self._m_parent: Actor = parent
+        self._m_offset: Vector3D = offset
+        # Rotation relative to the parent
+        self._m_twist: Quaternion = twist
+
+    # Implements
+    def update(self, dt: float) -> None:
+        rotation: Quaternion = self._m_parent.get_rotation()
+        self._m_owner.set_position(self._m_parent.get_position() +
+                                   Vector3D.transform_q(self._m_offset, rotation))
+        self._m_owner.set_rotation(Quaternion.concatenate(self._m_twist, rotation))
+
+
+class ChurnActor(Actor):
+    """
+    This class kills its oldest actors and spawns as many each frame.
+    """
+
+    def __init__(self, game: Game, actors: list, per_frame: int,
+                 rng: random.Random) -> None:
+        super().__init__(game)
+        # Oldest first
+        self._m_actors: list = actors
+        self._m_per_frame: int = per_frame
+        self._m_rng: random.Random = rng
+
+    # Implements [spawns are pending until the update ends]
+    def update_actor(self, dt: float) -> None:
+        for actor in self._m_actors[:self._m_per_frame]:
+            actor.set_state(State.eDEAD)
+        del self._m_actors[:self._m_per_frame]
+        for _ in range(self._m_per_frame):
+            self._m_actors.append(spawn_mesh(self.get_game(), self._m_rng))
+
+
+class StressGame(Game):
+    """
+    This class is Game with a synthetic scene in place of the scene file.
+    """
+
+    def __init__(self, scene: str, count: int, seed: int = 1, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self._m_scene: str = scene
+        self._m_count: int = count
+        self._m_seed: int = seed
+
+    # Implements: lights from the scene file, actors from SCENES
+    def _load_data(self) -> None:
+        scene: Scene = Scene.load(Game.SCENE_FILE)
+        if scene:
+            scene.apply_lights(self._m_renderer)
+            scene.close()
+        SCENES[self._m_scene](self, self._m_count, random.Random(self._m_seed))
+        self._m_camera_actor = CameraActor(self)
+
+
+# Mesh actor somewhere in front of the camera (which looks down +x)
+def spawn_mesh(game: Game, rng: random.Random) -> Actor:
+    actor: Actor = Actor(game)
+    depth: float = rng.uniform(300.0, 3000.0)
+    actor.set_position(Vector3D(depth, rng.uniform(-0.6, 0.6) * depth,
+                                rng.uniform(-0.4, 0.4) * depth))
+    actor.set_rotation(random_rotation(rng))
+    actor.set_scale(rng.uniform(5.0, 20.0))
+    mesh_comp: MeshComponent = MeshComponent(actor)
+    mesh_comp.set_mesh_handle(game.get_renderer().get_mesh_async(MESH_FILE))
+    return actor
+
+
+def random_rotation(rng: random.Random) -> Quaternion:
+    axis: Vector3D = Vector3D(rng.uniform(-1.0, 1.0), rng.uniform(-1.0, 1.0), 1.0)
+    axis.normalize()
+    return Quaternion.create_quaternion(axis, rng.uniform(0.0, 6.28))
+
+
+# N meshes that never move
+def build_static(game: Game, count: int, rng: random.Random) -> None:
+    for _ in range(count):
+        spawn_mesh(game, rng)
+
+
+# N meshes moved and spun by a MoveComponent
+def build_movers(game: Game, count: int, rng: random.Random) -> None:
+    for _ in range(count):
+        actor: Actor = spawn_mesh(game, rng)
+        move: MoveComponent = MoveComponent(actor)
+        move.set_rotation_speed(rng.uniform(-3.0, 3.0))
+        # One push, then constant velocity
+        move.add_force(Vector3D(rng.uniform(-1.0, 1.0), rng.uniform(-1.0, 1.0),
+                                rng.uniform(-1.0, 1.0)) * 1000.0)
+
+
+# N screen-space sprites sharing one texture
+def build_sprites(game: Game, count: int, rng: random.Random) -> None:
+    texture: Texture = game.get_renderer().get_texture(SPRITE_FILE)
+    for i in range(count):
+        actor: Actor = Actor(game)
+        actor.set_position(Vector3D(rng.uniform(-500.0, 500.0),
+                                    rng.uniform(-370.0, 370.0), 0.0))
+        actor.set_scale(rng.uniform(0.1, 0.5))
+        sprite: SpriteComponent = SpriteComponent(actor, 100 + i % 8)
+        sprite.set_texture(texture)
+
+
+# N meshes, 2% of them killed and respawned every frame
+def build_churn(game: Game, count: int, rng: random.Random) -> None:
+    actors: list = [spawn_mesh(game, rng) for _ in range(count)]
+    ChurnActor(game, actors, max(1, count // 50), rng)
+
+
+# N meshes in chains of 16 under spinning roots
+def build_hierarchy(game: Game, count: int, rng: random.Random, depth: int = 16) -> None:
+    parent: Actor = None
+    for i in range(count):
+        actor: Actor = spawn_mesh(game, rng)
+        if i % depth == 0:
+            MoveComponent(actor).set_rotation_speed(rng.uniform(-2.0, 2.0))
+        else:
+            FollowComponent(actor, parent, Vector3D(0.0, 0.0, 30.0),
+                            Quaternion.create_quaternion(Vector3D(1.0, 0.0, 0.0), 0.2))
+        parent = actor
+
+
+# Scene name -> builder(game, count, rng)
+SCENES = {"static": build_static, "movers": build_movers, "sprites": build_sprites,
+          "churn": build_churn, "hierarchy": build_hierarchy}
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import argparse
+import ctypes
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import sdl2
+import sdl2.sdlimage as sdlimage
+
+from gl_backend import RecordingBackend, set_backend
+from texture import Texture
+from texture_bake import BakedTexture
+
+
+class CopyingBackend(RecordingBackend):
+    """
+    This class records GL calls and copies texture uploads like a driver would,
+    so lazily paged-in baked levels are really read.
+    """
+
+    def glTexImage2D(self, *args):
+        _, _, _, width, height, _, pixel_format, pixel_type, data = args
+        size: int = (width * height * RecordingBackend.FORMAT_SIZES[pixel_format] *
+                     RecordingBackend.TYPE_SIZES[pixel_type])
+        if isinstance(data, np.ndarray):
+            data.tobytes()
+        else:
+            ctypes.string_at(ctypes.cast(data, ctypes.c_void_p), size)
+        return self._record("glTexImage2D", args)
+
+
+# Synthetic RGBA image: smooth gradients plus noise (compresses like a photo)
+def make_image(file_name: str, size: int, seed: int = 1) -> None:
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    pixels: np.ndarray = np.stack([x * 255, y * 255, (x * y) * 255,
+                                   np.full_like(x, 255)], axis=2)
+    pixels += rng.normal(0.0, 12.0, pixels.shape)
+    pixels = np.ascontiguousarray(np.clip(pixels, 0, 255).astype(np.uint8))
+    surface = sdl2.SDL_CreateRGBSurfaceWithFormatFrom(
+        pixels.ctypes.data, size, size, 32, size * 4, sdl2.SDL_PIXELFORMAT_RGBA32)
+    sdlimage.IMG_SavePNG(surface, file_name.encode())
+    sdl2.SDL_FreeSurface(surface)
+
+
+# Seconds to load textures (best of repeats)
+def time_load(file_names: list, repeats: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeats):
+        start: float = time.perf_counter()
+        for file_name in file_names:
+            texture = Texture()
+            if not texture.load(file_name):
+                raise RuntimeError("failed to load " + file_name)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Model of texture memory read to draw a size x size texture at 1/scale:
+# unique 64-byte lines of a linear RGBA8 layout touched by bilinear taps
+# (level 0 only) or trilinear taps (the two levels around log2(scale))
+def sampled_lines(size: int, scale: int, mipmapped: bool) -> int:
+    screen: int = max(size // scale, 1)
+    centres: np.ndarray = (np.arange(screen) + 0.5) / screen
+    levels: list = [(0, 1.0)]
+    if mipmapped:
+        lod: float = np.log2(scale)
+        base: int = int(np.floor(lod))
+        levels = [(base, 1.0), (base + 1, lod - base)]
+    total: int = 0
+    for level, weight in levels:
+        level_size: int = max(size >> level, 1)
+        if weight <= 0.0 or level_size < 1:
+            continue
+        coords: np.ndarray = centres * level_size - 0.5
+        x0: np.ndarray = np.clip(np.floor(coords).astype(np.int64), 0, level_size - 1)
+        x1: np.ndarray = np.clip(x0 + 1, 0, level_size - 1)
+        xs: np.ndarray = np.unique(np.concatenate([x0, x1]))
+        columns: np.ndarray = np.unique(xs * 4 // 64)
+        # Every tapped row touches the same columns
+        total += len(xs) * len(columns)
+    return total
+
+
+# python -m benchmarks.texture_load [--size 2048] [--count 4]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="Texture load time: PNG vs baked")
+    parser.add_argument("--size", type=int, default=2048)
+    parser.add_argument("--count", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv[1:])
+
+    # No GL context needed: uploads are copied, not sent
+    set_backend(CopyingBackend())
+    with tempfile.TemporaryDirectory() as folder:
+        png_names: list = []
+        for i in range(args.count):
+            png_names.append(os.path.join(folder, "tex{}.png".format(i)))
+            make_image(png_names[-1], args.size, seed=i)
+        for asset in ("cube.png", "sphere.png", "default.png"):
+            if os.path.exists(os.path.join("assets", asset)):
+                png_names.append(os.path.join(folder, asset))
+                shutil.copy(os.path.join("assets", asset), png_names[-1])
+
+        png_time: float = time_load(png_names, args.repeats)
+        start: float = time.perf_counter()
+        for file_name in png_names:
+            with open(os.path.splitext(file_name)[0] + BakedTexture.EXTENSION, "wb") as file_obj:
+                file_obj.write(BakedTexture.bake(BakedTexture.decode(file_name)))
+        bake_time: float = time.perf_counter() - start
+        baked_time: float = time_load(png_names, args.repeats)
+
+    print("{} textures ({} of {}x{})".format(len(png_names), args.count, args.size, args.size))
+    print("{:<28}{:>10}".format("path", "ms"))
+    print("{:<28}{:>10.1f}".format("png (decode, level 0)", png_time * 1000.0))
+    print("{:<28}{:>10.1f}".format("gptex (mmap, all levels)", baked_time * 1000.0))
+    print("{:<28}{:>10.1f}".format("bake (offline, once)", bake_time * 1000.0))
+    print()
+    print("Texture lines read per frame, {0}x{0} texture (linear layout model)".format(args.size))
+    print("{:<8}{:>14}{:>14}".format("scale", "no mips", "trilinear"))
+    for scale in (1, 2, 4, 8, 16):
+        print("{:<8}{:>14}{:>14}".format(
+            "1/" + str(scale), sampled_lines(args.size, scale, False),
+            sampled_lines(args.size, scale, True)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,105 @@
+from __future__ import annotations
+import argparse
+import sys
+import time
+
+from actor import Actor
+from maths import Vector3D
+from resource_manager import ResourceManager
+from world_streamer import SyntheticChunkSource, WorldStreamer
+
+
+class NullRenderer:
+    """
+    This class stands in for Renderer: asset requests are only counted.
+    """
+
+    def __init__(self) -> None:
+        self._m_resources: ResourceManager = ResourceManager()
+        self._m_num_requests: int = 0
+
+    def get_mesh_async(self, file_name: str) -> None:
+        self._m_num_requests += 1
+
+    def get_texture_async(self, file_name: str) -> None:
+        self._m_num_requests += 1
+
+    def get_resource_manager(self) -> ResourceManager:
+        return self._m_resources
+
+
+class NullGame:
+    """
+    This class stands in for Game: it only keeps the actor list.
+    """
+
+    def __init__(self) -> None:
+        self._m_actors: list = []
+        self._m_renderer: NullRenderer = NullRenderer()
+
+    def add_actor(self, actor: Actor) -> None:
+        self._m_actors.append(actor)
+
+    def remove_actor(self, actor: Actor) -> None:
+        self._m_actors.remove(actor)
+
+    def get_actors(self) -> list:
+        return self._m_actors
+
+    def get_renderer(self) -> NullRenderer:
+        return self._m_renderer
+
+
+# Actor without components (no renderer needed)
+def spawn_plain(game: NullGame, data: dict) -> Actor:
+    actor: Actor = Actor(game)
+    actor.set_position(Vector3D(*data["position"]))
+    return actor
+
+
+# python -m benchmarks.world_streaming [--frames 300] [--speed 50]
+def main(argv: list) -> int:
+    parser = argparse.ArgumentParser(description="World streaming: camera fly-through")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--speed", type=float, default=50.0, help="units per frame")
+    parser.add_argument("--radius", type=float, default=3000.0)
+    parser.add_argument("--actors", type=int, default=64, help="actors per chunk")
+    parser.add_argument("--read-ms", type=float, default=5.0, help="simulated read time")
+    parser.add_argument("--frame-ms", type=float, default=16.0, help="simulated frame time")
+    args = parser.parse_args(argv[1:])
+
+    game: NullGame = NullGame()
+    source: SyntheticChunkSource = SyntheticChunkSource(
+        actors_per_chunk=args.actors, read_delay=args.read_ms / 1000.0)
+    streamer: WorldStreamer = WorldStreamer(game, source, args.radius, spawn=spawn_plain)
+    frame_times: list = []
+    max_resident: int = 0
+    max_work: int = 0
+    for frame in range(args.frames):
+        camera_pos: Vector3D = Vector3D(frame * args.speed, frame * args.speed * 0.5, 0.0)
+        start: float = time.perf_counter()
+        streamer.update(camera_pos)
+        frame_times.append((time.perf_counter() - start) * 1000.0)
+        max_resident = max(max_resident, streamer.get_num_resident())
+        max_work = max(max_work, streamer.get_num_spawned() + streamer.get_num_deleted())
+        # Rest of the frame: the worker reads meanwhile
+        time.sleep(max(args.frame_ms / 1000.0 - (time.perf_counter() - start), 0.0))
+        if frame % 50 == 0:
+            print("frame {:>5}  chunk {}  resident {:>3}  loading {:>3}  actors {:>6}".format(
+                frame, streamer.get_chunk_coord(camera_pos), streamer.get_num_resident(),
+                streamer.get_num_loading(), len(game.get_actors())))
+    streamer.shutdown()
+
+    frame_times.sort()
+    print()
+    print("max resident chunks      {:>8}".format(max_resident))
+    print("max actors in one frame  {:>8}".format(max_work))
+    print("update ms (median)       {:>8.3f}".format(frame_times[len(frame_times) // 2]))
+    print("update ms (99%)          {:>8.3f}".format(frame_times[int(len(frame_times) * 0.99)]))
+    print("update ms (max)          {:>8.3f}".format(frame_times[-1]))
+    print("actors left after shutdown {:>6}".format(len(game.get_actors())))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
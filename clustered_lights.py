@@ -0,0 +1,193 @@
+from __future__ import annotations
+from gl_backend import GL
+import numpy as np
+import math
+import ctypes
+from maths import Matrix4
+from gl_state import state_cache
+
+
+class LightClusterer:
+    """
+    This class bins point/spot lights into view-space froxels on the CPU.
+
+    The view frustum is split into X x Y screen tiles and Z exponential
+    depth slices. Every light's bounding sphere is turned into a conservative
+    range of clusters, and all (cluster, light) pairs are built and sorted
+    with vectorized NumPy. The result is one (offset, count) pair per cluster
+    into a flat light index list.
+    """
+
+    # Floats per light: pos.xyz, radius, color.rgb, cos outer, dir.xyz, cos inner
+    LIGHT_SIZE = 12
+
+    def __init__(self, dims: tuple = (16, 9, 24), near: float = 25.0, far: float = 10000.0) -> None:
+        self._m_dims: tuple = dims
+        self._m_near: float = near
+        self._m_far: float = far
+
+        # Results of the last update
+        self._m_light_data: np.ndarray = np.zeros(
+            (0, LightClusterer.LIGHT_SIZE), dtype=np.float32)
+        self._m_grid: np.ndarray = np.zeros(
+            (dims[0] * dims[1] * dims[2], 2), dtype=np.uint32)
+        self._m_indices: np.ndarray = np.zeros(0, dtype=np.uint32)
+
+    # Pack light actors into rows of LIGHT_SIZE floats
+    @staticmethod
+    def pack_lights(lights: list) -> np.ndarray:
+        return np.array([light.get_light_data() for light in lights],
+                        dtype=np.float32).reshape(-1, LightClusterer.LIGHT_SIZE)
+
+    # Bin packed lights for the given camera
+    def update(self, light_data: np.ndarray, view: Matrix4, projection: Matrix4) -> None:
+        dim_x, dim_y, dim_z = self._m_dims
+        self._m_light_data = light_data
+
+        # View-space position (row vectors: v * view)
+        view_arr: np.ndarray = np.frombuffer(
+            bytes(view.m_mat), dtype=np.float32).reshape(4, 4)
+        pos: np.ndarray = light_data[:, 0:3] @ view_arr[0:3, 0:3] + view_arr[3, 0:3]
+        radius: np.ndarray = light_data[:, 3]
+        x_scale: float = projection.m_mat[0][0]
+        y_scale: float = projection.m_mat[1][1]
+
+        # Depth range, lights fully outside [near, far] touch nothing
+        z_min: np.ndarray = pos[:, 2] - radius
+        z_max: np.ndarray = pos[:, 2] + radius
+        live: np.ndarray = (z_max >= self._m_near) & (z_min <= self._m_far)
+        z0: np.ndarray = self._slice(np.clip(z_min, self._m_near, self._m_far))
+        z1: np.ndarray = self._slice(np.clip(z_max, self._m_near, self._m_far))
+
+        # Screen extent of the sphere's box; touching the near plane covers all
+        x0, x1 = LightClusterer._ndc_range(pos[:, 0], radius, z_min, z_max, x_scale)
+        y0, y1 = LightClusterer._ndc_range(pos[:, 1], radius, z_min, z_max, y_scale)
+        live &= (x1 >= -1.0) & (x0 <= 1.0) & (y1 >= -1.0) & (y0 <= 1.0)
+        tx0: np.ndarray = LightClusterer._tile(x0, dim_x)
+        tx1: np.ndarray = LightClusterer._tile(x1, dim_x)
+        ty0: np.ndarray = LightClusterer._tile(y0, dim_y)
+        ty1: np.ndarray = LightClusterer._tile(y1, dim_y)
+
+        # Expand each light's cluster box into (cluster, light) pairs
+        lights: np.ndarray = np.flatnonzero(live)
+        span_x: np.ndarray = (tx1 - tx0 + 1)[lights]
+        span_y: np.ndarray = (ty1 - ty0 + 1)[lights]
+        span_z: np.ndarray = (z1 - z0 + 1)[lights]
+        counts: np.ndarray = span_x * span_y * span_z
+        pair_light: np.ndarray = np.repeat(lights, counts)
+        offsets: np.ndarray = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts)
+        sx: np.ndarray = np.repeat(span_x, counts)
+        sy: np.ndarray = np.repeat(span_y, counts)
+        cx: np.ndarray = tx0[pair_light] + offsets % sx
+        cy: np.ndarray = ty0[pair_light] + (offsets // sx) % sy
+        cz: np.ndarray = z0[pair_light] + offsets // (sx * sy)
+        clusters: np.ndarray = (cz * dim_y + cy) * dim_x + cx
+
+        # Sort pairs by cluster -> flat light index list
+        order: np.ndarray = np.argsort(clusters, kind="stable")
+        self._m_indices = pair_light[order].astype(np.uint32)
+        cluster_counts: np.ndarray = np.bincount(
+            clusters, minlength=dim_x * dim_y * dim_z)
+        self._m_grid = np.empty((len(cluster_counts), 2), dtype=np.uint32)
+        self._m_grid[:, 0] = np.cumsum(cluster_counts) - cluster_counts
+        self._m_grid[:, 1] = cluster_counts
+
+    # Exponential depth slice of view depth
+    def _slice(self, depth: np.ndarray) -> np.ndarray:
+        scale: float = self._m_dims[2] / math.log(self._m_far / self._m_near)
+        slices: np.ndarray = np.floor(np.log(depth / self._m_near) * scale)
+        return np.clip(slices, 0, self._m_dims[2] - 1).astype(np.int64)
+
+    # Conservative NDC range of [c - r, c + r] over depths [z_min, z_max]
+    @staticmethod
+    def _ndc_range(center: np.ndarray, radius: np.ndarray, z_min: np.ndarray,
+                   z_max: np.ndarray, scale: float) -> tuple:
+        near_z: np.ndarray = np.maximum(z_min, 1e-6)
+        low: np.ndarray = np.minimum((center - radius) / near_z,
+                                     (center - radius) / z_max) * scale
+        high: np.ndarray = np.maximum((center + radius) / near_z,
+                                      (center + radius) / z_max) * scale
+        behind: np.ndarray = z_min <= 0.0
+        return np.where(behind, -1.0, low), np.where(behind, 1.0, high)
+
+    @staticmethod
+    def _tile(ndc: np.ndarray, dim: int) -> np.ndarray:
+        return np.clip(np.floor((ndc + 1.0) * 0.5 * dim), 0, dim - 1).astype(np.int64)
+
+    def get_dims(self) -> tuple:
+        return self._m_dims
+
+    def get_near(self) -> float:
+        return self._m_near
+
+    def get_far(self) -> float:
+        return self._m_far
+
+    def get_light_data(self) -> np.ndarray:
+        return self._m_light_data
+
+    # (offset, count) into light indices per cluster
+    def get_grid(self) -> np.ndarray:
+        return self._m_grid
+
+    def get_light_indices(self) -> np.ndarray:
+        return self._m_indices
+
+
+class ClusteredLightBuffers:
+    """
+    This class uploads clustered light data as three texture buffers.
+
+    Light data (RGBA32F, 3 texels per light), cluster grid (RG32UI) and
+    light indices (R32UI) are bound to texture units 1-3 for phong.frag.
+    """
+
+    # Texture units used by the mesh shader
+    LIGHT_DATA_UNIT = 1
+    CLUSTER_GRID_UNIT = 2
+    LIGHT_INDICES_UNIT = 3
+
+    def __init__(self) -> None:
+        formats: list = [GL.GL_RGBA32F, GL.GL_RG32UI, GL.GL_R32UI]
+        self._m_buffer_ids: list = []
+        self._m_texture_ids: list = []
+        for internal_format in formats:
+            buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+            texture_id: ctypes.c_uint = ctypes.c_uint(0)
+            GL.glGenBuffers(1, ctypes.byref(buffer_id))
+            GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, buffer_id)
+            # Empty buffers are not allowed, start with one texel
+            GL.glBufferData(GL.GL_TEXTURE_BUFFER, 16, None, GL.GL_STREAM_DRAW)
+            GL.glGenTextures(1, ctypes.byref(texture_id))
+            state_cache.bind_texture(GL.GL_TEXTURE_BUFFER, texture_id)
+            GL.glTexBuffer(GL.GL_TEXTURE_BUFFER, internal_format, buffer_id)
+            self._m_buffer_ids.append(buffer_id)
+            self._m_texture_ids.append(texture_id)
+
+    def delete(self) -> None:
+        for buffer_id, texture_id in zip(self._m_buffer_ids, self._m_texture_ids):
+            state_cache.forget_texture(texture_id)
+            GL.glDeleteTextures(1, ctypes.byref(texture_id))
+            GL.glDeleteBuffers(1, ctypes.byref(buffer_id))
+
+    # Upload a clusterer's results (orphaning last frame's storage)
+    def upload(self, light_data: np.ndarray, grid: np.ndarray, indices: np.ndarray) -> None:
+        arrays: list = [light_data, grid, indices]
+        for buffer_id, array in zip(self._m_buffer_ids, arrays):
+            data: np.ndarray = np.ascontiguousarray(array)
+            GL.glBindBuffer(GL.GL_TEXTURE_BUFFER, buffer_id)
+            GL.glBufferData(GL.GL_TEXTURE_BUFFER, max(data.nbytes, 16), None,
+                            GL.GL_STREAM_DRAW)
+            if data.nbytes > 0:
+                GL.glBufferSubData(GL.GL_TEXTURE_BUFFER, 0, data.nbytes, data)
+
+    # Bind buffer textures to their units (leaves unit 0 active)
+    def set_active(self) -> None:
+        units: list = [ClusteredLightBuffers.LIGHT_DATA_UNIT,
+                       ClusteredLightBuffers.CLUSTER_GRID_UNIT,
+                       ClusteredLightBuffers.LIGHT_INDICES_UNIT]
+        for unit, texture_id in zip(units, self._m_texture_ids):
+            state_cache.active_texture(GL.GL_TEXTURE0 + unit)
+            state_cache.bind_texture(GL.GL_TEXTURE_BUFFER, texture_id)
+        state_cache.active_texture(GL.GL_TEXTURE0)
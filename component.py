@@ -30,3 +30,6 @@ class Component:
 
     def get_update_order(self) -> int:
         return self._m_update_order
+
+    def get_owner(self) -> Actor:
+        return self._m_owner
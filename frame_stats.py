@@ -0,0 +1,63 @@
+from __future__ import annotations
+from collections import deque
+import math
+
+
+class FrameStats:
+    """
+    This class keeps recent per-frame timing samples (in ms) by name.
+
+    Samples may be added from the update and render threads; each name
+    keeps the last max_frames values.
+    """
+
+    def __init__(self, max_frames: int = 600) -> None:
+        self._m_max_frames: int = max_frames
+        # Name -> deque of samples
+        self._m_samples: dict = {}
+
+    def add_sample(self, name: str, value: float) -> None:
+        samples: deque = self._m_samples.get(name)
+        if samples is None:
+            samples = self._m_samples.setdefault(
+                name, deque(maxlen=self._m_max_frames))
+        samples.append(value)
+
+    def clear(self) -> None:
+        self._m_samples.clear()
+
+    def get_names(self) -> list:
+        return sorted(self._m_samples)
+
+    def get_samples(self, name: str) -> list:
+        return list(self._m_samples.get(name, ()))
+
+    def get_mean(self, name: str) -> float:
+        samples: list = self.get_samples(name)
+        if not samples:
+            return 0.0
+        return sum(samples) / len(samples)
+
+    # Nearest-rank percentile (p in [0, 100])
+    def get_percentile(self, name: str, p: float) -> float:
+        samples: list = sorted(self.get_samples(name))
+        if not samples:
+            return 0.0
+        rank: int = max(0, math.ceil(p / 100.0 * len(samples)) - 1)
+        return samples[rank]
+
+    # Name -> {"mean", "p50", "p95", "max"}
+    def get_summary(self) -> dict:
+        return {name: {"mean": self.get_mean(name),
+                       "p50": self.get_percentile(name, 50.0),
+                       "p95": self.get_percentile(name, 95.0),
+                       "max": self.get_percentile(name, 100.0)}
+                for name in self.get_names()}
+
+    # One line per name, for logging
+    def format_summary(self) -> str:
+        lines: list = []
+        for name, stats in self.get_summary().items():
+            lines.append("{:<16} mean {:8.3f}  p50 {:8.3f}  p95 {:8.3f}  max {:8.3f} ms".format(
+                name, stats["mean"], stats["p50"], stats["p95"], stats["max"]))
+        return "\n".join(lines)
@@ -3,16 +3,21 @@ from __future__ import annotations
 import sdl2dll      # SDL DLLs
 import sdl2         # SDL
 import ctypes
+import time
 
-from maths import Vector3D, Quaternion, PI_OVER_TWO, PI
 from renderer import Renderer
-from mesh_component import MeshComponent
 from actor import State, Actor
 from camera_actor import CameraActor
+from scene import Scene
+from startup_profiler import startup_profiler
 
 
 class Game:
-    def __init__(self):
+    # Level loaded by _load_data() [.gpsceneb: compiled with scene.py]
+    SCENE_FILE = "assets/scene.gpscene"
+
+    def __init__(self, threaded_rendering: bool = False, profile_startup: bool = False,
+                 fast_gl: bool = False, headless: bool = False):
         # All actors
         self._m_actors = []
         self._m_pending_actors = []
@@ -22,13 +27,26 @@ class Game:
         self._m_updating_actors: bool = False
         self._m_running: bool = True
         self._m_time_then: ctypes.c_uint32 = ctypes.c_uint32()
+        # Submit GL on a render thread while the next frame updates
+        self._m_threaded_rendering: bool = threaded_rendering
+        # Log the startup breakdown once the first scene is fully loaded
+        self._m_profile_startup: bool = profile_startup
+        # Hot per-draw GL calls skip PyOpenGL (see GLFastPath)
+        self._m_fast_gl: bool = fast_gl
+        # Render without a window into a RecordingBackend (see Renderer.set_headless)
+        self._m_headless: bool = headless
+        # Seconds each update steps, without frame limiting (None: real time)
+        self._m_fixed_delta_time: float = None
 
         # Game-specific code
         self._m_camera_actor: CameraActor = None
+        # Loads world chunks around the camera (None: no streamed world)
+        self._m_world_streamer: WorldStreamer = None
 
     def initialize(self) -> bool:
         # Initialize SDL library
-        result = sdl2.SDL_Init(sdl2.SDL_INIT_VIDEO | sdl2.SDL_INIT_AUDIO)
+        with startup_profiler.section("SDL_Init"):
+            result = sdl2.SDL_Init(sdl2.SDL_INIT_VIDEO | sdl2.SDL_INIT_AUDIO)
         if result != 0:
             sdl2.SDL_Log(b"SDL initialization failed: ",
                          sdl2.SDL_GetError())
@@ -36,13 +54,18 @@ class Game:
 
         # Create renderer
         self._m_renderer = Renderer(self)
-        if not self._m_renderer.initialize(1024.0, 768.0):
+        self._m_renderer.set_fast_gl(self._m_fast_gl)
+        self._m_renderer.set_headless(self._m_headless)
+        with startup_profiler.section("renderer"):
+            initialized: bool = self._m_renderer.initialize(1024.0, 768.0)
+        if not initialized:
             sdl2.SDL_Log(b"Failed to initialize renderer")
             self._m_renderer.delete()
             self._m_renderer = None
             return False
 
-        self._load_data()
+        with startup_profiler.section("load data"):
+            self._load_data()
 
         # Initial time
         self._m_time_then = sdl2.SDL_GetTicks()
@@ -50,15 +73,28 @@ class Game:
         return True
 
     def run_loop(self) -> None:
+        if self._m_threaded_rendering:
+            self._m_renderer.start_render_thread()
         while self._m_running:
-            self._process_input()
-            self._process_update()
-            self._process_output()
+            self.run_frame()
+        self._m_renderer.stop_render_thread()
+
+    # One pass of the game loop
+    def run_frame(self) -> None:
+        self._process_input()
+        self._process_update()
+        self._process_output()
+        if not startup_profiler.is_finished():
+            self._track_startup()
 
     def shutdown(self) -> None:
         # Shutdown in reverse
         self._unload_data()
         if self._m_renderer:
+            # Same numbers in serial and threaded mode, for comparison
+            sdl2.SDL_Log("Frame timings ({}):\n{}".format(
+                "threaded" if self._m_threaded_rendering else "serial",
+                self._m_renderer.get_frame_stats().format_summary()).encode())
             self._m_renderer.shutdown()
         sdl2.SDL_Quit()
 
@@ -81,21 +117,24 @@ class Game:
             actor.input(keyb_state)
 
     def _process_update(self) -> None:
-        # Wait 16ms (frame limiting)
-        sdl2.SDL_Delay(16)
-
-        time_now: ctypes.c_uint32 = sdl2.SDL_GetTicks()
-        delta_time: float = (time_now - self._m_time_then) / 1000.0
-        # Clamp max delta time (for debugging)
-        if delta_time > 0.05:
-            delta_time = 0.05
-        # Time now is time then
-        self._m_time_then: ctypes.c_uint32 = sdl2.SDL_GetTicks()
+        if self._m_fixed_delta_time is not None:
+            delta_time: float = self._m_fixed_delta_time
+        else:
+            delta_time = self._wait_frame()
 
         # Update actors
+        start: float = time.perf_counter()
         self._m_updating_actors = True
         for actor in self._m_actors:
             actor.update(delta_time)
+
+        # Stream world chunks around the camera [still updating, so spawns
+        # go to pending and get their world transform below]
+        if self._m_world_streamer and self._m_camera_actor:
+            stream_start: float = time.perf_counter()
+            self._m_world_streamer.update(self._m_camera_actor.get_position())
+            self._m_renderer.get_frame_stats().add_sample(
+                "streaming", (time.perf_counter() - stream_start) * 1000.0)
         self._m_updating_actors = False
 
         # Add pending actors
@@ -114,41 +153,63 @@ class Game:
         for da in dead_actors:
             da.delete()
 
+        self._m_renderer.get_frame_stats().add_sample(
+            "update", (time.perf_counter() - start) * 1000.0)
+
     def _process_output(self) -> None:
-        self._m_renderer.draw()
+        start: float = time.perf_counter()
+        snapshot: RenderSnapshot = self._m_renderer.build_snapshot()
+        stats: FrameStats = self._m_renderer.get_frame_stats()
+        stats.add_sample("snapshot", (time.perf_counter() - start) * 1000.0)
+
+        if self._m_renderer.is_render_threaded():
+            # Previous frame may still be drawing: wait for the free slot
+            waited: float = self._m_renderer.submit_snapshot(snapshot)
+            stats.add_sample("submit_wait", waited * 1000.0)
+        else:
+            self._m_renderer.draw_snapshot(snapshot)
+
+    # Frame limiting: seconds since the last update
+    def _wait_frame(self) -> float:
+        # Wait 16ms (frame limiting)
+        sdl2.SDL_Delay(16)
+
+        time_now: ctypes.c_uint32 = sdl2.SDL_GetTicks()
+        delta_time: float = (time_now - self._m_time_then) / 1000.0
+        # Clamp max delta time (for debugging)
+        if delta_time > 0.05:
+            delta_time = 0.05
+        # Time now is time then
+        self._m_time_then: ctypes.c_uint32 = sdl2.SDL_GetTicks()
+        return delta_time
+
+    # Startup milestones: first frame, then first frame with every asset in
+    def _track_startup(self) -> None:
+        startup_profiler.mark_first_frame()
+        if self._m_renderer.get_asset_loader().get_num_pending() != 0:
+            return
+        startup_profiler.mark_assets_ready()
+        sdl2.SDL_Log("First frame after {:.1f} ms, all assets after {:.1f} ms".format(
+            startup_profiler.get_time_to_first_frame() * 1000.0,
+            startup_profiler.get_time_to_assets_ready() * 1000.0).encode())
+        if self._m_profile_startup:
+            sdl2.SDL_Log("Startup profile:\n{}".format(
+                startup_profiler.format_summary()).encode())
 
     def _load_data(self) -> None:
-        # Create cube actor
-        a = Actor(self)
-        a.set_position(Vector3D(200.0, 75.0, 0.0))
-        a.set_scale(100.0)
-        q = Quaternion.create_quaternion(Vector3D(0.0, 1.0, 0.0), -PI_OVER_TWO)
-        q = Quaternion.concatenate(q, Quaternion.create_quaternion(
-            Vector3D(0.0, 0.0, 1.0), PI + PI / 4.0))
-        a.set_rotation(q)
-
-        mc = MeshComponent(a)
-        mc.set_mesh(self._m_renderer.get_mesh("assets/cube.gpmesh"))
-
-        # Create sphere actor
-        a = Actor(self)
-        a.set_position(Vector3D(200.0, -75.0, 0.0))
-        a.set_scale(3.0)
-
-        mc = MeshComponent(a)
-        mc.set_mesh(self._m_renderer.get_mesh("assets/sphere.gpmesh"))
-
-        # Create lights
-        self._m_renderer.set_ambient_light(Vector3D(0.2, 0.2, 0.2))
-        dir_light = self._m_renderer.get_directional_light()
-        dir_light._m_direction = Vector3D(0.0, -0.707, -0.707)
-        dir_light._m_diffuse_color = Vector3D(0.78, 0.88, 1.0)
-        dir_light._m_spec_color = Vector3D(0.8, 0.8, 0.8)
+        # Actors and lights come from the scene file
+        scene: Scene = Scene.load(Game.SCENE_FILE)
+        if scene:
+            scene.instantiate(self)
+            scene.close()
 
         # Create camera
         self._m_camera_actor = CameraActor(self)
 
     def _unload_data(self) -> None:
+        if self._m_world_streamer:
+            self._m_world_streamer.shutdown()
+            self._m_world_streamer = None
         while len(self._m_actors) != 0:
             actor = self._m_actors.pop()
             actor.delete()
@@ -170,5 +231,22 @@ class Game:
         if actor in self._m_actors:
             self._m_actors.remove(actor)
 
+    # Stream a chunked world around the camera [replaces any previous one]
+    def set_world_streamer(self, streamer: WorldStreamer) -> None:
+        if self._m_world_streamer:
+            self._m_world_streamer.shutdown()
+        self._m_world_streamer = streamer
+
+    def get_world_streamer(self) -> WorldStreamer:
+        return self._m_world_streamer
+
+    # Same step every frame, as fast as frames run (benchmarks, replays)
+    # [None: real time with frame limiting]
+    def set_fixed_delta_time(self, delta_time: float) -> None:
+        self._m_fixed_delta_time = delta_time
+
+    def get_actors(self) -> list:
+        return self._m_actors
+
     def get_renderer(self) -> Renderer:
         return self._m_renderer
@@ -0,0 +1,341 @@
+from __future__ import annotations
+from gl_backend import GL
+import bisect
+import ctypes
+import numpy as np
+from gl_state import state_cache
+from vertex_format import VertexFormat
+
+
+class FreeListAllocator:
+    """
+    This class hands out ranges of a buffer of fixed capacity.
+
+    Free ranges are kept sorted by offset; allocation is first fit and
+    a freed range merges with free neighbours. Units are whatever the
+    caller counts in (vertices, bytes).
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self._m_capacity: int = capacity
+        # Sorted free (offset, size)
+        self._m_free: list = [(0, capacity)] if capacity > 0 else []
+        # Offset -> size of live ranges
+        self._m_used: dict = {}
+
+    # Returns the offset, or None when no free range is large enough
+    def allocate(self, size: int) -> int:
+        for i, (offset, free_size) in enumerate(self._m_free):
+            if free_size < size:
+                continue
+            if free_size == size:
+                del self._m_free[i]
+            else:
+                self._m_free[i] = (offset + size, free_size - size)
+            self._m_used[offset] = size
+            return offset
+        return None
+
+    def free(self, offset: int) -> None:
+        size: int = self._m_used.pop(offset)
+        i: int = bisect.bisect_left(self._m_free, (offset, 0))
+        # Merge with the next, then the previous free range
+        if i < len(self._m_free) and self._m_free[i][0] == offset + size:
+            size += self._m_free.pop(i)[1]
+        if i > 0 and sum(self._m_free[i - 1]) == offset:
+            offset, size = self._m_free[i - 1][0], self._m_free[i - 1][1] + size
+            i -= 1
+            del self._m_free[i]
+        self._m_free.insert(i, (offset, size))
+
+    def get_capacity(self) -> int:
+        return self._m_capacity
+
+    def get_num_free(self) -> int:
+        return sum(size for _, size in self._m_free)
+
+    def get_num_used(self) -> int:
+        return self._m_capacity - self.get_num_free()
+
+    # 0 when free space is one range, towards 1 as it splinters
+    def get_fragmentation(self) -> float:
+        num_free: int = self.get_num_free()
+        if num_free == 0:
+            return 0.0
+        return 1.0 - max(size for _, size in self._m_free) / num_free
+
+    # Live (offset, size) sorted by offset
+    def get_used(self) -> list:
+        return sorted(self._m_used.items())
+
+
+class GeometryRange:
+    """
+    This class is one mesh's vertices and indices inside a GeometryPool.
+
+    It stands in for VertexArray: set_active() binds the pool's shared
+    vertex array object, and draws pass get_index_offset() and
+    get_base_vertex() to glDrawElementsBaseVertex. Offsets change when
+    the pool defragments, so they are read at draw time.
+    """
+
+    def __init__(self, pool: GeometryPool, num_verts: int, num_indices: int,
+                 index_type: GL.GLenum) -> None:
+        self._m_pool: GeometryPool = pool
+        self._m_num_verts: int = num_verts
+        self._m_num_indices: int = num_indices
+        self._m_index_type: GL.GLenum = index_type
+        # Set by the pool: first vertex, index offset in bytes
+        self._m_base_vertex: int = 0
+        self._m_index_offset: int = 0
+
+    # Give the range back to the pool
+    def delete(self) -> None:
+        if self._m_pool is not None:
+            self._m_pool.free(self)
+            self._m_pool = None
+
+    def set_active(self) -> None:
+        self._m_pool.set_active()
+
+    def get_num_indices(self) -> int:
+        return self._m_num_indices
+
+    def get_num_vertices(self) -> int:
+        return self._m_num_verts
+
+    def get_index_type(self) -> GL.GLenum:
+        return self._m_index_type
+
+    # Bytes per index
+    def get_index_size(self) -> int:
+        return 2 if self._m_index_type == GL.GL_UNSIGNED_SHORT else 4
+
+    # Byte offset of the first index in the pool's index buffer
+    def get_index_offset(self) -> int:
+        return self._m_index_offset
+
+    # Added to every index by glDrawElementsBaseVertex
+    def get_base_vertex(self) -> int:
+        return self._m_base_vertex
+
+    def get_vertex_format(self) -> VertexFormat:
+        return self._m_pool.get_vertex_format()
+
+    # DrawElementsIndirectCommand: (count, instance count, first index,
+    # base vertex, base instance) [for glMultiDrawElementsIndirect]
+    def get_draw_command(self) -> tuple:
+        return (self._m_num_indices, 1, self._m_index_offset // self.get_index_size(),
+                self._m_base_vertex, 0)
+
+    def set_offsets(self, base_vertex: int, index_offset: int) -> None:
+        self._m_base_vertex = base_vertex
+        self._m_index_offset = index_offset
+
+
+class GeometryPool:
+    """
+    This class suballocates meshes of one vertex format from one VBO/IBO pair.
+
+    Every mesh in the pool shares a single vertex array object, so a
+    sorted mesh pass binds it once. Vertex space is allocated in
+    vertices (for the base vertex) and index space in 4-byte units, so
+    16- and 32-bit index ranges can share the index buffer. When a free
+    leaves the pool too fragmented, or an allocation does not fit, the
+    live ranges are packed into new buffers with glCopyBufferSubData
+    (growing them if needed).
+    """
+
+    # Repack after a free once this much of the free space is splintered
+    DEFRAG_THRESHOLD = 0.5
+    INDEX_UNIT = 4
+
+    def __init__(self, vertex_format: VertexFormat, vertex_capacity: int = 65536,
+                 index_capacity: int = 1024 * 1024) -> None:
+        self._m_vertex_format: VertexFormat = vertex_format
+        # Capacities: vertices, bytes of indices
+        self._m_vertices: FreeListAllocator = FreeListAllocator(vertex_capacity)
+        self._m_indices: FreeListAllocator = FreeListAllocator(
+            index_capacity // GeometryPool.INDEX_UNIT)
+        # Vertex offset -> range
+        self._m_ranges: dict = {}
+        self._m_num_defrags: int = 0
+
+        self._m_vertex_array_id: ctypes.c_uint = ctypes.c_uint(0)
+        self._m_vertex_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        self._m_index_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        GL.glGenVertexArrays(1, ctypes.byref(self._m_vertex_array_id))
+        self._m_vertex_buffer_id, self._m_index_buffer_id = self._create_buffers(
+            vertex_capacity, index_capacity)
+
+    def delete(self) -> None:
+        GL.glDeleteBuffers(1, ctypes.byref(self._m_vertex_buffer_id))
+        GL.glDeleteBuffers(1, ctypes.byref(self._m_index_buffer_id))
+        state_cache.forget_vertex_array(self._m_vertex_array_id)
+        GL.glDeleteVertexArrays(1, ctypes.byref(self._m_vertex_array_id))
+        for geometry_range in self._m_ranges.values():
+            geometry_range._m_pool = None
+        self._m_ranges.clear()
+
+    # Copy a mesh in [vertices: structured array of this pool's format]
+    def allocate(self, vertices: np.ndarray, indices: np.ndarray) -> GeometryRange:
+        indices = np.ascontiguousarray(indices).reshape(-1)
+        index_type: GL.GLenum = GL.GL_UNSIGNED_INT
+        if indices.dtype == np.uint16:
+            index_type = GL.GL_UNSIGNED_SHORT
+        else:
+            indices = indices.astype(np.uint32, copy=False)
+        index_units: int = GeometryPool._to_index_units(indices.nbytes)
+
+        base_vertex: int = self._m_vertices.allocate(len(vertices))
+        index_unit: int = self._m_indices.allocate(index_units)
+        if base_vertex is None or index_unit is None:
+            if base_vertex is not None:
+                self._m_vertices.free(base_vertex)
+            if index_unit is not None:
+                self._m_indices.free(index_unit)
+            # Pack, growing to fit with room to spare
+            self._repack(max(self._m_vertices.get_capacity(),
+                             (self._m_vertices.get_num_used() + len(vertices)) * 2),
+                         max(self._m_indices.get_capacity(),
+                             (self._m_indices.get_num_used() + index_units) * 2))
+            base_vertex = self._m_vertices.allocate(len(vertices))
+            index_unit = self._m_indices.allocate(index_units)
+
+        geometry_range: GeometryRange = GeometryRange(
+            self, len(vertices), indices.size, index_type)
+        geometry_range.set_offsets(base_vertex, index_unit * GeometryPool.INDEX_UNIT)
+        self._m_ranges[base_vertex] = geometry_range
+
+        stride: int = self._m_vertex_format.get_stride()
+        GL.glBindBuffer(GL.GL_COPY_WRITE_BUFFER, self._m_vertex_buffer_id)
+        GL.glBufferSubData(GL.GL_COPY_WRITE_BUFFER, base_vertex * stride,
+                           vertices.nbytes, vertices)
+        GL.glBindBuffer(GL.GL_COPY_WRITE_BUFFER, self._m_index_buffer_id)
+        GL.glBufferSubData(GL.GL_COPY_WRITE_BUFFER, geometry_range.get_index_offset(),
+                           indices.nbytes, indices)
+        return geometry_range
+
+    # Called by GeometryRange.delete()
+    def free(self, geometry_range: GeometryRange) -> None:
+        del self._m_ranges[geometry_range.get_base_vertex()]
+        self._m_vertices.free(geometry_range.get_base_vertex())
+        self._m_indices.free(geometry_range.get_index_offset() // GeometryPool.INDEX_UNIT)
+        if (self._m_ranges and
+                max(self._m_vertices.get_fragmentation(),
+                    self._m_indices.get_fragmentation()) > GeometryPool.DEFRAG_THRESHOLD):
+            self._repack(self._m_vertices.get_capacity(), self._m_indices.get_capacity())
+
+    def set_active(self) -> None:
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
+
+    def get_vertex_format(self) -> VertexFormat:
+        return self._m_vertex_format
+
+    def get_num_ranges(self) -> int:
+        return len(self._m_ranges)
+
+    def get_num_defrags(self) -> int:
+        return self._m_num_defrags
+
+    # (vertices used, vertex capacity, index bytes used, index capacity)
+    def get_usage(self) -> tuple:
+        return (self._m_vertices.get_num_used(), self._m_vertices.get_capacity(),
+                self._m_indices.get_num_used() * GeometryPool.INDEX_UNIT,
+                self._m_indices.get_capacity() * GeometryPool.INDEX_UNIT)
+
+    # New buffers bound to the pool's vertex array object
+    def _create_buffers(self, vertex_capacity: int, index_capacity: int) -> tuple:
+        vertex_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        index_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
+        GL.glGenBuffers(1, ctypes.byref(vertex_buffer_id))
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, vertex_buffer_id)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER,
+                        vertex_capacity * self._m_vertex_format.get_stride(),
+                        None, GL.GL_STATIC_DRAW)
+        self._m_vertex_format.set_attributes()
+        GL.glGenBuffers(1, ctypes.byref(index_buffer_id))
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, index_buffer_id)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, index_capacity, None, GL.GL_STATIC_DRAW)
+        return vertex_buffer_id, index_buffer_id
+
+    # Copy live ranges to the front of new buffers (GPU side only)
+    def _repack(self, vertex_capacity: int, index_units: int) -> None:
+        stride: int = self._m_vertex_format.get_stride()
+        old_vertex_buffer_id: ctypes.c_uint = self._m_vertex_buffer_id
+        old_index_buffer_id: ctypes.c_uint = self._m_index_buffer_id
+        self._m_vertex_buffer_id, self._m_index_buffer_id = self._create_buffers(
+            vertex_capacity, index_units * GeometryPool.INDEX_UNIT)
+        self._m_vertices = FreeListAllocator(vertex_capacity)
+        self._m_indices = FreeListAllocator(index_units)
+
+        ranges: list = [self._m_ranges[offset] for offset in sorted(self._m_ranges)]
+        self._m_ranges = {}
+        for geometry_range in ranges:
+            num_verts: int = geometry_range.get_num_vertices()
+            index_units_used: int = GeometryPool._to_index_units(
+                geometry_range.get_num_indices() * geometry_range.get_index_size())
+            base_vertex: int = self._m_vertices.allocate(num_verts)
+            index_unit: int = self._m_indices.allocate(index_units_used)
+            self._copy(old_vertex_buffer_id, self._m_vertex_buffer_id,
+                       geometry_range.get_base_vertex() * stride, base_vertex * stride,
+                       num_verts * stride)
+            self._copy(old_index_buffer_id, self._m_index_buffer_id,
+                       geometry_range.get_index_offset(),
+                       index_unit * GeometryPool.INDEX_UNIT,
+                       index_units_used * GeometryPool.INDEX_UNIT)
+            geometry_range.set_offsets(base_vertex, index_unit * GeometryPool.INDEX_UNIT)
+            self._m_ranges[base_vertex] = geometry_range
+
+        GL.glDeleteBuffers(1, ctypes.byref(old_vertex_buffer_id))
+        GL.glDeleteBuffers(1, ctypes.byref(old_index_buffer_id))
+        self._m_num_defrags += 1
+
+    # Bytes -> 4-byte units, rounded up
+    @staticmethod
+    def _to_index_units(num_bytes: int) -> int:
+        return -(-num_bytes // GeometryPool.INDEX_UNIT)
+
+    @staticmethod
+    def _copy(source_id: ctypes.c_uint, dest_id: ctypes.c_uint,
+              source_offset: int, dest_offset: int, size: int) -> None:
+        if size == 0:
+            return
+        GL.glBindBuffer(GL.GL_COPY_READ_BUFFER, source_id)
+        GL.glBindBuffer(GL.GL_COPY_WRITE_BUFFER, dest_id)
+        GL.glCopyBufferSubData(GL.GL_COPY_READ_BUFFER, GL.GL_COPY_WRITE_BUFFER,
+                               source_offset, dest_offset, size)
+
+
+class GeometryPools:
+    """
+    This class keeps one GeometryPool per vertex format.
+
+    Pools are created on first use, on the thread owning the GL context.
+    """
+
+    def __init__(self) -> None:
+        # Vertex format name -> pool
+        self._m_pools: dict = {}
+
+    def allocate(self, vertices: np.ndarray, indices: np.ndarray,
+                 vertex_format: VertexFormat) -> GeometryRange:
+        pool: GeometryPool = self._m_pools.get(vertex_format.get_name())
+        if pool is None:
+            pool = GeometryPool(vertex_format)
+            self._m_pools[vertex_format.get_name()] = pool
+        return pool.allocate(vertices, indices)
+
+    # Delete all pools [with the GL context]
+    def delete(self) -> None:
+        for pool in self._m_pools.values():
+            pool.delete()
+        self._m_pools.clear()
+
+    def get_pools(self) -> list:
+        return list(self._m_pools.values())
+
+
+# Shared by all static meshes
+geometry_pools: GeometryPools = GeometryPools()
@@ -0,0 +1,195 @@
+from __future__ import annotations
+import OpenGL.GL as _pyopengl
+import ctypes
+import numpy as np
+
+
+class GLProxy:
+    """
+    This class is the 'GL' every render module calls through.
+
+    It forwards gl* functions and GL_* constants to the current backend:
+    PyOpenGL for real rendering, or a RecordingBackend to run the render
+    path without a context. Looked-up attributes are cached on the proxy,
+    so after the first call this costs the same as calling PyOpenGL.
+    """
+
+    def __init__(self, backend) -> None:
+        self.__dict__["_m_backend"] = backend
+
+    def __getattr__(self, name: str):
+        value = getattr(self._m_backend, name)
+        self.__dict__[name] = value
+        return value
+
+    def set_backend(self, backend) -> None:
+        self.__dict__.clear()
+        self.__dict__["_m_backend"] = backend
+
+    # Call another function for one name [dropped by set_backend()]
+    def override(self, name: str, function) -> None:
+        self.__dict__[name] = function
+
+    def get_backend(self):
+        return self._m_backend
+
+
+class RecordingBackend:
+    """
+    This class stands in for PyOpenGL without a GL context.
+
+    Every gl* call is counted by name and (optionally) logged with its
+    arguments, and bytes passed to buffer/texture uploads are summed.
+    Object creation hands out fresh ids and status queries report success,
+    so shaders 'link' and buffers 'upload'. GL_* constants still come from
+    PyOpenGL, which needs no context for them.
+    """
+
+    # Argument holding the upload size in bytes, by call name
+    UPLOAD_SIZE_ARG = {"glBufferData": 1, "glBufferSubData": 2, "glProgramBinary": 3,
+                       "glCompressedTexImage2D": 6, "glCompressedTexSubImage2D": 7}
+    # Image uploads: (width, height, format, type, data) argument positions
+    IMAGE_ARGS = {"glTexImage2D": (3, 4, 6, 7, 8), "glTexSubImage2D": (4, 5, 6, 7, 8)}
+    # Bytes per pixel component / components per pixel
+    TYPE_SIZES = {_pyopengl.GL_UNSIGNED_BYTE: 1, _pyopengl.GL_UNSIGNED_SHORT: 2,
+                  _pyopengl.GL_HALF_FLOAT: 2, _pyopengl.GL_FLOAT: 4}
+    FORMAT_SIZES = {_pyopengl.GL_RED: 1, _pyopengl.GL_RG: 2, _pyopengl.GL_RGB: 3,
+                    _pyopengl.GL_BGR: 3, _pyopengl.GL_RGBA: 4, _pyopengl.GL_BGRA: 4}
+
+    def __init__(self, record_args: bool = False) -> None:
+        # Keep (name, args) of every call [memory grows with every call]
+        self._m_record_args: bool = record_args
+        self._m_calls: list = []
+        # Call name -> count
+        self._m_counts: dict = {}
+        self._m_num_bytes_uploaded: int = 0
+        self._m_next_id: int = 1
+        # Mapping size -> host memory handed out by glMapBufferRange
+        self._m_mappings: dict = {}
+
+    def __getattr__(self, name: str):
+        if not name.startswith("gl"):
+            # Constants, types and exceptions
+            value = getattr(_pyopengl, name)
+            setattr(self, name, value)
+            return value
+
+        def call(*args):
+            return self._record(name, args)
+        setattr(self, name, call)
+        return call
+
+    # Forget all recorded calls (e.g. at the start of a frame)
+    def reset(self) -> None:
+        self._m_calls.clear()
+        self._m_counts.clear()
+        self._m_num_bytes_uploaded = 0
+
+    def get_calls(self) -> list:
+        return self._m_calls
+
+    # Call name -> count
+    def get_call_counts(self) -> dict:
+        return dict(self._m_counts)
+
+    def get_num_calls(self, name: str = None) -> int:
+        if name is None:
+            return sum(self._m_counts.values())
+        return self._m_counts.get(name, 0)
+
+    def get_num_draw_calls(self) -> int:
+        return sum(count for name, count in self._m_counts.items()
+                   if name.startswith("glDraw"))
+
+    def get_num_bytes_uploaded(self) -> int:
+        return self._m_num_bytes_uploaded
+
+    def _record(self, name: str, args: tuple):
+        self._m_counts[name] = self._m_counts.get(name, 0) + 1
+        if self._m_record_args:
+            self._m_calls.append((name, args))
+
+        if name in RecordingBackend.UPLOAD_SIZE_ARG:
+            self._m_num_bytes_uploaded += int(args[RecordingBackend.UPLOAD_SIZE_ARG[name]])
+        elif name in RecordingBackend.IMAGE_ARGS:
+            width, height, fmt, data_type, data = RecordingBackend.IMAGE_ARGS[name]
+            if args[data] is not None:
+                self._m_num_bytes_uploaded += (
+                    int(args[width]) * int(args[height]) *
+                    RecordingBackend.FORMAT_SIZES.get(args[fmt], 4) *
+                    RecordingBackend.TYPE_SIZES.get(args[data_type], 1))
+        return self._result(name, args)
+
+    # Plausible return value (or out-parameter) of a call
+    def _result(self, name: str, args: tuple):
+        if name.startswith("glGen"):
+            # glGenX(n, ids) fills ids, glGenX(n) returns them
+            ids: list = [self._new_id() for _ in range(int(args[0]))]
+            if len(args) > 1:
+                RecordingBackend._write(args[1], ids)
+                return None
+            return ids[0] if len(ids) == 1 else ids
+        if name in ("glCreateProgram", "glCreateShader"):
+            return self._new_id()
+        if name in ("glGetShaderiv", "glGetProgramiv"):
+            if args[1] in (_pyopengl.GL_COMPILE_STATUS, _pyopengl.GL_LINK_STATUS):
+                return _pyopengl.GL_TRUE
+            return 0
+        if name in ("glGetQueryObjectiv", "glGetQueryObjectuiv"):
+            # Results are always available, elapsed time is 0
+            RecordingBackend._write(args[2], [1])
+            return None
+        if name in ("glGetQueryObjecti64v", "glGetQueryObjectui64v"):
+            RecordingBackend._write(args[2], [0])
+            return None
+        if name in ("glGetShaderInfoLog", "glGetProgramInfoLog"):
+            return b""
+        if name == "glGetString":
+            return b"recording"
+        if name in ("glGetIntegerv", "glGetUniformLocation", "glGetAttribLocation"):
+            return 0
+        if name in ("glIsEnabled", "glGetBooleanv"):
+            return False
+        if name == "glFenceSync":
+            return self._new_id()
+        if name == "glClientWaitSync":
+            return _pyopengl.GL_ALREADY_SIGNALED
+        if name == "glMapBufferRange":
+            # Host memory stands in for the mapping (reused per size)
+            size: int = int(args[2])
+            if size not in self._m_mappings:
+                self._m_mappings[size] = (ctypes.c_ubyte * size)()
+            return ctypes.addressof(self._m_mappings[size])
+        if name == "glUnmapBuffer":
+            return _pyopengl.GL_TRUE
+        return None
+
+    def _new_id(self) -> int:
+        new_id: int = self._m_next_id
+        self._m_next_id += 1
+        return new_id
+
+    # Store values through a ctypes byref()/pointer/array out-parameter
+    @staticmethod
+    def _write(out, values: list) -> None:
+        target = getattr(out, "_obj", out)
+        if isinstance(target, ctypes._SimpleCData):
+            target.value = values[0]
+        elif isinstance(target, np.ndarray):
+            target.flat[:len(values)] = values
+        else:
+            for i, value in enumerate(values):
+                target[i] = value
+
+
+# Every render module does 'from gl_backend import GL'
+GL: GLProxy = GLProxy(_pyopengl)
+
+
+# Swap the backend (e.g. RecordingBackend() on machines without a GPU)
+def set_backend(backend) -> None:
+    GL.set_backend(backend)
+
+
+def get_backend():
+    return GL.get_backend()
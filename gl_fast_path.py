@@ -0,0 +1,79 @@
+from __future__ import annotations
+import ctypes
+import sys
+import sdl2
+
+# Windows GL entry points use the system calling convention
+_FUNCTYPE = ctypes.WINFUNCTYPE if sys.platform == "win32" else ctypes.CFUNCTYPE
+
+GLenum = ctypes.c_uint
+GLuint = ctypes.c_uint
+GLint = ctypes.c_int
+GLsizei = ctypes.c_int
+GLfloat = ctypes.c_float
+GLboolean = ctypes.c_ubyte
+
+
+class GLFastPath:
+    """
+    This class calls the hot per-draw GL functions through raw pointers.
+
+    PyOpenGL wraps every entry point in Python code that converts
+    arguments and, with error checking on, calls glGetError after each
+    call. For the few calls made per draw, that costs several times what
+    the driver does. load() asks SDL_GL_GetProcAddress for each of them
+    and builds plain ctypes function pointers with fixed argument types;
+    install() puts them on the GL proxy in place of PyOpenGL's wrappers,
+    so call sites do not change.
+
+    Fast calls are never error checked. Pointer arguments must already
+    be ctypes arrays, pointers, addresses or None (no tuples or lists).
+    """
+
+    # Name -> (result type, argument types)
+    SIGNATURES = {
+        "glUseProgram": (None, (GLuint,)),
+        "glBindVertexArray": (None, (GLuint,)),
+        "glBindTexture": (None, (GLenum, GLuint)),
+        "glUniform1i": (None, (GLint, GLint)),
+        "glUniform1f": (None, (GLint, GLfloat)),
+        "glUniform3fv": (None, (GLint, GLsizei, ctypes.c_void_p)),
+        "glUniform4fv": (None, (GLint, GLsizei, ctypes.c_void_p)),
+        "glUniformMatrix4fv": (None, (GLint, GLsizei, GLboolean, ctypes.c_void_p)),
+        "glDrawElements": (None, (GLenum, GLsizei, GLenum, ctypes.c_void_p)),
+        "glDrawElementsBaseVertex": (None, (GLenum, GLsizei, GLenum, ctypes.c_void_p, GLint)),
+    }
+
+    def __init__(self) -> None:
+        # Name -> ctypes function
+        self._m_functions: dict = {}
+
+    # Resolve every entry point [needs a current GL context]
+    def load(self) -> bool:
+        if not sdl2.SDL_GL_GetCurrentContext():
+            sdl2.SDL_Log(b"GL fast path needs a current GL context")
+            return False
+        functions: dict = {}
+        for name, (restype, argtypes) in GLFastPath.SIGNATURES.items():
+            address = sdl2.SDL_GL_GetProcAddress(name.encode())
+            if not address:
+                sdl2.SDL_Log(b"GL fast path: no entry point ", name.encode())
+                return False
+            functions[name] = _FUNCTYPE(restype, *argtypes)(address)
+        self._m_functions = functions
+        return True
+
+    # Route the GL proxy's calls through the loaded functions
+    # [until its backend changes]
+    def install(self, proxy: GLProxy) -> None:
+        for name, function in self._m_functions.items():
+            proxy.override(name, function)
+
+    def get_function(self, name: str):
+        return self._m_functions.get(name)
+
+    def get_names(self) -> list:
+        return sorted(self._m_functions)
+
+    def is_loaded(self) -> bool:
+        return bool(self._m_functions)
@@ -0,0 +1,238 @@
+from __future__ import annotations
+from gl_backend import GL
+import sdl2
+import ctypes
+
+
+class GLStateCache:
+    """
+    This class shadows GL state and filters out no-op state changes.
+
+    Every enable/disable, blend, depth/color mask, program, vertex array
+    and texture change goes through here. A call is only forwarded to GL when the value differs
+    from the shadowed one; skipped calls are counted. In debug mode every
+    skipped call first checks the shadow value against glGet*.
+    """
+
+    def __init__(self) -> None:
+        # Shadow state [None = unknown, always forward]
+        self._m_caps: dict = {}
+        self._m_blend_equation: tuple = None
+        self._m_blend_func: tuple = None
+        self._m_depth_func: int = None
+        self._m_depth_mask: bool = None
+        self._m_color_mask: tuple = None
+        self._m_program: int = None
+        self._m_vertex_array: int = None
+        self._m_active_texture: int = None
+        # (texture unit, target) -> texture id
+        self._m_textures: dict = {}
+
+        # Call name -> count
+        self._m_issued: dict = {}
+        self._m_saved: dict = {}
+
+        self._m_debug: bool = False
+        self._m_num_mismatches: int = 0
+
+    # Forget all shadow state (e.g. after a new context or foreign GL calls)
+    def invalidate(self) -> None:
+        self._m_caps.clear()
+        self._m_blend_equation = None
+        self._m_blend_func = None
+        self._m_depth_func = None
+        self._m_depth_mask = None
+        self._m_color_mask = None
+        self._m_program = None
+        self._m_vertex_array = None
+        self._m_active_texture = None
+        self._m_textures.clear()
+
+    def enable(self, cap: GL.GLenum) -> None:
+        if self._m_caps.get(cap) is True:
+            self._saved("glEnable", lambda: GL.glIsEnabled(cap), True)
+            return
+        self._issued("glEnable")
+        GL.glEnable(cap)
+        self._m_caps[cap] = True
+
+    def disable(self, cap: GL.GLenum) -> None:
+        if self._m_caps.get(cap) is False:
+            self._saved("glDisable", lambda: GL.glIsEnabled(cap), False)
+            return
+        self._issued("glDisable")
+        GL.glDisable(cap)
+        self._m_caps[cap] = False
+
+    def blend_equation_separate(self, mode_rgb: GL.GLenum, mode_alpha: GL.GLenum) -> None:
+        equation: tuple = (mode_rgb, mode_alpha)
+        if self._m_blend_equation == equation:
+            self._saved("glBlendEquationSeparate", lambda: (
+                GL.glGetIntegerv(GL.GL_BLEND_EQUATION_RGB),
+                GL.glGetIntegerv(GL.GL_BLEND_EQUATION_ALPHA)), equation)
+            return
+        self._issued("glBlendEquationSeparate")
+        GL.glBlendEquationSeparate(mode_rgb, mode_alpha)
+        self._m_blend_equation = equation
+
+    def blend_func_separate(self, src_rgb: GL.GLenum, dst_rgb: GL.GLenum,
+                            src_alpha: GL.GLenum, dst_alpha: GL.GLenum) -> None:
+        func: tuple = (src_rgb, dst_rgb, src_alpha, dst_alpha)
+        if self._m_blend_func == func:
+            self._saved("glBlendFuncSeparate", lambda: (
+                GL.glGetIntegerv(GL.GL_BLEND_SRC_RGB),
+                GL.glGetIntegerv(GL.GL_BLEND_DST_RGB),
+                GL.glGetIntegerv(GL.GL_BLEND_SRC_ALPHA),
+                GL.glGetIntegerv(GL.GL_BLEND_DST_ALPHA)), func)
+            return
+        self._issued("glBlendFuncSeparate")
+        GL.glBlendFuncSeparate(src_rgb, dst_rgb, src_alpha, dst_alpha)
+        self._m_blend_func = func
+
+    def depth_func(self, func: GL.GLenum) -> None:
+        if self._m_depth_func == func:
+            self._saved("glDepthFunc", lambda: GL.glGetIntegerv(
+                GL.GL_DEPTH_FUNC), func)
+            return
+        self._issued("glDepthFunc")
+        GL.glDepthFunc(func)
+        self._m_depth_func = func
+
+    def depth_mask(self, flag: bool) -> None:
+        if self._m_depth_mask == flag:
+            self._saved("glDepthMask", lambda: bool(GL.glGetBooleanv(
+                GL.GL_DEPTH_WRITEMASK)), flag)
+            return
+        self._issued("glDepthMask")
+        GL.glDepthMask(GL.GL_TRUE if flag else GL.GL_FALSE)
+        self._m_depth_mask = flag
+
+    def color_mask(self, red: bool, green: bool, blue: bool, alpha: bool) -> None:
+        mask: tuple = (red, green, blue, alpha)
+        if self._m_color_mask == mask:
+            self._saved("glColorMask", lambda: tuple(
+                bool(m) for m in GL.glGetBooleanv(GL.GL_COLOR_WRITEMASK)), mask)
+            return
+        self._issued("glColorMask")
+        GL.glColorMask(*(GL.GL_TRUE if m else GL.GL_FALSE for m in mask))
+        self._m_color_mask = mask
+
+    def use_program(self, program: int) -> None:
+        program = GLStateCache._to_int(program)
+        if self._m_program == program:
+            self._saved("glUseProgram", lambda: GL.glGetIntegerv(
+                GL.GL_CURRENT_PROGRAM), program)
+            return
+        self._issued("glUseProgram")
+        GL.glUseProgram(program)
+        self._m_program = program
+
+    def bind_vertex_array(self, vertex_array: int) -> None:
+        vertex_array = GLStateCache._to_int(vertex_array)
+        if self._m_vertex_array == vertex_array:
+            self._saved("glBindVertexArray", lambda: GL.glGetIntegerv(
+                GL.GL_VERTEX_ARRAY_BINDING), vertex_array)
+            return
+        self._issued("glBindVertexArray")
+        GL.glBindVertexArray(vertex_array)
+        self._m_vertex_array = vertex_array
+
+    def active_texture(self, unit: GL.GLenum) -> None:
+        if self._m_active_texture == unit:
+            self._saved("glActiveTexture", lambda: GL.glGetIntegerv(
+                GL.GL_ACTIVE_TEXTURE), unit)
+            return
+        self._issued("glActiveTexture")
+        GL.glActiveTexture(unit)
+        self._m_active_texture = unit
+
+    def bind_texture(self, target: GL.GLenum, texture: int) -> None:
+        texture = GLStateCache._to_int(texture)
+        key: tuple = (self._m_active_texture, target)
+        # Unknown active unit means the binding slot is unknown too
+        if self._m_active_texture is not None and self._m_textures.get(key) == texture:
+            self._saved("glBindTexture", lambda: GL.glGetIntegerv(
+                GLStateCache._binding_query(target)), texture)
+            return
+        self._issued("glBindTexture")
+        GL.glBindTexture(target, texture)
+        self._m_textures[key] = texture
+
+    # Deleted objects unbind themselves in GL, so drop them from the shadow
+    def forget_program(self, program: int) -> None:
+        if self._m_program == GLStateCache._to_int(program):
+            self._m_program = None
+
+    def forget_vertex_array(self, vertex_array: int) -> None:
+        if self._m_vertex_array == GLStateCache._to_int(vertex_array):
+            self._m_vertex_array = None
+
+    def forget_texture(self, texture: int) -> None:
+        texture = GLStateCache._to_int(texture)
+        for key, bound in list(self._m_textures.items()):
+            if bound == texture:
+                del self._m_textures[key]
+
+    # Validate skipped calls against glGet* (slow, for debugging)
+    def set_debug(self, debug: bool) -> None:
+        self._m_debug = debug
+
+    def reset_stats(self) -> None:
+        self._m_issued.clear()
+        self._m_saved.clear()
+
+    # Call name -> (issued, saved)
+    def get_stats(self) -> dict:
+        names: set = set(self._m_issued) | set(self._m_saved)
+        return {name: (self._m_issued.get(name, 0), self._m_saved.get(name, 0))
+                for name in names}
+
+    def get_num_issued(self) -> int:
+        return sum(self._m_issued.values())
+
+    def get_num_saved(self) -> int:
+        return sum(self._m_saved.values())
+
+    def get_num_mismatches(self) -> int:
+        return self._m_num_mismatches
+
+    def _issued(self, name: str) -> None:
+        self._m_issued[name] = self._m_issued.get(name, 0) + 1
+
+    def _saved(self, name: str, query, expected) -> None:
+        self._m_saved[name] = self._m_saved.get(name, 0) + 1
+        if self._m_debug:
+            actual = query()
+            if isinstance(actual, tuple):
+                actual = tuple(GLStateCache._to_int(a) for a in actual)
+            else:
+                actual = GLStateCache._to_int(actual)
+            if actual != GLStateCache._to_int(expected):
+                self._m_num_mismatches += 1
+                sdl2.SDL_Log("GL state mismatch in {}: shadow {} actual {}".format(
+                    name, expected, actual).encode())
+
+    # GL ids arrive as ints, ctypes values or numpy scalars
+    @staticmethod
+    def _to_int(value) -> int:
+        if isinstance(value, ctypes._SimpleCData):
+            return int(value.value)
+        if isinstance(value, (bool, tuple)):
+            return value
+        try:
+            return int(value)
+        except TypeError:
+            # One-element arrays returned by glGet*
+            return int(value[0])
+
+    @staticmethod
+    def _binding_query(target: GL.GLenum) -> GL.GLenum:
+        if target == GL.GL_TEXTURE_2D_ARRAY:
+            return GL.GL_TEXTURE_BINDING_2D_ARRAY
+        if target == GL.GL_TEXTURE_BUFFER:
+            return GL.GL_TEXTURE_BINDING_BUFFER
+        return GL.GL_TEXTURE_BINDING_2D
+
+
+# One GL context, one cache
+state_cache: GLStateCache = GLStateCache()
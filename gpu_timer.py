@@ -0,0 +1,80 @@
+from __future__ import annotations
+from gl_backend import GL
+import ctypes
+
+
+class GpuTimer:
+    """
+    This class measures GPU time of render passes with GL_TIME_ELAPSED queries.
+
+    Query objects are pooled per frame slot and reused every num_frames
+    frames. Results are only read once the GPU reports them available, by
+    which time the frame is a few frames old, so reading never stalls the
+    pipeline. A slot whose results are still not ready when it comes round
+    again is dropped rather than waited for.
+    """
+
+    def __init__(self, num_frames: int = 4) -> None:
+        self._m_num_frames: int = num_frames
+        # Per slot: list of (pass name, query id) in submission order
+        self._m_slots: list = [[] for _ in range(num_frames)]
+        # Per slot: pass name -> query id (the pool, reused by name)
+        self._m_pools: list = [{} for _ in range(num_frames)]
+        self._m_slot: int = 0
+        self._m_num_dropped: int = 0
+
+    def delete(self) -> None:
+        for pool in self._m_pools:
+            for query_id in pool.values():
+                GL.glDeleteQueries(1, ctypes.byref(query_id))
+            pool.clear()
+
+    # Move to the next slot; returns [(pass name, ms)] of the frame it held
+    def begin_frame(self) -> list:
+        self._m_slot = (self._m_slot + 1) % self._m_num_frames
+        results: list = self.collect(self._m_slot)
+        self._m_slots[self._m_slot] = []
+        return results
+
+    # Time the GPU work of a pass [passes may not nest]
+    def begin(self, name: str) -> None:
+        pool: dict = self._m_pools[self._m_slot]
+        query_id: ctypes.c_uint = pool.get(name)
+        if query_id is None:
+            query_id = ctypes.c_uint(0)
+            GL.glGenQueries(1, ctypes.byref(query_id))
+            pool[name] = query_id
+        GL.glBeginQuery(GL.GL_TIME_ELAPSED, query_id)
+        self._m_slots[self._m_slot].append((name, query_id))
+
+    def end(self) -> None:
+        GL.glEndQuery(GL.GL_TIME_ELAPSED)
+
+    # Results of a slot if all its queries are done, otherwise []
+    def collect(self, slot: int) -> list:
+        queries: list = self._m_slots[slot]
+        if not queries:
+            return []
+        # Queries finish in order, the last one is enough to check
+        available: ctypes.c_int = ctypes.c_int(0)
+        GL.glGetQueryObjectiv(queries[-1][1], GL.GL_QUERY_RESULT_AVAILABLE,
+                              ctypes.byref(available))
+        if not available.value:
+            self._m_num_dropped += 1
+            return []
+
+        results: list = []
+        elapsed: ctypes.c_uint64 = ctypes.c_uint64(0)
+        for name, query_id in queries:
+            GL.glGetQueryObjectui64v(query_id, GL.GL_QUERY_RESULT,
+                                     ctypes.byref(elapsed))
+            # Nanoseconds -> ms
+            results.append((name, elapsed.value / 1000000.0))
+        return results
+
+    def get_num_frames(self) -> int:
+        return self._m_num_frames
+
+    # Frames whose results were not ready in time
+    def get_num_dropped(self) -> int:
+        return self._m_num_dropped
@@ -0,0 +1,48 @@
+from __future__ import annotations
+import json
+
+# Optional: orjson parses large asset files several times faster
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JSONParser:
+    """
+    This class is the pluggable JSON parser used for asset files.
+
+    It uses orjson when installed and the standard json module otherwise.
+    Another parser can be plugged in with set_parse_func() (any callable
+    taking bytes and returning Python objects).
+    """
+
+    def __init__(self) -> None:
+        if orjson is not None:
+            self._m_parse = orjson.loads
+            self._m_name: str = "orjson"
+        else:
+            self._m_parse = json.loads
+            self._m_name = "json"
+
+    # Parse a file; returns None if it cannot be read or is not valid JSON
+    def load(self, file_name: str):
+        try:
+            with open(file_name, "rb") as file_obj:
+                return self._m_parse(file_obj.read())
+        except (OSError, ValueError):
+            return None
+
+    def loads(self, data: bytes):
+        return self._m_parse(data)
+
+    def set_parse_func(self, parse, name: str) -> None:
+        self._m_parse = parse
+        self._m_name = name
+
+    def get_name(self) -> str:
+        return self._m_name
+
+
+# Shared by all asset loaders
+json_parser: JSONParser = JSONParser()
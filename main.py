@@ -1,8 +1,28 @@
-from game import Game
+import sys
+from startup_profiler import startup_profiler
+
+# Imports are the first steps of the startup profile
+with startup_profiler.section("import sdl2"):
+    import sdl2dll
+    import sdl2
+with startup_profiler.section("import numpy"):
+    import numpy
+with startup_profiler.section("import OpenGL"):
+    # --release: no PyOpenGL error checking [set before OpenGL.GL loads]
+    from runtime_profile import RuntimeProfile
+    RuntimeProfile.apply("release" if "--release" in sys.argv else "debug")
+    import OpenGL.GL
+with startup_profiler.section("import game"):
+    from game import Game
 
 
 def main():
-    game = Game()
+    # --threaded: render thread submits frame N while frame N+1 updates
+    # --profile-startup: log the startup time breakdown once assets are in
+    # --fast-gl: hot per-draw GL calls skip PyOpenGL [on with --release]
+    game = Game(threaded_rendering="--threaded" in sys.argv,
+                profile_startup="--profile-startup" in sys.argv,
+                fast_gl="--fast-gl" in sys.argv or "--release" in sys.argv)
     if game.initialize():
         game.run_loop()
     game.shutdown()
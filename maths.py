@@ -211,13 +211,13 @@ class Vector3D:
     @staticmethod
     def transform(vec: Vector3D, mat: Matrix4, w: float = 1.0) -> Vector3D:
         ret_val: Vector3D = Vector3D()
-        ret_val.x = vec.x * mat.mat[0][0] + \
-            vec.y * mat.mat[1][0] + vec.z * mat.mat[2][0] + w * mat.mat[3][0]
-        ret_val.y = vec.x * mat.mat[0][1] + \
-            vec.y * mat.mat[1][1] + vec.z * mat.mat[2][1] + w * mat.mat[3][1]
+        ret_val.x = vec.x * mat.m_mat[0][0] + \
+            vec.y * mat.m_mat[1][0] + vec.z * mat.m_mat[2][0] + w * mat.m_mat[3][0]
+        ret_val.y = vec.x * mat.m_mat[0][1] + \
+            vec.y * mat.m_mat[1][1] + vec.z * mat.m_mat[2][1] + w * mat.m_mat[3][1]
         ret_val.z = vec.x * \
-            mat.mat[0][2] + vec.y * mat.mat[1][2] + \
-            vec.z * mat.mat[2][2] + w * mat.mat[3][2]
+            mat.m_mat[0][2] + vec.y * mat.m_mat[1][2] + \
+            vec.z * mat.m_mat[2][2] + w * mat.m_mat[3][2]
         # Ignore w since we are not returning a new value for it
         return ret_val
 
@@ -271,6 +271,19 @@ class Matrix4:
     def get_translation(self) -> Vector3D:
         return Vector3D(self.m_mat[3][0], self.m_mat[3][1], self.m_mat[3][2])
 
+    # One matrix per 4x4 block of a writable (n, 4, 4) float32 array
+    # [no copy; the array is kept alive by the matrices]
+    @staticmethod
+    def create_from_array(matrices) -> list:
+        CArray = ((ctypes.c_float * 4) * 4)
+        block = (CArray * len(matrices)).from_buffer(matrices)
+        ret_val: list = []
+        for mat in block:
+            temp: Matrix4 = Matrix4.__new__(Matrix4)
+            temp.m_mat = mat
+            ret_val.append(temp)
+        return ret_val
+
     # Matrix multiplication
     def __mul__(self, other: Matrix4) -> Matrix4:
         ret_val: Matrix4 = Matrix4()
@@ -1,10 +1,13 @@
 from __future__ import annotations
-import math
+import itertools
 import sdl2
-import json
-import ctypes
-from maths import Vector3D
+import numpy as np
 from vertex_array import VertexArray
+from json_parser import json_parser
+from mesh_optimizer import MeshOptimizer
+from mesh_binary import BinaryMesh
+from vertex_format import VertexFormat
+from geometry_pool import geometry_pools
 
 
 class Mesh:
@@ -12,116 +15,253 @@ class Mesh:
     This class simply encapsulates mesh loading from file into VertexArray.
     """
 
+    # JSON meshes up to this size are cache-optimized while loading
+    # [larger ones take too long; run mesh_optimizer.py offline]
+    OPTIMIZE_MAX_TRIANGLES = 65536
+    # Pack float PosNormTex meshes into a 20-byte format while loading
+    COMPACT_VERTICES = True
+    # Suballocate from the shared per-format buffers (one VAO bind per pass)
+    USE_GEOMETRY_POOL = True
+    # Occluder proxy from the coarsest LOD instead of full detail [opt-in:
+    # simplified geometry can stick out past the real surface, so the
+    # culler may hide objects that are visible]
+    COARSE_OCCLUDER_PROXY = False
+
     def __init__(self) -> None:
         # Textures associated with this mesh
         self._m_textures: list = []
         # Vertices associated with this mesh
         self._m_vertex_array: VertexArray = None
+        # Coarser levels of detail (LOD 1, 2, ...)
+        self._m_lods: list = []
+        # Screen height fraction below which each LOD is used
+        self._m_lod_screen_sizes: list = [1.0]
+        # CPU copy of the full detail (or coarsest) LOD for occlusion culling
+        self._m_proxy_positions: np.ndarray = None
+        self._m_proxy_indices: np.ndarray = None
         # Name of shader specified by mesh
         self._m_shader_name: str = ""
         # Object space bounding sphere radius
         self._m_radius: float = 0.0
+        # Object space bounding box (min xyz, max xyz)
+        self._m_bounds: tuple = ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
         self._m_spec_power: float = 100.0
+        # Tex coords outside [0, 1] tile the texture ("textureRepeat")
+        self._m_texture_repeat: bool = False
+        # Estimated memory: vertex/index buffers, occluder proxy
+        self._m_gpu_size: int = 0
+        self._m_cpu_size: int = 0
 
     def delete(self) -> None:
         # Nothing to implement
         pass
 
     # Creates a list of vertices and indices from JSON mesh file
+    # [.gpmeshb files are memory-mapped binary meshes instead]
     def load(self, file_name: str, renderer: Renderer) -> bool:
-        file_obj = open(file_name, "r")
-        if not file_obj:
-            sdl2.SDL_Log(b"File not found: ", file_name.encode())
+        data: dict = Mesh.read(file_name)
+        if data == None:
             return False
+        self.create(data, [Mesh._find_texture(tex_name, renderer)
+                           for tex_name in data["textures"]])
+        return True
+
+    # File read & decode only, no GL calls [safe on a worker thread]
+    # Returns a dict for create(), or None if the mesh is not valid
+    # [in_memory: read binary meshes now instead of mapping them]
+    @staticmethod
+    def read(file_name: str, in_memory: bool = False) -> dict:
+        if file_name.endswith(".gpmeshb"):
+            return Mesh._read_binary(file_name, in_memory)
 
-        data = json.load(file_obj)
+        # Parse once [orjson when installed]
+        data = json_parser.load(file_name)
         if not data:
-            sdl2.SDL_Log(b"Mesh is not valid JSON: ", file_name.encode())
-            return False
+            sdl2.SDL_Log(b"Mesh not found or not valid JSON: ", file_name.encode())
+            return None
 
         if data["version"] != 1:
             sdl2.SDL_Log(b"Mesh is not version 1: ", file_name.encode())
-            return False
+            return None
 
-        self._m_shader_name = data["shader"]
         # NOTE: Skip something here until later chaps
 
-        vert_size: int = 8
-
         # LOAD TEXTURES:
         textures_data: list = data["textures"]
         if not textures_data or len(textures_data) < 1:
             sdl2.SDL_Log(b"Mesh has no textures: ", file_name.encode())
-            return False
+            return None
 
+        vertex_format_name: str = data.get("vertexformat", "PosNormTex")
+        if VertexFormat.get(vertex_format_name) == None:
+            sdl2.SDL_Log(b"Unexpected vertex format for: ", file_name.encode())
+            return None
+
+        # LOAD VERTICES & INDICES: (full detail, then optional coarser LODs)
+        sets: list = []
+        for set_data in [data] + data.get("lods", []):
+            vertex_data: tuple = Mesh._read_vertex_data(
+                set_data["vertices"], set_data["indices"], file_name)
+            if vertex_data == None:
+                return None
+            vertices, indices = vertex_data
+            if len(indices) <= Mesh.OPTIMIZE_MAX_TRIANGLES:
+                vertices, indices = MeshOptimizer.optimize(vertices, indices)
+            else:
+                indices = indices.astype(MeshOptimizer.index_dtype(len(vertices)))
+            sets.append((vertices, indices))
+
+        # Bounding sphere & box come from the full detail mesh
+        positions: np.ndarray = sets[0][0][:, 0:3]
+        # Quantize into the GPU layout [all LODs share one format]
+        vertex_format: VertexFormat = VertexFormat.select(
+            vertex_format_name, np.concatenate([vertices for vertices, _ in sets]),
+            Mesh.COMPACT_VERTICES)
+        sets = [(vertex_format.encode(vertices), indices) for vertices, indices in sets]
+        return {"shader": data["shader"], "textures": textures_data,
+                "specularPower": data["specularPower"], "sets": sets,
+                "textureRepeat": bool(data.get("textureRepeat", False)),
+                "lodScreenSizes": data.get("lodScreenSizes", [1.0] * len(sets)),
+                "radius": float(np.sqrt(np.einsum(
+                    "ij,ij->i", positions, positions).max())),
+                "bounds": (tuple(positions.min(axis=0).tolist()),
+                           tuple(positions.max(axis=0).tolist())),
+                "vertexFormat": vertex_format, "binary": None}
+
+    # Create vertex arrays from read() data [GL thread]
+    def create(self, data: dict, textures: list) -> None:
+        self._m_shader_name = data["shader"]
         # Load specularPower
-        self._m_spec_power: float = data["specularPower"]
+        self._m_spec_power = data["specularPower"]
+        self._m_texture_repeat = data["textureRepeat"]
+        self._m_radius = data["radius"]
+        self._m_bounds = data["bounds"]
+        self._m_textures = list(textures)
+        self._m_gpu_size = Mesh.get_upload_size(data)
+
+        for vertices, indices in data["sets"]:
+            if Mesh.USE_GEOMETRY_POOL:
+                vertex_array = geometry_pools.allocate(vertices, indices, data["vertexFormat"])
+            else:
+                vertex_array = VertexArray(vertices, len(vertices), indices, indices.size,
+                                           data["vertexFormat"])
+            if self._m_vertex_array == None:
+                self._m_vertex_array = vertex_array
+            else:
+                self._m_lods.append(vertex_array)
+        self._m_lod_screen_sizes = data["lodScreenSizes"]
+
+        # Occluder proxy [copied, a mapping gets closed]
+        vertices, indices = data["sets"][-1 if Mesh.COARSE_OCCLUDER_PROXY else 0]
+        self._m_proxy_positions = vertices["position"].copy()
+        self._m_proxy_indices = indices.reshape(-1, 3).copy()
+        self._m_cpu_size = self._m_proxy_positions.nbytes + self._m_proxy_indices.nbytes
+
+        binary: BinaryMesh = data["binary"]
+        if binary != None:
+            # Views into the mapping must be gone before it is closed
+            del vertices, indices
+            data["sets"] = []
+            binary.close()
+
+    # Bytes create() will upload
+    @staticmethod
+    def get_upload_size(data: dict) -> int:
+        return sum(vertices.nbytes + indices.nbytes for vertices, indices in data["sets"])
+
+    # Binary meshes hand views into the file mapping to glBufferData
+    @staticmethod
+    def _read_binary(file_name: str, in_memory: bool) -> dict:
+        binary: BinaryMesh = BinaryMesh.open(file_name)
+        if binary == None:
+            sdl2.SDL_Log(b"Mesh is not a binary mesh: ", file_name.encode())
+            return None
+        vertex_format: VertexFormat = VertexFormat.get(binary.get_vertex_format())
+        if vertex_format == None or vertex_format.get_stride() != binary.get_vertex_size():
+            sdl2.SDL_Log(b"Unexpected vertex format for: ", file_name.encode())
+            binary.close()
+            return None
+        if not binary.get_textures():
+            sdl2.SDL_Log(b"Mesh has no textures: ", file_name.encode())
+            binary.close()
+            return None
 
-        for tex_name in textures_data:
-            # Is texture already loaded?
-            texture: Texture = renderer.get_texture(tex_name)
+        sets: list = [(binary.get_vertices(lod, vertex_format), binary.get_indices(lod))
+                      for lod in range(binary.get_num_lods())]
+        if in_memory:
+            sets = [(vertices.copy(), indices.copy()) for vertices, indices in sets]
+        # Bounding sphere & box were computed by the converter
+        data: dict = {"shader": binary.get_shader_name(), "textures": binary.get_textures(),
+                      "specularPower": binary.get_spec_power(), "sets": sets,
+                      "textureRepeat": binary.is_texture_repeat(),
+                      "lodScreenSizes": binary.get_lod_screen_sizes(),
+                      "radius": binary.get_radius(), "bounds": binary.get_bounds(),
+                      "vertexFormat": vertex_format,
+                      "binary": None if in_memory else binary}
+        if in_memory:
+            binary.close()
+        return data
+
+    @staticmethod
+    def _find_texture(tex_name: str, renderer: Renderer) -> Texture:
+        # Is texture already loaded?
+        texture: Texture = renderer.get_texture(tex_name)
+        if texture == None:
+            # Try loading texture again
+            texture = renderer.get_texture(tex_name)
             if texture == None:
-                # Try loading texture again
-                texture = renderer.get_texture(tex_name)
-                if texture == None:
-                    # If still None, use default texture
-                    texture = renderer.get_texture("assets/default.png")
-            self._m_textures.append(texture)
+                # If still None, use default texture
+                texture = renderer.get_texture("assets/default.png")
+        return texture
+
+    # JSON vertex/index lists -> (float32 (n, 8), int64 (m, 3)) or None
+    # [every vertex format is stored as pos, normal, tex coord floats]
+    # [bulk conversion, no per-element work]
+    @staticmethod
+    def _read_vertex_data(verts_data: list, inds_data: list, file_name: str) -> tuple:
+        vert_size: int = 8
 
         # LOAD VERTICES:
-        verts_data: list = data["vertices"]
         if not verts_data or len(verts_data) < 1:
-            sdl2.SDL_Log("Mesh has no vertices: ", file_name.encode())
-            return False
-
-        vertices: ctypes.Array = (
-            ctypes.c_float * (len(verts_data) * vert_size))()
-        self._m_radius = 0.0
-        count: int = 0
-        for vert_data in verts_data:
-            # For now assume 8 elements
-            if not vert_data or len(vert_data) != 8:
-                sdl2.SDL_Log("Unexpected vertex format for: ",
-                             file_name.encode())
-                return False
-            pos: Vector3D = Vector3D(vert_data[0], vert_data[1], vert_data[2])
-            self._m_radius = max(self._m_radius, pos.length_sq())
-
-            # Add floats to list
-            for f in vert_data:
-                vertices[count] = f
-                count += 1
-        count = 0
-
-        self._m_radius = math.sqrt(self._m_radius)
+            sdl2.SDL_Log(b"Mesh has no vertices: ", file_name.encode())
+            return None
+        # For now assume 8 elements
+        vertices: np.ndarray = Mesh._to_array(verts_data, vert_size, np.float32)
+        if vertices is None:
+            sdl2.SDL_Log(b"Unexpected vertex format for: ", file_name.encode())
+            return None
 
         # LOAD INDICES:
-        inds_data: list = data["indices"]
         if not inds_data or len(inds_data) < 1:
-            sdl2.SDL_Log("Mesh has no indices: ", file_name.encode())
-            return False
+            sdl2.SDL_Log(b"Mesh has no indices: ", file_name.encode())
+            return None
+        indices: np.ndarray = Mesh._to_array(inds_data, 3, np.int64)
+        if (indices is None or indices.min() < 0 or indices.max() >= len(vertices)):
+            sdl2.SDL_Log(b"Invalid indices for: ", file_name.encode())
+            return None
+        return vertices, indices
 
-        indices: ctypes.Array = (
-            ctypes.c_uint * (len(inds_data) * 3))()
-        for ind_data in inds_data:
-            if not ind_data or len(ind_data) != 3:
-                sdl2.SDL_Log("Invalid indices for: ", file_name.encode())
-                return False
-
-            # Add ints to list
-            for i in ind_data:
-                indices[count] = i
-                count += 1
-        count = 0
-
-        # Finally, create a vertex array
-        self._m_vertex_array = VertexArray(vertices, int(
-            len(vertices) / vert_size), indices, len(indices))
-        return True
+    # List of equal-length rows -> (rows, row_size) array, None if malformed
+    @staticmethod
+    def _to_array(rows: list, row_size: int, dtype: type) -> np.ndarray:
+        try:
+            # Row lengths are checked in C, then all values are read in one pass
+            if set(map(len, rows)) != {row_size}:
+                return None
+            return np.fromiter(itertools.chain.from_iterable(rows), dtype=dtype,
+                               count=len(rows) * row_size).reshape(-1, row_size)
+        except (TypeError, ValueError):
+            return None
 
     def unload(self) -> None:
         self._m_vertex_array.delete()
         self._m_vertex_array = None
+        for vertex_array in self._m_lods:
+            vertex_array.delete()
+        self._m_lods.clear()
+
+    def get_num_textures(self) -> int:
+        return len(self._m_textures)
 
     # Get texture from specified index
     def get_texture(self, index: int) -> Texture:
@@ -130,8 +270,21 @@ class Mesh:
         else:
             return None
 
-    def get_vertex_array(self) -> VertexArray:
-        return self._m_vertex_array
+    # Get vertex array of a level of detail (0 is full detail)
+    def get_vertex_array(self, lod: int = 0) -> VertexArray:
+        if lod <= 0 or not self._m_lods:
+            return self._m_vertex_array
+        return self._m_lods[min(lod, len(self._m_lods)) - 1]
+
+    # Occluder proxy: (positions (n, 3), indices (m, 3))
+    def get_proxy(self) -> tuple:
+        return self._m_proxy_positions, self._m_proxy_indices
+
+    def get_num_lods(self) -> int:
+        return len(self._m_lods) + 1
+
+    def get_lod_screen_sizes(self) -> list:
+        return self._m_lod_screen_sizes
 
     def get_shader_name(self) -> str:
         return self._m_shader_name
@@ -139,5 +292,18 @@ class Mesh:
     def get_radius(self) -> float:
         return self._m_radius
 
+    # (min xyz, max xyz) in object space
+    def get_bounds(self) -> tuple:
+        return self._m_bounds
+
     def get_spec_power(self) -> float:
         return self._m_spec_power
+
+    def is_texture_repeat(self) -> bool:
+        return self._m_texture_repeat
+
+    def get_gpu_size(self) -> int:
+        return self._m_gpu_size
+
+    def get_cpu_size(self) -> int:
+        return self._m_cpu_size
@@ -0,0 +1,230 @@
+from __future__ import annotations
+import json
+import mmap
+import struct
+import sys
+import numpy as np
+from mesh_optimizer import MeshOptimizer
+from vertex_format import VertexFormat
+
+
+class BinaryMesh:
+    """
+    This class reads and writes the binary mesh format (.gpmeshb).
+
+    Layout (little endian):
+        header      magic "GPMB", version, vertex size (bytes), index size
+                    (bytes), number of LODs, specular power, radius,
+                    bounds min xyz, bounds max xyz, flags
+        strings     vertex format, shader, textures (u32 length + utf-8)
+        lod table   per LOD: num vertices, num indices, vertex blob offset,
+                    index blob offset, screen size
+        blobs       vertices in the named vertex format and uint16/uint32
+                    indices, 16-byte aligned
+
+    open() maps the file, and get_vertices()/get_indices() return NumPy
+    views straight into the mapping, so they can go to glBufferData
+    without any per-element Python work.
+    """
+
+    MAGIC = b"GPMB"
+    # 2: vertex size is the stride in bytes of any vertex format
+    # 3: flags (FLAG_TEXTURE_REPEAT)
+    VERSION = 3
+    HEADER = struct.Struct("<4sIIIIff3f3fI")
+    FLAG_TEXTURE_REPEAT = 1
+    LOD_ENTRY = struct.Struct("<IIQQf")
+    ALIGNMENT = 16
+
+    def __init__(self) -> None:
+        self._m_file_obj = None
+        self._m_map: mmap.mmap = None
+        self._m_vertex_size: int = 32
+        self._m_index_dtype: type = np.uint32
+        self._m_vertex_format: str = ""
+        self._m_shader_name: str = ""
+        self._m_textures: list = []
+        self._m_spec_power: float = 100.0
+        self._m_texture_repeat: bool = False
+        self._m_radius: float = 0.0
+        # (min xyz, max xyz)
+        self._m_bounds: tuple = ((0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+        # Per LOD: (num vertices, num indices, vertex offset, index offset)
+        self._m_lods: list = []
+        self._m_lod_screen_sizes: list = []
+
+    # Map a .gpmeshb file; returns None if it is not one
+    @staticmethod
+    def open(file_name: str) -> BinaryMesh:
+        mesh = BinaryMesh()
+        try:
+            mesh._m_file_obj = open(file_name, "rb")
+            mesh._m_map = mmap.mmap(mesh._m_file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            mesh.close()
+            return None
+        if len(mesh._m_map) < BinaryMesh.HEADER.size:
+            mesh.close()
+            return None
+
+        (magic, version, vertex_size, index_size, num_lods, spec_power, radius,
+         *bounds, flags) = BinaryMesh.HEADER.unpack_from(mesh._m_map, 0)
+        if magic != BinaryMesh.MAGIC or version != BinaryMesh.VERSION or index_size not in (2, 4):
+            mesh.close()
+            return None
+        mesh._m_vertex_size = vertex_size
+        mesh._m_index_dtype = np.uint16 if index_size == 2 else np.uint32
+        mesh._m_spec_power = spec_power
+        mesh._m_texture_repeat = bool(flags & BinaryMesh.FLAG_TEXTURE_REPEAT)
+        mesh._m_radius = radius
+        mesh._m_bounds = (tuple(bounds[0:3]), tuple(bounds[3:6]))
+
+        offset: int = BinaryMesh.HEADER.size
+        mesh._m_vertex_format, offset = BinaryMesh._read_string(mesh._m_map, offset)
+        mesh._m_shader_name, offset = BinaryMesh._read_string(mesh._m_map, offset)
+        num_textures: int = struct.unpack_from("<I", mesh._m_map, offset)[0]
+        offset += 4
+        for _ in range(num_textures):
+            texture, offset = BinaryMesh._read_string(mesh._m_map, offset)
+            mesh._m_textures.append(texture)
+
+        for _ in range(num_lods):
+            num_verts, num_indices, vertex_offset, index_offset, screen_size = \
+                BinaryMesh.LOD_ENTRY.unpack_from(mesh._m_map, offset)
+            offset += BinaryMesh.LOD_ENTRY.size
+            mesh._m_lods.append((num_verts, num_indices, vertex_offset, index_offset))
+            mesh._m_lod_screen_sizes.append(screen_size)
+        return mesh
+
+    # Unmap [views from get_vertices()/get_indices() must be released first]
+    def close(self) -> None:
+        if self._m_map is not None:
+            self._m_map.close()
+            self._m_map = None
+        if self._m_file_obj is not None:
+            self._m_file_obj.close()
+            self._m_file_obj = None
+
+    # Zero-copy structured view of a LOD's vertices
+    def get_vertices(self, lod: int, vertex_format: VertexFormat) -> np.ndarray:
+        num_verts, _, vertex_offset, _ = self._m_lods[lod]
+        return np.frombuffer(self._m_map, dtype=vertex_format.get_dtype(),
+                             count=num_verts, offset=vertex_offset)
+
+    # Zero-copy flat uint16/uint32 view of a LOD's indices
+    def get_indices(self, lod: int = 0) -> np.ndarray:
+        _, num_indices, _, index_offset = self._m_lods[lod]
+        return np.frombuffer(self._m_map, dtype=self._m_index_dtype,
+                             count=num_indices, offset=index_offset)
+
+    def get_num_lods(self) -> int:
+        return len(self._m_lods)
+
+    def get_lod_screen_sizes(self) -> list:
+        return self._m_lod_screen_sizes
+
+    # Bytes per vertex
+    def get_vertex_size(self) -> int:
+        return self._m_vertex_size
+
+    def get_vertex_format(self) -> str:
+        return self._m_vertex_format
+
+    def get_shader_name(self) -> str:
+        return self._m_shader_name
+
+    def get_textures(self) -> list:
+        return self._m_textures
+
+    def get_spec_power(self) -> float:
+        return self._m_spec_power
+
+    def is_texture_repeat(self) -> bool:
+        return self._m_texture_repeat
+
+    def get_radius(self) -> float:
+        return self._m_radius
+
+    def get_bounds(self) -> tuple:
+        return self._m_bounds
+
+    # Serialize .gpmesh data (with optional "lods") to the binary format
+    # [compact: pack float PosNormTex vertices like Mesh does at load]
+    @staticmethod
+    def from_gpmesh(data: dict, compact: bool = True) -> bytes:
+        sets: list = [(data["vertices"], data["indices"])] + [
+            (lod["vertices"], lod["indices"]) for lod in data.get("lods", [])]
+        screen_sizes: list = data.get("lodScreenSizes", [1.0] * len(sets))
+        # 16-bit indices when every set allows them
+        index_dtype: type = MeshOptimizer.index_dtype(max(len(v) for v, _ in sets))
+        arrays: list = [(np.asarray(vertices, dtype=np.float32),
+                         np.asarray(indices, dtype=index_dtype).reshape(-1))
+                        for vertices, indices in sets]
+        positions: np.ndarray = arrays[0][0][:, 0:3]
+        vertex_format: VertexFormat = VertexFormat.select(
+            data.get("vertexformat", "PosNormTex"),
+            np.concatenate([vertices for vertices, _ in arrays]), compact)
+        arrays = [(vertex_format.encode(vertices), indices) for vertices, indices in arrays]
+        radius: float = float(np.sqrt((positions * positions).sum(axis=1).max()))
+
+        strings: bytes = b"".join(BinaryMesh._pack_string(s) for s in (
+            vertex_format.get_name(), data.get("shader", "")))
+        strings += struct.pack("<I", len(data["textures"]))
+        strings += b"".join(BinaryMesh._pack_string(t) for t in data["textures"])
+
+        # Blobs start after header, strings and LOD table
+        offset: int = BinaryMesh._align(BinaryMesh.HEADER.size + len(strings) +
+                                        BinaryMesh.LOD_ENTRY.size * len(arrays))
+        table: bytes = b""
+        blobs: list = []
+        for (vertices, indices), screen_size in zip(arrays, screen_sizes):
+            vertex_offset: int = offset
+            index_offset: int = BinaryMesh._align(vertex_offset + vertices.nbytes)
+            offset = BinaryMesh._align(index_offset + indices.nbytes)
+            table += BinaryMesh.LOD_ENTRY.pack(len(vertices), len(indices),
+                                               vertex_offset, index_offset, screen_size)
+            blobs.append((vertex_offset, vertices.tobytes()))
+            blobs.append((index_offset, indices.tobytes()))
+
+        header: bytes = BinaryMesh.HEADER.pack(
+            BinaryMesh.MAGIC, BinaryMesh.VERSION, vertex_format.get_stride(),
+            np.dtype(index_dtype).itemsize, len(arrays),
+            float(data.get("specularPower", 100.0)), radius,
+            *positions.min(axis=0), *positions.max(axis=0),
+            BinaryMesh.FLAG_TEXTURE_REPEAT if data.get("textureRepeat") else 0)
+        out: bytearray = bytearray(header + strings + table)
+        for blob_offset, blob in blobs:
+            out += bytes(blob_offset - len(out))
+            out += blob
+        return bytes(out)
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return (offset + BinaryMesh.ALIGNMENT - 1) // BinaryMesh.ALIGNMENT * BinaryMesh.ALIGNMENT
+
+    @staticmethod
+    def _pack_string(value: str) -> bytes:
+        encoded: bytes = value.encode("utf-8")
+        return struct.pack("<I", len(encoded)) + encoded
+
+    @staticmethod
+    def _read_string(buffer, offset: int) -> tuple:
+        length: int = struct.unpack_from("<I", buffer, offset)[0]
+        offset += 4
+        return bytes(buffer[offset:offset + length]).decode("utf-8"), offset + length
+
+
+# Offline: python mesh_binary.py <in.gpmesh> <out.gpmeshb>
+def main(argv: list) -> int:
+    if len(argv) != 3:
+        print("usage: python mesh_binary.py <in.gpmesh> <out.gpmeshb>")
+        return 1
+    with open(argv[1], "r") as file_obj:
+        data: dict = json.load(file_obj)
+    with open(argv[2], "wb") as file_obj:
+        file_obj.write(BinaryMesh.from_gpmesh(data))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -1,14 +1,26 @@
 from __future__ import annotations
-import OpenGL.GL as GL
+from gl_backend import GL
+import ctypes
 from component import Component
+from maths import Vector3D, Matrix4
+from texture import Texture
 
 
 class MeshComponent(Component):
+    # Fraction a LOD switch threshold must be passed by (avoids popping)
+    LOD_HYSTERESIS = 0.15
+
     def __init__(self, owner: Actor) -> None:
         super().__init__(owner)
 
         self._m_mesh: Mesh = None
+        # Mesh still loading in the background [draws nothing until ready]
+        self._m_mesh_handle: AssetHandle = None
         self._m_texture_index: int = 0
+        # Current level of detail
+        self._m_lod: int = 0
+        # Occluders are rasterized for occlusion culling (never culled)
+        self._m_occluder: bool = False
 
         self._m_owner.get_game().get_renderer().add_mesh_comp(self)
 
@@ -17,31 +29,126 @@ class MeshComponent(Component):
         super().delete()
         # Remove from Game's list
         self._m_owner.get_game().get_renderer().remove_mesh_comp(self)
+        self.set_mesh(None)
 
     # Implementable
     def draw(self, shader: Shader) -> None:
         if self._m_mesh:
-            # Set world transform uniform
-            shader.set_matrix_uniform(
-                "uWorldTransform", self._m_owner.get_world_transform())
-            # Set specular power
-            shader.set_float_uniform(
-                "uSpecPower", self._m_mesh.get_spec_power())
-
-            # Set the mesh's texture as active
-            texture: Texture = self._m_mesh.get_texture(self._m_texture_index)
-            if texture:
-                texture.set_active()
-            # Set the mesh's vertex array as active
-            vert_arr: VertexArray = self._m_mesh.get_vertex_array()
-            vert_arr.set_active()
-            # Draw
-            GL.glDrawElements(
-                GL.GL_TRIANGLES, vert_arr.get_num_indices(), GL.GL_UNSIGNED_INT, None)
+            MeshComponent.draw_mesh(shader, *self.get_draw_state())
+
+    # What draw() needs: (world transform, mesh, texture, lod)
+    # [Renderer snapshots this so drawing does not touch the component]
+    def get_draw_state(self) -> tuple:
+        return (self._m_owner.get_world_transform(), self._m_mesh,
+                self._m_mesh.get_texture(self._m_texture_index), self._m_lod)
+
+    @staticmethod
+    def draw_mesh(shader: Shader, world: Matrix4, mesh: Mesh, texture: Texture, lod: int) -> None:
+        # Set world transform uniform
+        shader.set_matrix_uniform("uWorldTransform", world)
+        # Set specular power
+        shader.set_float_uniform("uSpecPower", mesh.get_spec_power())
+
+        # Set the mesh's texture as active
+        if texture:
+            texture.set_active()
+        # Texture may be a sub-rect of an atlas page [set every draw,
+        # or a mesh without texture samples the last mesh's rect]
+        shader.set_vector4_uniform(
+            "uTexRect", texture.get_uv_rect() if texture else Texture.FULL_UV_RECT)
+        shader.set_int_uniform("uTexRepeat", mesh.is_texture_repeat())
+        # Set the mesh's vertex array as active [pooled meshes share one]
+        vert_arr: VertexArray = mesh.get_vertex_array(lod)
+        vert_arr.set_active()
+        # Draw
+        GL.glDrawElementsBaseVertex(
+            GL.GL_TRIANGLES, vert_arr.get_num_indices(), vert_arr.get_index_type(),
+            ctypes.c_void_p(vert_arr.get_index_offset()), vert_arr.get_base_vertex())
+
+    # Depth pre-pass draw: position only, no texture or material
+    @staticmethod
+    def draw_depth(shader: Shader, world: Matrix4, mesh: Mesh, lod: int) -> None:
+        shader.set_matrix_uniform("uWorldTransform", world)
+        vert_arr: VertexArray = mesh.get_vertex_array(lod)
+        vert_arr.set_active()
+        GL.glDrawElementsBaseVertex(
+            GL.GL_TRIANGLES, vert_arr.get_num_indices(), vert_arr.get_index_type(),
+            ctypes.c_void_p(vert_arr.get_index_offset()), vert_arr.get_base_vertex())
+
+    # Pick LOD from how much of the screen height the bounding sphere covers
+    # [proj_scale is the projection's y scale: cot(fovY / 2)]
+    def update_lod(self, view: Matrix4, proj_scale: float) -> None:
+        if not self._m_mesh or self._m_mesh.get_num_lods() == 1:
+            self._m_lod = 0
+            return
+
+        radius: float = self._m_mesh.get_radius() * self._m_owner.get_scale()
+        depth: float = Vector3D.transform(
+            self._m_owner.get_position(), view).z
+        if depth <= radius:
+            # Camera inside or near the sphere
+            self._m_lod = 0
+            return
+        screen_size: float = radius * proj_scale / depth
+
+        sizes: list = self._m_mesh.get_lod_screen_sizes()
+        num_lods: int = self._m_mesh.get_num_lods()
+        lod: int = min(self._m_lod, num_lods - 1)
+        # Coarser once clearly below the next level's threshold
+        while lod + 1 < num_lods and screen_size < sizes[lod + 1] * (1.0 - MeshComponent.LOD_HYSTERESIS):
+            lod += 1
+        # Finer once clearly above this level's threshold
+        while lod > 0 and screen_size > sizes[lod] * (1.0 + MeshComponent.LOD_HYSTERESIS):
+            lod -= 1
+        self._m_lod = lod
+
+    # Triangles drawn by draw() at the current LOD
+    def get_num_triangles(self) -> int:
+        if not self._m_mesh:
+            return 0
+        return self._m_mesh.get_vertex_array(self._m_lod).get_num_indices() // 3
 
     # Implementable
+    # [referenced while set, so it is never evicted in use]
     def set_mesh(self, mesh: Mesh) -> None:
+        renderer: Renderer = self._m_owner.get_game().get_renderer()
+        if mesh:
+            renderer.acquire_resource(mesh)
+        if self._m_mesh:
+            renderer.release_resource(self._m_mesh)
         self._m_mesh = mesh
+        self._m_mesh_handle = None
+        self._m_lod = 0
+
+    # Use a mesh once its background load is done
+    def set_mesh_handle(self, handle: AssetHandle) -> None:
+        self.set_mesh(None)
+        self._m_mesh_handle = handle
 
     def set_texture_index(self, index: int) -> None:
         self._m_texture_index = index
+
+    def get_lod(self) -> int:
+        return self._m_lod
+
+    # [a handle does not reference its mesh: one resolved a while ago
+    # may hold a mesh evicted since, which is then loaded again]
+    def get_mesh(self) -> Mesh:
+        handle: AssetHandle = self._m_mesh_handle
+        if handle and handle.is_done():
+            renderer: Renderer = self._m_owner.get_game().get_renderer()
+            mesh: Mesh = handle.get()
+            if mesh and not renderer.acquire_resource(mesh):
+                self._m_mesh_handle = renderer.get_mesh_async(handle.get_file_name())
+            else:
+                self.set_mesh(mesh)
+                if mesh:
+                    # set_mesh() holds its own reference
+                    renderer.release_resource(mesh)
+        return self._m_mesh
+
+    def is_occluder(self) -> bool:
+        return self._m_occluder
+
+    def set_occluder(self, occluder: bool) -> None:
+        self._m_occluder = occluder
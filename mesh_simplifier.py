@@ -0,0 +1,286 @@
+from __future__ import annotations
+import heapq
+import json
+import math
+import sys
+
+
+class MeshSimplifier:
+    """
+    This class builds coarser LODs of a mesh with quadric error edge collapses.
+
+    Collapses are half-edge collapses (one end vertex moves onto the other),
+    so every LOD keeps a subset of the original vertices and their normals
+    and texture coords stay valid. Open edges (mesh borders and UV seams)
+    get extra constraint planes so the outline is preserved.
+    """
+
+    # Weight of constraint planes along open edges
+    BOUNDARY_WEIGHT = 1000.0
+    # Default bound of build_lods(): RMS distance a collapse may move the
+    # surface, as a fraction of the bounding radius
+    MAX_ERROR = 0.03
+
+    def __init__(self, vertices: list, indices: list) -> None:
+        # Full vertex data [x, y, z, ...attributes]
+        self._m_vertices: list = vertices
+        self._m_positions: list = [tuple(v[0:3]) for v in vertices]
+        # Faces are mutated by collapses, dead ones are None
+        self._m_faces: list = [list(f) for f in indices]
+        self._m_num_faces: int = len(self._m_faces)
+        # Vertex -> indices of faces using it
+        self._m_vertex_faces: list = [set() for _ in vertices]
+        for f, face in enumerate(self._m_faces):
+            for v in face:
+                self._m_vertex_faces[v].add(f)
+        self._m_alive: list = [True] * len(vertices)
+        # Bumped when a vertex's quadric changes (invalidates heap entries)
+        self._m_versions: list = [0] * len(vertices)
+        self._m_quadrics: list = self._compute_quadrics()
+
+        self._m_heap: list = []
+        for a, b in self._edges():
+            self._push_edge(a, b)
+
+    # Collapse edges until at most target_faces faces are left
+    # [or the cheapest collapse's error is more than max_error: mean squared
+    # distance to the planes merged into it, see get_error()]
+    def simplify(self, target_faces: int, max_error: float = math.inf) -> None:
+        while self._m_num_faces > target_faces and self._m_heap:
+            entry: tuple = self._m_heap[0]
+            cost, a, b, ver_a, ver_b = entry
+            if not (self._m_alive[a] and self._m_alive[b]) or \
+                    ver_a != self._m_versions[a] or ver_b != self._m_versions[b]:
+                heapq.heappop(self._m_heap)
+                continue
+            if self.get_error(cost, a, b) > max_error:
+                break
+            heapq.heappop(self._m_heap)
+            self._collapse(a, b)
+
+    # Returns compacted (vertices, indices) of the current state
+    def get_mesh(self) -> tuple:
+        remap: dict = {}
+        vertices: list = []
+        indices: list = []
+        for face in self._m_faces:
+            if face is None:
+                continue
+            for v in face:
+                if v not in remap:
+                    remap[v] = len(vertices)
+                    vertices.append(self._m_vertices[v])
+            indices.append([remap[v] for v in face])
+        return vertices, indices
+
+    def get_num_faces(self) -> int:
+        return self._m_num_faces
+
+    # Quadric cost as a squared distance: planes are area weighted, and the
+    # weights sum to the trace of the quadric's 3x3 part (unit normals)
+    def get_error(self, cost: float, a: int, b: int) -> float:
+        q_a: list = self._m_quadrics[a]
+        q_b: list = self._m_quadrics[b]
+        weight: float = q_a[0] + q_a[4] + q_a[7] + q_b[0] + q_b[4] + q_b[7]
+        if weight <= 0.0:
+            return 0.0
+        return max(cost, 0.0) / weight
+
+    # Move vertex a onto vertex b
+    def _collapse(self, a: int, b: int) -> None:
+        faces_a: set = self._m_vertex_faces[a]
+        # Reject collapses that flip a remaining face
+        for f in faces_a:
+            face: list = self._m_faces[f]
+            if b in face:
+                continue
+            old_normal: tuple = self._face_normal(face)
+            new_normal: tuple = self._face_normal(
+                [b if v == a else v for v in face])
+            if MeshSimplifier._dot(old_normal, new_normal) <= 0.0:
+                return
+
+        for f in list(faces_a):
+            face = self._m_faces[f]
+            if b in face:
+                # Degenerate, remove from all its vertices
+                for v in face:
+                    self._m_vertex_faces[v].discard(f)
+                self._m_faces[f] = None
+                self._m_num_faces -= 1
+            else:
+                face[face.index(a)] = b
+                self._m_vertex_faces[b].add(f)
+        self._m_vertex_faces[a] = set()
+        self._m_alive[a] = False
+
+        self._m_quadrics[b] = [q_a + q_b for q_a, q_b in zip(
+            self._m_quadrics[a], self._m_quadrics[b])]
+        self._m_versions[b] += 1
+
+        # Re-cost every edge around b
+        neighbours: set = set()
+        for f in self._m_vertex_faces[b]:
+            neighbours.update(self._m_faces[f])
+        neighbours.discard(b)
+        for n in neighbours:
+            self._push_edge(b, n)
+
+    def _push_edge(self, a: int, b: int) -> None:
+        quadric: list = [q_a + q_b for q_a, q_b in zip(
+            self._m_quadrics[a], self._m_quadrics[b])]
+        cost_ab: float = MeshSimplifier._evaluate(quadric, self._m_positions[b])
+        cost_ba: float = MeshSimplifier._evaluate(quadric, self._m_positions[a])
+        if cost_ab <= cost_ba:
+            entry = (cost_ab, a, b, self._m_versions[a], self._m_versions[b])
+        else:
+            entry = (cost_ba, b, a, self._m_versions[b], self._m_versions[a])
+        heapq.heappush(self._m_heap, entry)
+
+    def _edges(self) -> set:
+        edges: set = set()
+        for face in self._m_faces:
+            for i in range(3):
+                a, b = face[i], face[(i + 1) % 3]
+                edges.add((min(a, b), max(a, b)))
+        return edges
+
+    # Area weighted plane quadrics, plus constraint planes on open edges
+    def _compute_quadrics(self) -> list:
+        quadrics: list = [[0.0] * 10 for _ in self._m_vertices]
+        edge_faces: dict = {}
+        for face in self._m_faces:
+            normal, area = self._face_plane(face)
+            if area == 0.0:
+                continue
+            p0: tuple = self._m_positions[face[0]]
+            plane: list = MeshSimplifier._plane_quadric(normal, p0, area)
+            for v in face:
+                quadrics[v] = [q + p for q, p in zip(quadrics[v], plane)]
+            for i in range(3):
+                a, b = face[i], face[(i + 1) % 3]
+                edge_faces.setdefault((min(a, b), max(a, b)), []).append(
+                    (a, b, normal))
+
+        for users in edge_faces.values():
+            if len(users) != 1:
+                continue
+            a, b, normal = users[0]
+            p_a: tuple = self._m_positions[a]
+            p_b: tuple = self._m_positions[b]
+            edge: tuple = (p_b[0] - p_a[0], p_b[1] - p_a[1], p_b[2] - p_a[2])
+            side: tuple = MeshSimplifier._cross(edge, normal)
+            length: float = math.sqrt(MeshSimplifier._dot(side, side))
+            if length == 0.0:
+                continue
+            side = (side[0] / length, side[1] / length, side[2] / length)
+            plane = MeshSimplifier._plane_quadric(
+                side, p_a, MeshSimplifier.BOUNDARY_WEIGHT * MeshSimplifier._dot(edge, edge))
+            for v in (a, b):
+                quadrics[v] = [q + p for q, p in zip(quadrics[v], plane)]
+        return quadrics
+
+    # Unit normal and area of a face
+    def _face_plane(self, face: list) -> tuple:
+        normal: tuple = self._face_normal(face)
+        length: float = math.sqrt(MeshSimplifier._dot(normal, normal))
+        if length == 0.0:
+            return normal, 0.0
+        return (normal[0] / length, normal[1] / length, normal[2] / length), length * 0.5
+
+    # Unnormalized face normal
+    def _face_normal(self, face: list) -> tuple:
+        p0, p1, p2 = (self._m_positions[v] for v in face)
+        e1: tuple = (p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2])
+        e2: tuple = (p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2])
+        return MeshSimplifier._cross(e1, e2)
+
+    # Symmetric 4x4 quadric of plane (n, d) stored as 10 floats
+    @staticmethod
+    def _plane_quadric(normal: tuple, point: tuple, weight: float) -> list:
+        a, b, c = normal
+        d: float = -MeshSimplifier._dot(normal, point)
+        return [weight * x for x in (a * a, a * b, a * c, a * d, b * b, b * c, b * d,
+                                     c * c, c * d, d * d)]
+
+    @staticmethod
+    def _evaluate(q: list, p: tuple) -> float:
+        x, y, z = p
+        return (q[0] * x * x + 2.0 * q[1] * x * y + 2.0 * q[2] * x * z + 2.0 * q[3] * x +
+                q[4] * y * y + 2.0 * q[5] * y * z + 2.0 * q[6] * y +
+                q[7] * z * z + 2.0 * q[8] * z + q[9])
+
+    @staticmethod
+    def _dot(a: tuple, b: tuple) -> float:
+        return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+    @staticmethod
+    def _cross(a: tuple, b: tuple) -> tuple:
+        return (a[1] * b[2] - a[2] * b[1],
+                a[2] * b[0] - a[0] * b[2],
+                a[0] * b[1] - a[1] * b[0])
+
+
+# Add "lods" and "lodScreenSizes" to .gpmesh data
+# [max_error: RMS surface distance as a fraction of the bounding radius;
+# no more levels once a collapse would move the surface further]
+def build_lods(data: dict, num_lods: int, ratio: float,
+               max_error: float = MeshSimplifier.MAX_ERROR) -> dict:
+    simplifier = MeshSimplifier(data["vertices"], data["indices"])
+    radius: float = max(math.sqrt(MeshSimplifier._dot(v[0:3], v[0:3]))
+                        for v in data["vertices"])
+    max_error_sq: float = (max_error * radius) ** 2
+    lods: list = []
+    screen_sizes: list = [1.0]
+    target: float = simplifier.get_num_faces()
+    for level in range(1, num_lods + 1):
+        num_faces: int = simplifier.get_num_faces()
+        target *= ratio
+        simplifier.simplify(int(target), max_error_sq)
+        if simplifier.get_num_faces() > (num_faces + target) / 2.0:
+            # Not even halfway to the target within the bound
+            break
+        vertices, indices = simplifier.get_mesh()
+        lods.append({"vertices": vertices, "indices": indices})
+        # Switch once the mesh covers less of the screen height than this
+        screen_sizes.append(0.5 ** (level + 1))
+        if simplifier.get_num_faces() > int(target):
+            # Error bound hit before the target: coarser levels would be worse
+            break
+
+    data = dict(data)
+    data["lods"] = lods
+    data["lodScreenSizes"] = screen_sizes
+    return data
+
+
+# Offline: python mesh_simplifier.py <in.gpmesh> <out.gpmesh>
+def main(argv: list) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Add simplified LODs to a .gpmesh file")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--lods", type=int, default=3,
+                        help="number of coarser levels")
+    parser.add_argument("--ratio", type=float, default=0.5,
+                        help="triangle ratio between levels")
+    parser.add_argument("--max-error", type=float, default=MeshSimplifier.MAX_ERROR,
+                        help="stop collapsing past this RMS surface distance "
+                        "(fraction of the bounding radius)")
+    args = parser.parse_args(argv[1:])
+
+    with open(args.input, "r") as file_obj:
+        data = json.load(file_obj)
+    data = build_lods(data, args.lods, args.ratio, args.max_error)
+    with open(args.output, "w") as file_obj:
+        json.dump(data, file_obj, indent="\t")
+
+    counts: list = [len(data["indices"])] + [len(lod["indices"])
+                                             for lod in data["lods"]]
+    print("triangles per LOD: {}".format(counts))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
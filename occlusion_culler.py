@@ -0,0 +1,195 @@
+from __future__ import annotations
+import time
+import numpy as np
+from maths import Matrix4
+
+
+class OcclusionCuller:
+    """
+    This class culls objects hidden behind occluders on the CPU.
+
+    Occluder triangles are rasterized into a small depth buffer with the
+    same view/projection as the renderer. A hierarchical-Z chain (max depth
+    per 2x2 block) is then built, and each bounding sphere is tested
+    against a few texels of the level that matches its screen size.
+    Depths are z/w in [0, 1] (1 is the far plane).
+    """
+
+    # Sphere box corners as unit offsets
+    BOX_CORNERS = np.array([[x, y, z] for x in (-1.0, 1.0)
+                            for y in (-1.0, 1.0) for z in (-1.0, 1.0)], dtype=np.float32)
+
+    def __init__(self, width: int = 256, height: int = 128) -> None:
+        self._m_width: int = width
+        self._m_height: int = height
+        self._m_depth: np.ndarray = np.ones((height, width), dtype=np.float32)
+        # Level 0 is self._m_depth
+        self._m_hiz: list = [self._m_depth]
+        # Row-vector view-projection (clip = v * view_proj)
+        self._m_view_proj: np.ndarray = np.identity(4, dtype=np.float32)
+
+        # Stats of the current frame
+        self._m_num_occluder_triangles: int = 0
+        self._m_num_tested: int = 0
+        self._m_num_occluded: int = 0
+        self._m_time: float = 0.0
+
+    # Clear depth and set camera for a new frame
+    def begin_frame(self, view: Matrix4, projection: Matrix4) -> None:
+        start: float = time.perf_counter()
+        self._m_view_proj = OcclusionCuller.to_array(view) @ OcclusionCuller.to_array(projection)
+        self._m_depth.fill(1.0)
+        self._m_hiz = [self._m_depth]
+        self._m_num_occluder_triangles = 0
+        self._m_num_tested = 0
+        self._m_num_occluded = 0
+        self._m_time = time.perf_counter() - start
+
+    # Rasterize occluder triangles (positions (n, 3), indices (m, 3)) into depth
+    def rasterize(self, positions: np.ndarray, indices: np.ndarray, world: Matrix4) -> None:
+        start: float = time.perf_counter()
+        clip: np.ndarray = self._to_clip(
+            positions, OcclusionCuller.to_array(world) @ self._m_view_proj)
+        tris: np.ndarray = clip[indices]                   # (m, 3, 4)
+
+        # Drop triangles crossing the near plane [occluders may only shrink]
+        keep: np.ndarray = np.all(tris[:, :, 2] >= 0.0, axis=1) & np.all(tris[:, :, 3] > 0.0, axis=1)
+        tris = tris[keep]
+        screen: np.ndarray = self._to_screen(tris)         # (m, 3, 3) x, y, depth
+
+        # Signed area, degenerate ones cover no pixel centre
+        e1: np.ndarray = screen[:, 1, 0:2] - screen[:, 0, 0:2]
+        e2: np.ndarray = screen[:, 2, 0:2] - screen[:, 0, 0:2]
+        areas: np.ndarray = e1[:, 0] * e2[:, 1] - e1[:, 1] * e2[:, 0]
+        screen = screen[np.abs(areas) > 1e-8]
+        areas = areas[np.abs(areas) > 1e-8]
+
+        mins: np.ndarray = np.floor(screen[:, :, 0:2].min(axis=1)).astype(np.int64)
+        maxs: np.ndarray = np.ceil(screen[:, :, 0:2].max(axis=1)).astype(np.int64)
+        mins = np.maximum(mins, 0)
+        maxs[:, 0] = np.minimum(maxs[:, 0], self._m_width - 1)
+        maxs[:, 1] = np.minimum(maxs[:, 1], self._m_height - 1)
+
+        for tri, area, (x0, y0), (x1, y1) in zip(screen, areas, mins, maxs):
+            if x0 > x1 or y0 > y1:
+                continue
+            self._m_num_occluder_triangles += 1
+            # Pixel centres of the bounding box
+            px: np.ndarray = np.arange(x0, x1 + 1, dtype=np.float32) + 0.5
+            py: np.ndarray = np.arange(y0, y1 + 1, dtype=np.float32)[:, None] + 0.5
+            # Barycentric weights from edge functions (sign fixed by area)
+            w0: np.ndarray = OcclusionCuller._edge(tri[1], tri[2], px, py) / area
+            w1: np.ndarray = OcclusionCuller._edge(tri[2], tri[0], px, py) / area
+            w2: np.ndarray = 1.0 - w0 - w1
+            inside: np.ndarray = (w0 >= 0.0) & (w1 >= 0.0) & (w2 >= 0.0)
+            depth: np.ndarray = w0 * tri[0, 2] + w1 * tri[1, 2] + w2 * tri[2, 2]
+            region: np.ndarray = self._m_depth[y0:y1 + 1, x0:x1 + 1]
+            np.minimum(region, np.where(inside, depth, 1.0), out=region)
+        self._m_time += time.perf_counter() - start
+
+    # Build the max-depth mip chain once all occluders are rasterized
+    def build_hiz(self) -> None:
+        start: float = time.perf_counter()
+        self._m_hiz = [self._m_depth]
+        level: np.ndarray = self._m_depth
+        while level.shape[0] > 1 or level.shape[1] > 1:
+            height, width = level.shape
+            # Pad odd sizes with far depth (keeps the max conservative)
+            padded: np.ndarray = np.ones(
+                (height + height % 2, width + width % 2), dtype=np.float32)
+            padded[:height, :width] = level
+            level = padded.reshape(padded.shape[0] // 2, 2,
+                                   padded.shape[1] // 2, 2).max(axis=(1, 3))
+            self._m_hiz.append(level)
+        self._m_time += time.perf_counter() - start
+
+    # Returns a bool per sphere: False when fully behind occluders
+    def test_spheres(self, centers: np.ndarray, radii: np.ndarray) -> np.ndarray:
+        start: float = time.perf_counter()
+        num: int = len(centers)
+        visible: np.ndarray = np.ones(num, dtype=bool)
+        if num == 0:
+            return visible
+
+        corners: np.ndarray = (centers[:, None, :] + radii[:, None, None] *
+                               OcclusionCuller.BOX_CORNERS).reshape(-1, 3)
+        clip: np.ndarray = self._to_clip(corners, self._m_view_proj).reshape(num, 8, 4)
+        # Boxes crossing the near plane are always visible
+        in_front: np.ndarray = np.all(clip[:, :, 2] >= 0.0, axis=1) & np.all(clip[:, :, 3] > 0.0, axis=1)
+        screen: np.ndarray = self._to_screen(np.where(
+            in_front[:, None, None], clip, 1.0))
+
+        x0: np.ndarray = np.floor(screen[:, :, 0].min(axis=1)).astype(np.int64)
+        x1: np.ndarray = np.floor(screen[:, :, 0].max(axis=1)).astype(np.int64)
+        y0: np.ndarray = np.floor(screen[:, :, 1].min(axis=1)).astype(np.int64)
+        y1: np.ndarray = np.floor(screen[:, :, 1].max(axis=1)).astype(np.int64)
+        nearest: np.ndarray = screen[:, :, 2].min(axis=1)
+        # Off-screen objects are left to frustum culling
+        on_screen: np.ndarray = ((x1 >= 0) & (x0 < self._m_width) &
+                                 (y1 >= 0) & (y0 < self._m_height))
+        x0 = np.clip(x0, 0, self._m_width - 1)
+        x1 = np.clip(x1, 0, self._m_width - 1)
+        y0 = np.clip(y0, 0, self._m_height - 1)
+        y1 = np.clip(y1, 0, self._m_height - 1)
+
+        # Level where the rect spans at most 2x2 texels
+        extent: np.ndarray = np.maximum(x1 - x0, y1 - y0) + 1
+        levels: np.ndarray = np.ceil(np.log2(extent)).astype(np.int64)
+        levels = np.minimum(levels, len(self._m_hiz) - 1)
+
+        farthest: np.ndarray = np.ones(num, dtype=np.float32)
+        candidates: np.ndarray = in_front & on_screen
+        for level in np.unique(levels[candidates]):
+            sel: np.ndarray = np.flatnonzero(candidates & (levels == level))
+            hiz: np.ndarray = self._m_hiz[level]
+            lx0: np.ndarray = np.minimum(x0[sel] >> level, hiz.shape[1] - 1)
+            lx1: np.ndarray = np.minimum(x1[sel] >> level, hiz.shape[1] - 1)
+            ly0: np.ndarray = np.minimum(y0[sel] >> level, hiz.shape[0] - 1)
+            ly1: np.ndarray = np.minimum(y1[sel] >> level, hiz.shape[0] - 1)
+            farthest[sel] = np.maximum(
+                np.maximum(hiz[ly0, lx0], hiz[ly0, lx1]),
+                np.maximum(hiz[ly1, lx0], hiz[ly1, lx1]))
+
+        visible = ~candidates | (nearest <= farthest)
+        self._m_num_tested += num
+        self._m_num_occluded += int(num - np.count_nonzero(visible))
+        self._m_time += time.perf_counter() - start
+        return visible
+
+    # Matrix4 as (4, 4) float32 array [row vectors]
+    @staticmethod
+    def to_array(mat: Matrix4) -> np.ndarray:
+        return np.frombuffer(bytes(mat.m_mat), dtype=np.float32).reshape(4, 4)
+
+    @staticmethod
+    def _to_clip(positions: np.ndarray, mat: np.ndarray) -> np.ndarray:
+        return positions.astype(np.float32) @ mat[0:3] + mat[3]
+
+    # Clip (..., 4) -> screen (..., 3): pixel x, pixel y (row 0 at top), depth
+    def _to_screen(self, clip: np.ndarray) -> np.ndarray:
+        ndc: np.ndarray = clip[..., 0:3] / clip[..., 3:4]
+        screen: np.ndarray = np.empty_like(ndc)
+        screen[..., 0] = (ndc[..., 0] + 1.0) * 0.5 * self._m_width
+        screen[..., 1] = (1.0 - ndc[..., 1]) * 0.5 * self._m_height
+        screen[..., 2] = ndc[..., 2]
+        return screen
+
+    @staticmethod
+    def _edge(a: np.ndarray, b: np.ndarray, px: np.ndarray, py: np.ndarray) -> np.ndarray:
+        return (b[0] - a[0]) * (py - a[1]) - (b[1] - a[1]) * (px - a[0])
+
+    def get_depth(self) -> np.ndarray:
+        return self._m_depth
+
+    def get_num_occluder_triangles(self) -> int:
+        return self._m_num_occluder_triangles
+
+    def get_num_tested(self) -> int:
+        return self._m_num_tested
+
+    def get_num_occluded(self) -> int:
+        return self._m_num_occluded
+
+    # CPU time spent this frame (ms)
+    def get_time_ms(self) -> float:
+        return self._m_time * 1000.0
@@ -0,0 +1,202 @@
+from __future__ import annotations
+from gl_backend import GL
+import ctypes
+import numpy as np
+from gl_state import state_cache
+
+
+class PixelBuffer:
+    """
+    This class is one pixel buffer object of a PixelUploadRing.
+
+    While mapped, get_data() is a NumPy view of its memory; the view can
+    be filled from any thread, but must not be touched after submit().
+    """
+
+    def __init__(self, size: int) -> None:
+        self._m_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        self._m_size: int = size
+        # Fence of the last copy out of this buffer (None = free)
+        self._m_fence = None
+        self._m_data: np.ndarray = None
+
+        GL.glGenBuffers(1, ctypes.byref(self._m_buffer_id))
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, self._m_buffer_id)
+        GL.glBufferData(GL.GL_PIXEL_UNPACK_BUFFER, size, None, GL.GL_STREAM_DRAW)
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+
+    def delete(self) -> None:
+        if self._m_fence is not None:
+            GL.glDeleteSync(self._m_fence)
+            self._m_fence = None
+        GL.glDeleteBuffers(1, ctypes.byref(self._m_buffer_id))
+
+    # True once the GPU finished reading it [never blocks]
+    def is_free(self) -> bool:
+        return self.wait(0)
+
+    # Block until free or timeout_ns passed [counts as a stall]
+    # Returns False on timeout; the fence is kept, the buffer is still busy
+    def wait(self, timeout_ns: int) -> bool:
+        if self._m_fence is None:
+            return True
+        status = GL.glClientWaitSync(
+            self._m_fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT if timeout_ns else 0, timeout_ns)
+        if status in (GL.GL_ALREADY_SIGNALED, GL.GL_CONDITION_SATISFIED):
+            GL.glDeleteSync(self._m_fence)
+            self._m_fence = None
+            return True
+        return False
+
+    # Map for writing; nothing in flight reads it, so no driver sync
+    # [synchronized: still busy, the driver makes the map wait for the GPU]
+    def map(self, synchronized: bool = False) -> np.ndarray:
+        access: int = GL.GL_MAP_WRITE_BIT | GL.GL_MAP_INVALIDATE_BUFFER_BIT
+        if synchronized:
+            # The map is ordered after the copy the fence guarded
+            if self._m_fence is not None:
+                GL.glDeleteSync(self._m_fence)
+                self._m_fence = None
+        else:
+            access |= GL.GL_MAP_UNSYNCHRONIZED_BIT
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, self._m_buffer_id)
+        pointer = GL.glMapBufferRange(GL.GL_PIXEL_UNPACK_BUFFER, 0, self._m_size, access)
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+        address: int = ctypes.cast(pointer, ctypes.c_void_p).value
+        self._m_data = np.ctypeslib.as_array(
+            ctypes.cast(address, ctypes.POINTER(ctypes.c_ubyte)), (self._m_size,))
+        return self._m_data
+
+    def is_busy(self) -> bool:
+        return self._m_fence is not None
+
+    # Unmap and leave it bound to GL_PIXEL_UNPACK_BUFFER for the copy
+    def unmap(self) -> None:
+        self._m_data = None
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, self._m_buffer_id)
+        GL.glUnmapBuffer(GL.GL_PIXEL_UNPACK_BUFFER)
+
+    def set_fence(self) -> None:
+        self._m_fence = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+    def get_data(self) -> np.ndarray:
+        return self._m_data
+
+    def get_size(self) -> int:
+        return self._m_size
+
+
+class PixelUploadRing:
+    """
+    This class streams pixels to textures through a ring of pixel buffers.
+
+    Pixels are copied into a mapped pixel buffer object, and
+    glTexSubImage2D then reads them from the buffer, so the call returns
+    at once and the driver copies while the CPU moves on. Each buffer
+    gets a fence after its copy and is only mapped unsynchronized once
+    the fence has signaled, so in-flight data is never overwritten (a
+    wait that times out maps with the driver's synchronization instead).
+    Buffers are created once and reused.
+
+    upload() does it all on the GL thread, splitting large images into
+    row bands. For writing from a worker thread, acquire() a buffer on
+    the GL thread, fill get_data() anywhere, then submit() on the GL
+    thread.
+    """
+
+    # Longest wait for a busy buffer (ns)
+    WAIT_TIMEOUT_NS = 100 * 1000 * 1000
+
+    def __init__(self, num_buffers: int = 4, buffer_size: int = 4 * 1024 * 1024) -> None:
+        self._m_buffers: list = [PixelBuffer(buffer_size) for _ in range(num_buffers)]
+        self._m_next: int = 0
+        self._m_num_uploads: int = 0
+        self._m_num_bytes: int = 0
+        # Times upload() had to wait for a buffer
+        self._m_num_waits: int = 0
+        # Waits that timed out (the buffer was mapped synchronized)
+        self._m_num_timeouts: int = 0
+
+    def delete(self) -> None:
+        for buffer in self._m_buffers:
+            buffer.delete()
+        self._m_buffers.clear()
+
+    # Map the next buffer if the GPU is done with it, otherwise None
+    def acquire(self) -> PixelBuffer:
+        buffer: PixelBuffer = self._m_buffers[self._m_next]
+        if not buffer.is_free():
+            return None
+        return self._map_next(False)
+
+    # Copy a filled buffer into a texture rectangle (pixels start at offset 0)
+    def submit(self, buffer: PixelBuffer, texture_id: int, level: int, x: int, y: int,
+               width: int, height: int, pixel_format: GL.GLenum = GL.GL_RGBA) -> None:
+        buffer.unmap()
+        row_size: int = width * PixelUploadRing._pixel_size(pixel_format)
+        state_cache.bind_texture(GL.GL_TEXTURE_2D, texture_id)
+        if row_size % 4:
+            GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+        GL.glTexSubImage2D(GL.GL_TEXTURE_2D, level, x, y, width, height,
+                           pixel_format, GL.GL_UNSIGNED_BYTE, None)
+        if row_size % 4:
+            GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 4)
+        buffer.set_fence()
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+        self._m_num_uploads += 1
+        self._m_num_bytes += row_size * height
+
+    # Stream pixels (height, width, channels) into a texture [GL thread]
+    # [the texture stays bound to the active unit]
+    def upload(self, texture_id: int, level: int, x: int, y: int, pixels: np.ndarray) -> None:
+        height, width, channels = pixels.shape
+        pixel_format: GL.GLenum = GL.GL_RGBA if channels == 4 else GL.GL_RGB
+        row_size: int = width * channels
+        rows_per_band: int = self._m_buffers[0].get_size() // row_size
+        if rows_per_band == 0:
+            # Row larger than a buffer: copy directly
+            state_cache.bind_texture(GL.GL_TEXTURE_2D, texture_id)
+            GL.glTexSubImage2D(GL.GL_TEXTURE_2D, level, x, y, width, height,
+                               pixel_format, GL.GL_UNSIGNED_BYTE, np.ascontiguousarray(pixels))
+            return
+        for row in range(0, height, rows_per_band):
+            band: np.ndarray = pixels[row:row + rows_per_band]
+            buffer: PixelBuffer = self.acquire()
+            if buffer is None:
+                # Ring is full of in-flight copies: wait for the oldest
+                self._m_num_waits += 1
+                if self._m_buffers[self._m_next].wait(PixelUploadRing.WAIT_TIMEOUT_NS):
+                    buffer = self._map_next(False)
+                else:
+                    # GPU still reading it: never map it unsynchronized
+                    self._m_num_timeouts += 1
+                    buffer = self._map_next(True)
+            buffer.get_data()[0:band.shape[0] * row_size].reshape(band.shape)[...] = band
+            self.submit(buffer, texture_id, level, x, y + row, width, band.shape[0],
+                        pixel_format)
+
+    def get_num_buffers(self) -> int:
+        return len(self._m_buffers)
+
+    def get_num_uploads(self) -> int:
+        return self._m_num_uploads
+
+    def get_num_bytes(self) -> int:
+        return self._m_num_bytes
+
+    def get_num_waits(self) -> int:
+        return self._m_num_waits
+
+    def get_num_timeouts(self) -> int:
+        return self._m_num_timeouts
+
+    # Map the next buffer and move past it
+    def _map_next(self, synchronized: bool) -> PixelBuffer:
+        buffer: PixelBuffer = self._m_buffers[self._m_next]
+        self._m_next = (self._m_next + 1) % len(self._m_buffers)
+        buffer.map(synchronized)
+        return buffer
+
+    @staticmethod
+    def _pixel_size(pixel_format: GL.GLenum) -> int:
+        return 3 if pixel_format in (GL.GL_RGB, GL.GL_BGR) else 4
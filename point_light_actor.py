@@ -0,0 +1,51 @@
+from __future__ import annotations
+from maths import Vector3D
+from actor import Actor
+
+
+class PointLightActor(Actor):
+    """
+    This class is a light that shines in all directions up to a radius.
+
+    Point lights are binned into clusters by the renderer, so a scene can
+    hold hundreds of them.
+    """
+
+    def __init__(self, game: Game) -> None:
+        super().__init__(game)
+
+        self._m_diffuse_color: Vector3D = Vector3D(1.0, 1.0, 1.0)
+        # Light fades to zero at this distance
+        self._m_radius: float = 200.0
+
+        self.get_game().get_renderer().add_point_light(self)
+
+    def delete(self) -> None:
+        super().delete()
+        self.get_game().get_renderer().remove_point_light(self)
+
+    # Packed as pos.xyz, radius, color.rgb, cos outer, dir.xyz, cos inner
+    def get_light_data(self) -> tuple:
+        pos: Vector3D = self.get_position()
+        color: Vector3D = self._m_diffuse_color
+        direction: Vector3D = self.get_forward()
+        cos_outer, cos_inner = self.get_cone_cosines()
+        return (pos.x, pos.y, pos.z, self._m_radius,
+                color.x, color.y, color.z, cos_outer,
+                direction.x, direction.y, direction.z, cos_inner)
+
+    # Point lights have no cone [cos outer below -1 marks "no cone"]
+    def get_cone_cosines(self) -> tuple:
+        return (-2.0, -1.0)
+
+    def get_diffuse_color(self) -> Vector3D:
+        return self._m_diffuse_color
+
+    def set_diffuse_color(self, color: Vector3D) -> None:
+        self._m_diffuse_color = color
+
+    def get_radius(self) -> float:
+        return self._m_radius
+
+    def set_radius(self, radius: float) -> None:
+        self._m_radius = radius
@@ -0,0 +1,108 @@
+from __future__ import annotations
+from gl_backend import GL
+import hashlib
+import ctypes
+import os
+import struct
+
+
+class ProgramCache:
+    """
+    This class stores linked shader programs as driver binaries on disk.
+
+    Entries are keyed by a hash of the shader sources (with variant
+    defines) plus the GL vendor/renderer/version strings, so a driver
+    update or an edited shader simply misses the cache. Each file holds
+    the binary format (uint32) followed by the program binary.
+    """
+
+    def __init__(self, folder: str) -> None:
+        self._m_folder: str = folder
+        self._m_driver: bytes = b""
+        self._m_enabled: bool = False
+        self._m_num_hits: int = 0
+        self._m_num_misses: int = 0
+
+    # Call with a current context; disables itself if binaries are unsupported
+    def initialize(self) -> None:
+        try:
+            num_formats: int = int(GL.glGetIntegerv(
+                GL.GL_NUM_PROGRAM_BINARY_FORMATS))
+        except GL.GLError:
+            num_formats = 0
+        self._m_enabled = num_formats > 0
+        self._m_driver = b"|".join(GL.glGetString(name) or b"" for name in (
+            GL.GL_VENDOR, GL.GL_RENDERER, GL.GL_VERSION))
+        if self._m_enabled:
+            os.makedirs(self._m_folder, exist_ok=True)
+
+    def get_key(self, sources: list) -> str:
+        digest = hashlib.sha256(self._m_driver)
+        for source in sources:
+            digest.update(b"\0")
+            digest.update(source)
+        return digest.hexdigest()
+
+    # Try to load a binary into program; True if it linked
+    def load(self, program: int, key: str) -> bool:
+        if not self._m_enabled:
+            return False
+        try:
+            with open(self._path(key), "rb") as file_obj:
+                data: bytes = file_obj.read()
+        except OSError:
+            self._m_num_misses += 1
+            return False
+        if len(data) < 4:
+            # Empty or cut short (e.g. by a crash while writing)
+            self._m_num_misses += 1
+            return False
+
+        binary_format: int = struct.unpack_from("<I", data)[0]
+        binary: bytes = data[4:]
+        GL.glProgramBinary(program, binary_format, binary, len(binary))
+        if GL.glGetProgramiv(program, GL.GL_LINK_STATUS) != GL.GL_TRUE:
+            # Rejected by the driver (e.g. after an update), recompile
+            self._m_num_misses += 1
+            return False
+        self._m_num_hits += 1
+        return True
+
+    # Store the binary of a linked program
+    def save(self, program: int, key: str) -> None:
+        if not self._m_enabled:
+            return
+        length: int = int(GL.glGetProgramiv(program, GL.GL_PROGRAM_BINARY_LENGTH))
+        if length <= 0:
+            return
+        binary = (ctypes.c_ubyte * length)()
+        written: ctypes.c_int = ctypes.c_int(0)
+        binary_format: ctypes.c_uint = ctypes.c_uint(0)
+        GL.glGetProgramBinary(program, length, ctypes.byref(written),
+                              ctypes.byref(binary_format), binary)
+        # Written aside and renamed, so a crash never leaves a partial entry
+        temp_path: str = self._path(key) + ".tmp"
+        with open(temp_path, "wb") as file_obj:
+            file_obj.write(struct.pack("<I", binary_format.value))
+            file_obj.write(bytes(binary)[:written.value])
+        os.replace(temp_path, self._path(key))
+
+    # Delete all cached binaries
+    def clear(self) -> None:
+        if not os.path.isdir(self._m_folder):
+            return
+        for name in os.listdir(self._m_folder):
+            if name.endswith((".bin", ".tmp")):
+                os.remove(os.path.join(self._m_folder, name))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._m_folder, key + ".bin")
+
+    def is_enabled(self) -> bool:
+        return self._m_enabled
+
+    def get_num_hits(self) -> int:
+        return self._m_num_hits
+
+    def get_num_misses(self) -> int:
+        return self._m_num_misses
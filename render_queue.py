@@ -0,0 +1,153 @@
+from __future__ import annotations
+import threading
+import time
+import sdl2
+import numpy as np
+
+
+class RenderSnapshot:
+    """
+    This class is an immutable record of everything one frame draws.
+
+    It is built on the update thread from actors and components and then
+    only read by the render thread, so the next update may run while the
+    previous snapshot is being submitted to GL. Matrices are referenced,
+    not copied: actors replace their world transform, never mutate it.
+    """
+
+    def __init__(self, view: Matrix4, projection: Matrix4, ambient_light: tuple,
+                 dir_light: tuple, mesh_draws: tuple, sprite_vertices: np.ndarray,
+                 sprite_runs: tuple, light_data: np.ndarray, light_grid: np.ndarray,
+                 light_indices: np.ndarray, num_triangles: int,
+                 depth_prepass: bool = False) -> None:
+        self._m_time_created: float = time.perf_counter()
+        self._m_view: Matrix4 = view
+        self._m_projection: Matrix4 = projection
+        # (r, g, b)
+        self._m_ambient_light: tuple = ambient_light
+        # (direction, diffuse color, spec color) as (x, y, z) tuples
+        self._m_dir_light: tuple = dir_light
+        # (world transform, mesh, texture, lod) per mesh component, front to back
+        self._m_mesh_draws: tuple = mesh_draws
+        # World-space sprite quads and (texture, start, count) runs
+        self._m_sprite_vertices: np.ndarray = sprite_vertices
+        self._m_sprite_runs: tuple = sprite_runs
+        # Clustered lights
+        self._m_light_data: np.ndarray = light_data
+        self._m_light_grid: np.ndarray = light_grid
+        self._m_light_indices: np.ndarray = light_indices
+        self._m_num_triangles: int = num_triangles
+        # Lay down depth first, then shade only visible fragments
+        self._m_depth_prepass: bool = depth_prepass
+
+        for array in (sprite_vertices, light_data, light_grid, light_indices):
+            array.flags.writeable = False
+
+    def get_time_created(self) -> float:
+        return self._m_time_created
+
+    def get_view(self) -> Matrix4:
+        return self._m_view
+
+    def get_projection(self) -> Matrix4:
+        return self._m_projection
+
+    def get_ambient_light(self) -> tuple:
+        return self._m_ambient_light
+
+    def get_dir_light(self) -> tuple:
+        return self._m_dir_light
+
+    def get_mesh_draws(self) -> tuple:
+        return self._m_mesh_draws
+
+    def get_sprite_vertices(self) -> np.ndarray:
+        return self._m_sprite_vertices
+
+    def get_sprite_runs(self) -> tuple:
+        return self._m_sprite_runs
+
+    def get_light_data(self) -> np.ndarray:
+        return self._m_light_data
+
+    def get_light_grid(self) -> np.ndarray:
+        return self._m_light_grid
+
+    def get_light_indices(self) -> np.ndarray:
+        return self._m_light_indices
+
+    def get_num_triangles(self) -> int:
+        return self._m_num_triangles
+
+    def is_depth_prepass(self) -> bool:
+        return self._m_depth_prepass
+
+
+class RenderQueue:
+    """
+    This class hands snapshots from the update thread to the render thread.
+
+    It has two slots: the snapshot being drawn (owned by the render thread)
+    and one pending snapshot. submit() waits while the pending slot is still
+    full, so simulation runs at most one frame ahead of GL submission.
+    """
+
+    def __init__(self) -> None:
+        self._m_condition: threading.Condition = threading.Condition()
+        self._m_pending: RenderSnapshot = None
+        self._m_closed: bool = False
+
+    # Update thread: returns seconds spent waiting for a free slot
+    def submit(self, snapshot: RenderSnapshot) -> float:
+        start: float = time.perf_counter()
+        with self._m_condition:
+            while self._m_pending is not None and not self._m_closed:
+                self._m_condition.wait()
+            self._m_pending = snapshot
+            self._m_condition.notify_all()
+        return time.perf_counter() - start
+
+    # Render thread: next snapshot, or None once closed
+    def acquire(self) -> RenderSnapshot:
+        with self._m_condition:
+            while self._m_pending is None and not self._m_closed:
+                self._m_condition.wait()
+            snapshot: RenderSnapshot = self._m_pending
+            self._m_pending = None
+            self._m_condition.notify_all()
+            return snapshot
+
+    def close(self) -> None:
+        with self._m_condition:
+            self._m_closed = True
+            self._m_condition.notify_all()
+
+
+class RenderThread(threading.Thread):
+    """
+    This class owns the GL context and draws queued snapshots.
+    """
+
+    def __init__(self, renderer: Renderer) -> None:
+        super().__init__(name="RenderThread", daemon=True)
+        self._m_renderer: Renderer = renderer
+        self._m_queue: RenderQueue = RenderQueue()
+
+    def run(self) -> None:
+        window, context = self._m_renderer.get_window_and_context()
+        sdl2.SDL_GL_MakeCurrent(window, context)
+        while True:
+            snapshot: RenderSnapshot = self._m_queue.acquire()
+            if snapshot is None:
+                break
+            self._m_renderer.draw_snapshot(snapshot)
+        # Hand context back to whoever joins us
+        sdl2.SDL_GL_MakeCurrent(window, None)
+
+    def submit(self, snapshot: RenderSnapshot) -> float:
+        return self._m_queue.submit(snapshot)
+
+    # Stop after the pending snapshot is drawn
+    def stop(self) -> None:
+        self._m_queue.close()
+        self.join()
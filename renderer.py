@@ -1,14 +1,32 @@
 from __future__ import annotations
 import sdl2dll      # SDL DLLs
 import sdl2         # SDL
-import sdl2.sdlimage as sdlimage    # SDL Image
-import OpenGL.GL as GL
+from gl_backend import GL
+from gl_fast_path import GLFastPath
 
 from vertex_array import VertexArray
+from geometry_pool import geometry_pools
 from shader import Shader
+from program_cache import ProgramCache
 from maths import Matrix4, Vector3D, to_radians
 from texture import Texture
 from mesh import Mesh
+from sprite_batch import SpriteBatch
+from gl_state import state_cache
+from occlusion_culler import OcclusionCuller
+from clustered_lights import LightClusterer, ClusteredLightBuffers
+from mesh_component import MeshComponent
+from render_queue import RenderSnapshot, RenderThread
+from frame_stats import FrameStats
+from gpu_timer import GpuTimer
+from asset_loader import AssetLoader, AssetHandle
+from resource_manager import ResourceManager
+from pixel_upload_ring import PixelUploadRing
+from startup_profiler import startup_profiler
+import threading
+import time
+import numpy as np
+import math
 import ctypes
 
 # Struct for directional ligh
@@ -23,10 +41,8 @@ class DirectionalLight:
 
 class Renderer:
     def __init__(self, game: Game) -> None:
-        # Map of loaded textures
-        self._m_textures = {}
-        # Map of loaded meshes
-        self._m_meshes = {}
+        # Loaded textures & meshes by file name (ref counted, LRU evicted)
+        self._m_resources: ResourceManager = ResourceManager()
 
         # List of sprite components
         self._m_sprite_comps = []
@@ -40,9 +56,17 @@ class Renderer:
         self._m_sprite_shader: Shader = None
         # Sprite vertex array
         self._m_sprite_verts: VertexArray = None
+        # Batches all sprites into a few draw calls
+        self._m_sprite_batch: SpriteBatch = None
 
         # Mesh shader
         self._m_mesh_shader: Shader = None
+        # Mesh shader variant with clustered point/spot lights
+        self._m_clustered_mesh_shader: Shader = None
+        # Position-only shader of the depth pre-pass
+        self._m_depth_shader: Shader = None
+        # Linked program binaries from earlier runs
+        self._m_program_cache: ProgramCache = ProgramCache("shader_cache")
 
         # Matrices
         self._m_view: Matrix4 = None
@@ -52,9 +76,45 @@ class Renderer:
         self._m_screen_width: float = None
         self._m_screen_height: float = None
 
+        # Triangles and draw calls submitted last frame
+        self._m_num_triangles: int = 0
+        self._m_num_draw_calls: int = 0
+
+        # Per-frame timings (ms)
+        self._m_frame_stats: FrameStats = FrameStats()
+        self._m_last_swap_time: float = None
+        # Background mesh/texture loading, uploaded each frame
+        self._m_asset_loader: AssetLoader = AssetLoader(self)
+        # GPU time per pass (read a few frames late)
+        self._m_gpu_timer: GpuTimer = None
+        # Pixel buffers texture uploads are streamed through
+        self._m_upload_ring: PixelUploadRing = None
+        # Draws queued snapshots when rendering runs on its own thread
+        self._m_render_thread: RenderThread = None
+        # Thread the GL context is current on (sync loads must run there)
+        self._m_gl_thread: threading.Thread = None
+
+        # CPU occlusion culling of mesh components (off by default)
+        self._m_occlusion_culler: OcclusionCuller = OcclusionCuller()
+        self._m_occlusion_culling: bool = False
+        # Depth-only pass before the lit mesh pass (off by default)
+        self._m_depth_prepass: bool = False
+        # Hot per-draw GL calls through raw pointers (off by default)
+        self._m_fast_gl: bool = False
+        # No window or context: GL calls go to a RecordingBackend (off by default)
+        self._m_headless: bool = False
+
         # Lighting
         self._m_ambient_light: Vector3D = None
         self._m_dir_light: DirectionalLight = DirectionalLight()
+        # Point/spot light actors, binned into clusters every frame
+        self._m_point_lights = []
+        self._m_light_clusterer: LightClusterer = None
+        self._m_light_buffers: ClusteredLightBuffers = None
+
+        # Near/far plane distances of the projection
+        self._m_near: float = 25.0
+        self._m_far: float = 10000.0
 
         # SDL window/context
         self._m_window: sdl2.SDL_Window = None
@@ -67,7 +127,40 @@ class Renderer:
     def initialize(self, screen_width: float, screen_height: float) -> bool:
         self._m_screen_width = screen_width
         self._m_screen_height = screen_height
+        self._m_gl_thread = threading.current_thread()
+
+        if not self._m_headless and not self._create_window():
+            return False
+
+        # Fourth, load shaders
+        with startup_profiler.section("shaders"):
+            self._m_program_cache.initialize()
+            loaded: bool = self._load_shaders()
+        if not loaded:
+            sdl2.SDL_Log(b"Failed to load shader program")
+            return False
 
+        # Fifth, create quad mesh for sprites
+        start: float = time.perf_counter()
+        self._create_sprite_vertices()
+        self._m_sprite_batch = SpriteBatch()
+
+        # Sixth, create clustered light buffers
+        self._m_light_clusterer = LightClusterer(
+            near=self._m_near, far=self._m_far)
+        self._m_light_buffers = ClusteredLightBuffers()
+
+        # Seventh, create GPU pass timer
+        self._m_gpu_timer = GpuTimer()
+
+        # Eighth, create pixel buffers for texture streaming
+        self._m_upload_ring = PixelUploadRing()
+        startup_profiler.record("GL buffers", time.perf_counter() - start)
+
+        return True
+
+    # Window, GL context and (optionally) the GL fast path
+    def _create_window(self) -> bool:
         # First, set OpenGL properties: start...
         sdl2.SDL_GL_SetAttribute(sdl2.SDL_GL_CONTEXT_PROFILE_MASK,
                                  sdl2.SDL_GL_CONTEXT_PROFILE_CORE)  # Set core profile
@@ -89,101 +182,256 @@ class Renderer:
         # First, set OpenGL properties: end...
 
         # Second, create window for OpenGL
-        self._m_window = sdl2.SDL_CreateWindow(b"3D Prototype",
-                                               sdl2.SDL_WINDOWPOS_CENTERED,
-                                               sdl2.SDL_WINDOWPOS_CENTERED,
-                                               int(self._m_screen_width),
-                                               int(self._m_screen_height),
-                                               sdl2.SDL_WINDOW_OPENGL)
+        with startup_profiler.section("window"):
+            self._m_window = sdl2.SDL_CreateWindow(b"3D Prototype",
+                                                   sdl2.SDL_WINDOWPOS_CENTERED,
+                                                   sdl2.SDL_WINDOWPOS_CENTERED,
+                                                   int(self._m_screen_width),
+                                                   int(self._m_screen_height),
+                                                   sdl2.SDL_WINDOW_OPENGL)
         if self._m_window == None:
             sdl2.SDL_Log(b"Window failed: ", sdl2.SDL_GetError())
             return False
 
         # Third, create context for OpenGL (Contains color buff., textures, models, etc.)
-        self._m_context = sdl2.SDL_GL_CreateContext(self._m_window)
-
-        # Initialize SDL image library
-        if sdlimage.IMG_Init(sdlimage.IMG_INIT_PNG) == 0:
-            sdl2.SDL_Log(b"Image initialization failed: ", sdl2.SDL_GetError())
-            return False
-
-        # Fourth, load shaders
-        if not self._load_shaders():
-            sdl2.SDL_Log(b"Failed to load shader program")
-            return False
-
-        # Fifth, create quad mesh for sprites
-        self._create_sprite_vertices()
-
+        with startup_profiler.section("GL context"):
+            self._m_context = sdl2.SDL_GL_CreateContext(self._m_window)
+        # Shadowed GL state belongs to the new context
+        state_cache.invalidate()
+        if self._m_fast_gl:
+            fast_path: GLFastPath = GLFastPath()
+            if fast_path.load():
+                fast_path.install(GL)
+            else:
+                self._m_fast_gl = False
         return True
 
     def shutdown(self) -> None:
         # Shutdown in reverse
+        self._m_asset_loader.shutdown()
+        self._m_upload_ring.delete()
+        self._m_gpu_timer.delete()
+        self._m_light_buffers.delete()
+        self._m_sprite_batch.delete()
         self._m_sprite_vertices.delete()
+        geometry_pools.delete()
         self._m_sprite_shader.unload()
         del self._m_sprite_shader
         self._m_mesh_shader.unload()
         self._m_mesh_shader.delete()
-        sdlimage.IMG_Quit()
-        sdl2.SDL_GL_DeleteContext(self._m_context)
-        sdl2.SDL_DestroyWindow(self._m_window)
+        self._m_clustered_mesh_shader.unload()
+        self._m_depth_shader.unload()
+        Texture.quit_image_module()
+        # Fast-path pointers belong to the context
+        GL.set_backend(GL.get_backend())
+        if self._m_window:
+            sdl2.SDL_GL_DeleteContext(self._m_context)
+            sdl2.SDL_DestroyWindow(self._m_window)
 
     def unload_data(self) -> None:
-        # Destroy textures
-        for texture in self._m_textures.values():
-            texture.unload()
-            texture.delete()
-        self._m_textures.clear()
-        # Destroy meshes
-        for mesh in self._m_meshes.values():
-            mesh.unload()
-            mesh.delete()
-        self._m_meshes.clear()
+        self._m_asset_loader.clear()
+        # Destroy textures & meshes
+        self._m_resources.clear()
 
+    # Draw a frame from the current scene (serial mode)
     def draw(self) -> None:
+        self.draw_snapshot(self.build_snapshot())
+
+    # Record what this frame draws [CPU only, no GL calls]
+    def build_snapshot(self) -> RenderSnapshot:
+        # Mesh components: cull, pick LOD, then record draw state
+        num_triangles: int = 0
+        proj_scale: float = self._m_projection.m_mat[1][1]
+        mesh_comps: list = self._m_mesh_comps
+        if self._m_occlusion_culling:
+            mesh_comps = self._cull_occluded(mesh_comps)
+        mesh_draws: list = []
+        for mesh_comp in mesh_comps:
+            if not mesh_comp.get_mesh():
+                continue
+            mesh_comp.update_lod(self._m_view, proj_scale)
+            mesh_draws.append(mesh_comp.get_draw_state())
+            num_triangles += mesh_comp.get_num_triangles()
+        # Front to back: early depth test rejects more hidden fragments
+        mesh_draws.sort(key=lambda draw: Vector3D.transform(
+            draw[0].get_translation(), self._m_view).z)
+
+        # Sprites: world-space quads
+        sprite_vertices, sprite_runs = SpriteBatch.build(self._m_sprite_comps)
+        num_triangles += len(sprite_vertices) * 2
+
+        # Point/spot lights: bin into clusters
+        self._m_light_clusterer.update(LightClusterer.pack_lights(
+            self._m_point_lights), self._m_view, self._m_projection)
+
+        dir_light: DirectionalLight = self._m_dir_light
+        return RenderSnapshot(
+            self._m_view, self._m_projection,
+            Renderer._to_tuple(self._m_ambient_light),
+            (Renderer._to_tuple(dir_light._m_direction),
+             Renderer._to_tuple(dir_light._m_diffuse_color),
+             Renderer._to_tuple(dir_light._m_spec_color)),
+            tuple(mesh_draws), sprite_vertices, sprite_runs,
+            self._m_light_clusterer.get_light_data(),
+            self._m_light_clusterer.get_grid(),
+            self._m_light_clusterer.get_light_indices(),
+            num_triangles, self._m_depth_prepass)
+
+    # Submit a snapshot to GL and swap [render thread in threaded mode]
+    def draw_snapshot(self, snapshot: RenderSnapshot) -> None:
+        start: float = time.perf_counter()
+        # Create GL objects of assets loaded in the background (budgeted)
+        self._m_asset_loader.process_uploads()
+        self._m_frame_stats.add_sample(
+            "asset_upload", (time.perf_counter() - start) * 1000.0)
+        # Unload unreferenced assets while over the memory budget
+        for file_name in self._m_resources.update():
+            self._m_asset_loader.forget(file_name)
+        # GPU times of the frame that used this query slot before
+        for name, gpu_time in self._m_gpu_timer.begin_frame():
+            self._m_frame_stats.add_sample("gpu_" + name, gpu_time)
+
         # Clear color-buffer to gray
         GL.glClearColor(0.0, 0.0, 0.0, 1.0)
         GL.glClear(GL.GL_COLOR_BUFFER_BIT | GL.GL_DEPTH_BUFFER_BIT)
 
         # DRAW MESH COMPONENTS: Start...
         # Enable depth buffering and disable alpha blending
-        GL.glEnable(GL.GL_DEPTH_TEST)
-        GL.glDisable(GL.GL_BLEND)
-
-        # Set mesh shader active
-        self._m_mesh_shader.set_active()
+        state_cache.enable(GL.GL_DEPTH_TEST)
+        state_cache.disable(GL.GL_BLEND)
+        state_cache.depth_mask(True)
+        state_cache.depth_func(GL.GL_LESS)
+
+        if snapshot.is_depth_prepass():
+            pass_start: float = self._begin_pass("depth_prepass")
+            self._draw_depth_prepass(snapshot)
+            self._end_pass("depth_prepass", pass_start)
+            # Shade only fragments that won the pre-pass [depth is final]
+            state_cache.depth_func(GL.GL_LEQUAL)
+            state_cache.depth_mask(False)
+
+        pass_start = self._begin_pass("mesh")
+        # Upload clustered point/spot lights
+        self._m_light_buffers.upload(snapshot.get_light_data(),
+                                     snapshot.get_light_grid(),
+                                     snapshot.get_light_indices())
+        self._m_light_buffers.set_active()
+
+        # Set mesh shader active [skip the cluster loop without lights]
+        mesh_shader: Shader = self._m_mesh_shader
+        if len(snapshot.get_light_data()) > 0:
+            mesh_shader = self._m_clustered_mesh_shader
+        mesh_shader.set_active()
         # Update view-proj matrix uniform
-        self._m_mesh_shader.set_matrix_uniform(
-            "uViewProj", self._m_view * self._m_projection)
+        mesh_shader.set_matrix_uniform(
+            "uViewProj", snapshot.get_view() * snapshot.get_projection())
 
         # Update lighting uniforms
-        self._set_light_uniforms(self._m_mesh_shader)
-
-        for mesh_comp in self._m_mesh_comps:
-            # [Note: mesh vertex array is set active in this draw!]
-            mesh_comp.draw(self._m_mesh_shader)
+        self._set_light_uniforms(mesh_shader, snapshot)
+
+        for world, mesh, texture, lod in snapshot.get_mesh_draws():
+            MeshComponent.draw_mesh(
+                mesh_shader, world, mesh, texture, lod)
+        # Clear needs depth writes on
+        state_cache.depth_mask(True)
+        self._end_pass("mesh", pass_start)
         # DRAW MESH COMPONENTS: End...
 
         # DRAW ALL SPRITE COMPONENTS: Start...
+        pass_start = self._begin_pass("sprite")
         # Disable depth buffering
-        GL.glDisable(GL.GL_DEPTH_TEST)
+        state_cache.disable(GL.GL_DEPTH_TEST)
         # Enable alpha blending on color buffer
-        GL.glEnable(GL.GL_BLEND)
-        GL.glBlendEquationSeparate(GL.GL_FUNC_ADD, GL.GL_FUNC_ADD)
-        GL.glBlendFuncSeparate(
+        state_cache.enable(GL.GL_BLEND)
+        state_cache.blend_equation_separate(GL.GL_FUNC_ADD, GL.GL_FUNC_ADD)
+        state_cache.blend_func_separate(
             GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA, GL.GL_ONE, GL.GL_ZERO)
 
-        # Set shader and vertex array active 'every frame'
+        # Set shader active 'every frame'
         self._m_sprite_shader.set_active()
-        self._m_sprite_vertices.set_active()
 
-        # Draw sprites
-        for sprite in self._m_sprite_comps:
-            sprite.draw(self._m_sprite_shader)
+        # Draw sprites [one draw call per run of same-texture sprites]
+        self._m_sprite_batch.draw_vertices(snapshot.get_sprite_vertices(),
+                                           snapshot.get_sprite_runs(),
+                                           self._m_sprite_shader)
+        self._m_num_triangles = snapshot.get_num_triangles()
+        # One per mesh (twice with the pre-pass), one per sprite run
+        self._m_num_draw_calls = len(snapshot.get_mesh_draws()) * (
+            2 if snapshot.is_depth_prepass() else 1) + len(snapshot.get_sprite_runs())
+        self._end_pass("sprite", pass_start)
+        # DRAW ALL SPRITE COMPONENTS: End...
+
+        self._m_frame_stats.add_sample(
+            "render", (time.perf_counter() - start) * 1000.0)
 
         # Swap color-buffer to display on screen
-        sdl2.SDL_GL_SwapWindow(self._m_window)
-        # DRAW ALL SPRITE COMPONENTS: End...
+        if self._m_window:
+            sdl2.SDL_GL_SwapWindow(self._m_window)
+
+        # Latency: snapshot built -> frame swapped; frame: swap to swap
+        now: float = time.perf_counter()
+        self._m_frame_stats.add_sample(
+            "latency", (now - snapshot.get_time_created()) * 1000.0)
+        if self._m_last_swap_time is not None:
+            self._m_frame_stats.add_sample(
+                "frame", (now - self._m_last_swap_time) * 1000.0)
+        self._m_last_swap_time = now
+
+    # Start timing a pass on the CPU and GPU [passes may not nest]
+    def _begin_pass(self, name: str) -> float:
+        self._m_gpu_timer.begin(name)
+        return time.perf_counter()
+
+    # CPU time is recorded now as "cpu_<name>", GPU time frames later as "gpu_<name>"
+    def _end_pass(self, name: str, start: float) -> None:
+        self._m_gpu_timer.end()
+        self._m_frame_stats.add_sample(
+            "cpu_" + name, (time.perf_counter() - start) * 1000.0)
+
+    # Depth only, with color writes masked
+    def _draw_depth_prepass(self, snapshot: RenderSnapshot) -> None:
+        state_cache.color_mask(False, False, False, False)
+        self._m_depth_shader.set_active()
+        self._m_depth_shader.set_matrix_uniform(
+            "uViewProj", snapshot.get_view() * snapshot.get_projection())
+        for world, mesh, texture, lod in snapshot.get_mesh_draws():
+            MeshComponent.draw_depth(self._m_depth_shader, world, mesh, lod)
+        state_cache.color_mask(True, True, True, True)
+
+    # Move GL submission to a render thread that owns the context
+    def start_render_thread(self) -> None:
+        if self._m_render_thread:
+            return
+        # Context can only be current on one thread
+        sdl2.SDL_GL_MakeCurrent(self._m_window, None)
+        self._m_render_thread = RenderThread(self)
+        self._m_gl_thread = self._m_render_thread
+        self._m_render_thread.start()
+
+    # Finish queued frames and take the context back
+    def stop_render_thread(self) -> None:
+        if not self._m_render_thread:
+            return
+        self._m_render_thread.stop()
+        self._m_render_thread = None
+        self._m_gl_thread = threading.current_thread()
+        sdl2.SDL_GL_MakeCurrent(self._m_window, self._m_context)
+
+    # Hand a snapshot to the render thread (returns seconds waited)
+    def submit_snapshot(self, snapshot: RenderSnapshot) -> float:
+        return self._m_render_thread.submit(snapshot)
+
+    def is_render_threaded(self) -> bool:
+        return self._m_render_thread is not None
+
+    # Is the calling thread the one GL calls may be made on?
+    # [the render thread while it runs, else the one that initialized]
+    def is_gl_thread(self) -> bool:
+        return threading.current_thread() is self._m_gl_thread
+
+    @staticmethod
+    def _to_tuple(vector: Vector3D) -> tuple:
+        return (vector.x, vector.y, vector.z)
 
     def add_sprite(self, sprite: SpriteComponent) -> None:
         # Add based on draw order
@@ -203,54 +451,145 @@ class Renderer:
     def remove_mesh_comp(self, mesh: MeshComponent) -> None:
         self._m_mesh_comps.remove(mesh)
 
+    # [GL thread only: get_texture_async() from anywhere else]
     def get_texture(self, file_name: str) -> Texture:
+        assert self.is_gl_thread(), "get_texture() off the GL thread: " + file_name
         # Search for texture in dic first
-        texture: Texture = self._m_textures.get(file_name)
+        texture: Texture = self._m_resources.get(file_name)
         if texture != None:
             return texture
         else:
             texture = Texture()
-            if texture.load(file_name):
+            if texture.load(file_name, self._m_upload_ring):
                 # Add texture to dic
-                self._m_textures[file_name] = texture
+                self.add_texture(file_name, texture)
             else:
                 texture.delete()
                 texture = None
         return texture
 
+    # Texture if already loaded, never loads
+    def find_texture(self, file_name: str) -> Texture:
+        return self._m_resources.get(file_name)
+
+    # [dependencies: e.g. an atlas region's page]
+    def add_texture(self, file_name: str, texture: Texture, dependencies: list = ()) -> None:
+        self._m_resources.add(file_name, texture, texture.get_gpu_size(),
+                              dependencies=dependencies)
+
+    # A mesh keeps its textures referenced
+    def add_mesh(self, file_name: str, mesh: Mesh) -> None:
+        textures: list = [mesh.get_texture(i) for i in range(mesh.get_num_textures())]
+        self._m_resources.add(file_name, mesh, mesh.get_gpu_size(), mesh.get_cpu_size(),
+                              [texture for texture in textures if texture])
+
+    # Reference counting for components [released resources may be evicted]
+    # Returns False if the resource is not (or no longer) loaded
+    def acquire_resource(self, resource) -> bool:
+        return self._m_resources.acquire(resource)
+
+    def release_resource(self, resource) -> None:
+        self._m_resources.release(resource)
+
+    # Load in the background; the handle resolves once uploaded
+    def get_mesh_async(self, file_name: str) -> AssetHandle:
+        mesh: Mesh = self._m_resources.get(file_name)
+        if mesh != None:
+            handle: AssetHandle = AssetHandle(file_name)
+            handle.resolve(mesh)
+            return handle
+        return self._m_asset_loader.load_mesh(file_name)
+
+    def get_texture_async(self, file_name: str) -> AssetHandle:
+        texture: Texture = self._m_resources.get(file_name)
+        if texture != None:
+            handle: AssetHandle = AssetHandle(file_name)
+            handle.resolve(texture)
+            return handle
+        return self._m_asset_loader.load_texture(file_name)
+
+    # Load an offline-built atlas; its images are then found by get_texture
+    # [GL thread only, like get_texture()]
+    def load_atlas(self, manifest_name: str) -> bool:
+        from texture_atlas import TextureAtlas    # Rarely used: not imported at startup
+        manifest: tuple = TextureAtlas.read_manifest(manifest_name)
+        if manifest == None:
+            return False
+        page_files, regions = manifest
+
+        pages: list = []
+        for page_file in page_files:
+            page: Texture = self.get_texture(page_file)
+            if page == None:
+                return False
+            pages.append(page)
+        for name, (page, x, y, w, h) in regions.items():
+            self.add_texture(name, Texture.create_sub_texture(
+                pages[page], x, y, w, h), [pages[page]])
+        return True
+
+    # Pack image files into atlas pages at load time [GL thread only]
+    def build_atlas(self, atlas_name: str, file_names: list) -> bool:
+        assert self.is_gl_thread(), "build_atlas() off the GL thread: " + atlas_name
+        from texture_atlas import TextureAtlas
+        atlas = TextureAtlas()
+        if not atlas.build(file_names):
+            atlas.delete()
+            return False
+        pages, regions = atlas.create_textures()
+        region_pages: dict = {name: pages[region[0]]
+                              for name, region in atlas.get_regions().items()}
+        atlas.delete()
+
+        for i, page in enumerate(pages):
+            self.add_texture("{}_{}".format(atlas_name, i), page)
+        for name, region in regions.items():
+            self.add_texture(name, region, [region_pages[name]])
+        return True
+
+    # [GL thread only: get_mesh_async() from anywhere else]
     def get_mesh(self, file_name: str) -> Mesh:
+        assert self.is_gl_thread(), "get_mesh() off the GL thread: " + file_name
         # Search for mesh in dic first
-        mesh: Mesh = self._m_meshes.get(file_name)
+        mesh: Mesh = self._m_resources.get(file_name)
         if mesh != None:
             return mesh
         else:
             mesh = Mesh()
             if mesh.load(file_name, self):
                 # Add mesh to dic
-                self._m_meshes[file_name] = mesh
+                self.add_mesh(file_name, mesh)
             else:
                 mesh.delete()
                 mesh = None
         return mesh
 
     def _load_shaders(self) -> bool:
-        # Create sprite shader
-        self._m_sprite_shader = Shader()
-        if not self._m_sprite_shader.load("shaders/sprite.vert", "shaders/sprite.frag"):
+        start: float = time.perf_counter()
+        cache: ProgramCache = self._m_program_cache
+        self._m_sprite_shader = Shader(cache)
+        self._m_mesh_shader = Shader(cache)
+        self._m_clustered_mesh_shader = Shader(cache)
+        self._m_depth_shader = Shader(cache)
+
+        # Compile every shader & variant in one batch
+        loads: list = [
+            (self._m_sprite_shader, "shaders/sprite.vert", "shaders/sprite.frag", None),
+            (self._m_mesh_shader, "shaders/phong.vert", "shaders/phong.frag", None),
+            (self._m_clustered_mesh_shader, "shaders/phong.vert", "shaders/phong.frag",
+             {"CLUSTERED_LIGHTS": 1}),
+            (self._m_depth_shader, "shaders/depth.vert", "shaders/depth.frag", None)]
+        if not Shader.load_batch(loads):
             return False
-        self._m_sprite_shader.set_active()
+        sdl2.SDL_Log("Shaders ready in {:.1f} ms ({} of {} from program binary cache)".format(
+            (time.perf_counter() - start) * 1000.0, cache.get_num_hits(), len(loads)).encode())
 
         # Set the view-projection matrix for uniform
+        self._m_sprite_shader.set_active()
         view_proj: Matrix4 = Matrix4.create_simple_view_proj(
             self._m_screen_width, self._m_screen_height)
         self._m_sprite_shader.set_matrix_uniform("uViewProj", view_proj)
 
-        # Create mesh shader
-        self._m_mesh_shader = Shader()
-        if not self._m_mesh_shader.load("shaders/phong.vert", "shaders/phong.frag"):
-            return False
-        self._m_mesh_shader.set_active()
-
         # Set the view-projection matrix for uniform
         self._m_view: Matrix4 = Matrix4.create_look_at(
             Vector3D(0.0, 0.0, 0.0),    # Camera position
@@ -260,13 +599,54 @@ class Renderer:
             to_radians(70.0),   # Horizontal FOV
             self._m_screen_width,   # Width of view
             self._m_screen_height,  # Height of view
-            25.0,                   # Near plane distance
-            10000.0)                # Far plane distance
-        self._m_mesh_shader.set_matrix_uniform(
-            "uViewProj", self._m_view * self._m_projection)
+            self._m_near,           # Near plane distance
+            self._m_far)            # Far plane distance
+        for shader in (self._m_mesh_shader, self._m_clustered_mesh_shader):
+            shader.set_active()
+            shader.set_matrix_uniform(
+                "uViewProj", self._m_view * self._m_projection)
+
+        # Texture units of clustered light buffers (unit 0 is mesh texture)
+        self._m_clustered_mesh_shader.set_int_uniform(
+            "uLightData", ClusteredLightBuffers.LIGHT_DATA_UNIT)
+        self._m_clustered_mesh_shader.set_int_uniform(
+            "uClusterGrid", ClusteredLightBuffers.CLUSTER_GRID_UNIT)
+        self._m_clustered_mesh_shader.set_int_uniform(
+            "uLightIndices", ClusteredLightBuffers.LIGHT_INDICES_UNIT)
 
         return True
 
+    # Rasterize occluders and drop mesh components hidden behind them
+    def _cull_occluded(self, mesh_comps: list) -> list:
+        culler: OcclusionCuller = self._m_occlusion_culler
+        culler.begin_frame(self._m_view, self._m_projection)
+
+        occludees: list = []
+        for mesh_comp in mesh_comps:
+            mesh: Mesh = mesh_comp.get_mesh()
+            if not mesh:
+                continue
+            if mesh_comp.is_occluder():
+                positions, indices = mesh.get_proxy()
+                culler.rasterize(positions, indices,
+                                 mesh_comp.get_owner().get_world_transform())
+            else:
+                occludees.append(mesh_comp)
+        culler.build_hiz()
+
+        centers: np.ndarray = np.array(
+            [[p.x, p.y, p.z] for p in (mc.get_owner().get_position() for mc in occludees)],
+            dtype=np.float32).reshape(-1, 3)
+        radii: np.ndarray = np.array(
+            [mc.get_mesh().get_radius() * mc.get_owner().get_scale() for mc in occludees],
+            dtype=np.float32)
+        visible: set = {id(mc) for mc, v in zip(
+            occludees, culler.test_spheres(centers, radii)) if v}
+
+        # Keep submission order
+        return [mc for mc in mesh_comps
+                if mc.get_mesh() and (mc.is_occluder() or id(mc) in visible)]
+
     def _create_sprite_vertices(self) -> None:
         vertices: ctypes.Array = (ctypes.c_float * 32)(
             -0.5, 0.5, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0,   # Top left
@@ -284,19 +664,37 @@ class Renderer:
         self._m_sprite_vertices = VertexArray(
             vertices, 4, indices, 6)
 
-    def _set_light_uniforms(self, shader: Shader) -> None:
+    def _set_light_uniforms(self, shader: Shader, snapshot: RenderSnapshot) -> None:
         # Camera position is from inverted view
         # TODO inv_view: Matrix4 = self._m_view.invert()
-        shader.set_vector_uniform("uCameraPos", self._m_view.get_translation())
+        shader.set_vector_uniform(
+            "uCameraPos", snapshot.get_view().get_translation())
         # Ambient light
-        shader.set_vector_uniform("uAmbientLight", self._m_ambient_light)
-        # Directional light
         shader.set_vector_uniform(
-            "uDirLight.mDirection", self._m_dir_light._m_direction)
+            "uAmbientLight", Vector3D(*snapshot.get_ambient_light()))
+        # Directional light
+        direction, diffuse_color, spec_color = snapshot.get_dir_light()
+        shader.set_vector_uniform("uDirLight.mDirection", Vector3D(*direction))
         shader.set_vector_uniform(
-            "uDirLight.mDiffuseColor", self._m_dir_light._m_diffuse_color)
+            "uDirLight.mDiffuseColor", Vector3D(*diffuse_color))
+        shader.set_vector_uniform("uDirLight.mSpecColor", Vector3D(*spec_color))
+
+        # Clustered lights: cluster of a fragment from its pixel and depth
+        dim_x, dim_y, dim_z = self._m_light_clusterer.get_dims()
+        shader.set_matrix_uniform("uView", snapshot.get_view())
         shader.set_vector_uniform(
-            "uDirLight.mSpecColor", self._m_dir_light._m_spec_color)
+            "uClusterDims", Vector3D(float(dim_x), float(dim_y), float(dim_z)))
+        shader.set_vector4_uniform("uClusterScale", (
+            dim_x / self._m_screen_width,
+            dim_y / self._m_screen_height,
+            dim_z / math.log(self._m_far / self._m_near),
+            self._m_near))
+
+    def add_point_light(self, light: PointLightActor) -> None:
+        self._m_point_lights.append(light)
+
+    def remove_point_light(self, light: PointLightActor) -> None:
+        self._m_point_lights.remove(light)
 
     def set_view_matrix(self, view: Matrix4) -> None:
         self._m_view = view
@@ -307,6 +705,61 @@ class Renderer:
     def get_directional_light(self) -> DirectionalLight:
         return self._m_dir_light
 
+    def get_num_triangles(self) -> int:
+        return self._m_num_triangles
+
+    def get_num_draw_calls(self) -> int:
+        return self._m_num_draw_calls
+
+    def get_frame_stats(self) -> FrameStats:
+        return self._m_frame_stats
+
+    def get_upload_ring(self) -> PixelUploadRing:
+        return self._m_upload_ring
+
+    def get_resource_manager(self) -> ResourceManager:
+        return self._m_resources
+
+    def get_asset_loader(self) -> AssetLoader:
+        return self._m_asset_loader
+
+    def get_gpu_timer(self) -> GpuTimer:
+        return self._m_gpu_timer
+
+    def get_window_and_context(self) -> tuple:
+        return self._m_window, self._m_context
+
+    # Call before initialize() [falls back to PyOpenGL if unavailable]
+    def set_fast_gl(self, enabled: bool) -> None:
+        self._m_fast_gl = enabled
+
+    def is_fast_gl(self) -> bool:
+        return self._m_fast_gl
+
+    # Call before initialize() and set a RecordingBackend first
+    # [e.g. benchmarks on machines without a GPU]
+    def set_headless(self, headless: bool) -> None:
+        self._m_headless = headless
+
+    def is_headless(self) -> bool:
+        return self._m_headless
+
+    def set_occlusion_culling(self, enabled: bool) -> None:
+        self._m_occlusion_culling = enabled
+
+    # Toggle per scene: helps overdraw-heavy scenes, costs a second geometry pass
+    def set_depth_prepass(self, enabled: bool) -> None:
+        self._m_depth_prepass = enabled
+
+    def is_depth_prepass(self) -> bool:
+        return self._m_depth_prepass
+
+    def get_occlusion_culler(self) -> OcclusionCuller:
+        return self._m_occlusion_culler
+
+    def get_sprite_batch(self) -> SpriteBatch:
+        return self._m_sprite_batch
+
     def get_screen_width(self) -> float:
         return self._m_screen_width
 
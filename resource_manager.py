@@ -0,0 +1,163 @@
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+
+
+class ResourceManager:
+    """
+    This class owns loaded meshes and textures by file name.
+
+    Components acquire() what they use and release() it when done.
+    Every resource has an estimated size in GPU and CPU memory; once a
+    budget is exceeded, update() unloads the least recently used
+    resources nobody references. An evicted resource is simply gone from
+    the table, so the next request loads it again.
+
+    A resource can depend on others (a mesh on its textures, an atlas
+    region on its page); they stay referenced until it is evicted.
+    """
+
+    # Frames a released resource is kept before it may be evicted
+    # [a queued snapshot may still draw it]
+    EVICT_DELAY_FRAMES = 2
+
+    def __init__(self, gpu_budget: int = 512 * 1024 * 1024,
+                 cpu_budget: int = 256 * 1024 * 1024) -> None:
+        self._m_gpu_budget: int = gpu_budget
+        self._m_cpu_budget: int = cpu_budget
+        # Name -> [resource, gpu bytes, cpu bytes, ref count, frame released,
+        # dependencies], least recently used first
+        self._m_entries: OrderedDict = OrderedDict()
+        # id(resource) -> name
+        self._m_names: dict = {}
+        self._m_lock: threading.Lock = threading.Lock()
+        self._m_gpu_bytes: int = 0
+        self._m_cpu_bytes: int = 0
+        self._m_frame: int = 0
+        self._m_num_evicted: int = 0
+
+    # Take ownership [dependencies: resources kept alive by this one]
+    def add(self, name: str, resource, gpu_bytes: int, cpu_bytes: int = 0,
+            dependencies: list = ()) -> None:
+        with self._m_lock:
+            if name in self._m_entries:
+                return
+            for dependency in dependencies:
+                self._acquire(dependency)
+            self._m_entries[name] = [resource, gpu_bytes, cpu_bytes, 0, self._m_frame,
+                                     list(dependencies)]
+            self._m_names[id(resource)] = name
+            self._m_gpu_bytes += gpu_bytes
+            self._m_cpu_bytes += cpu_bytes
+
+    # Resource by name (marks it recently used), None if not loaded
+    def get(self, name: str):
+        with self._m_lock:
+            entry: list = self._m_entries.get(name)
+            if entry is None:
+                return None
+            self._m_entries.move_to_end(name)
+            return entry[0]
+
+    # Reference a resource
+    # Returns False for resources not managed here [never added, or evicted]
+    def acquire(self, resource) -> bool:
+        with self._m_lock:
+            return self._acquire(resource)
+
+    def release(self, resource) -> None:
+        with self._m_lock:
+            self._release(resource)
+
+    # Once per frame on the GL thread: evict over budget
+    # Returns the names evicted
+    def update(self) -> list:
+        with self._m_lock:
+            self._m_frame += 1
+            if (self._m_gpu_bytes <= self._m_gpu_budget and
+                    self._m_cpu_bytes <= self._m_cpu_budget):
+                return []
+            evicted: list = []
+            # Oldest first [released dependencies follow in later frames]
+            for name, entry in list(self._m_entries.items()):
+                if (self._m_gpu_bytes <= self._m_gpu_budget and
+                        self._m_cpu_bytes <= self._m_cpu_budget):
+                    break
+                if self._is_evictable(entry):
+                    self._evict(name)
+                    evicted.append(name)
+            self._m_num_evicted += len(evicted)
+            return evicted
+
+    # Unload everything, referenced or not
+    def clear(self) -> None:
+        with self._m_lock:
+            for entry in self._m_entries.values():
+                ResourceManager._unload(entry[0])
+            self._m_entries.clear()
+            self._m_names.clear()
+            self._m_gpu_bytes = 0
+            self._m_cpu_bytes = 0
+
+    def set_budget(self, gpu_budget: int, cpu_budget: int) -> None:
+        self._m_gpu_budget = gpu_budget
+        self._m_cpu_budget = cpu_budget
+
+    def get_ref_count(self, name: str) -> int:
+        entry: list = self._m_entries.get(name)
+        return entry[3] if entry is not None else 0
+
+    # Estimated (GPU, CPU) bytes of a resource, (0, 0) if not loaded
+    def get_size(self, name: str) -> tuple:
+        entry: list = self._m_entries.get(name)
+        return (entry[1], entry[2]) if entry is not None else (0, 0)
+
+    def get_names(self) -> list:
+        return list(self._m_entries)
+
+    def get_gpu_bytes(self) -> int:
+        return self._m_gpu_bytes
+
+    def get_cpu_bytes(self) -> int:
+        return self._m_cpu_bytes
+
+    def get_num_resources(self) -> int:
+        return len(self._m_entries)
+
+    def get_num_evicted(self) -> int:
+        return self._m_num_evicted
+
+    def _acquire(self, resource) -> bool:
+        name: str = self._m_names.get(id(resource))
+        if name is None:
+            return False
+        self._m_entries[name][3] += 1
+        self._m_entries.move_to_end(name)
+        return True
+
+    def _release(self, resource) -> None:
+        name: str = self._m_names.get(id(resource))
+        if name is None:
+            return
+        entry: list = self._m_entries[name]
+        entry[3] = max(entry[3] - 1, 0)
+        if entry[3] == 0:
+            entry[4] = self._m_frame
+
+    def _is_evictable(self, entry: list) -> bool:
+        return (entry[3] == 0 and
+                self._m_frame - entry[4] >= ResourceManager.EVICT_DELAY_FRAMES)
+
+    def _evict(self, name: str) -> None:
+        resource, gpu_bytes, cpu_bytes, _, _, dependencies = self._m_entries.pop(name)
+        del self._m_names[id(resource)]
+        self._m_gpu_bytes -= gpu_bytes
+        self._m_cpu_bytes -= cpu_bytes
+        ResourceManager._unload(resource)
+        for dependency in dependencies:
+            self._release(dependency)
+
+    @staticmethod
+    def _unload(resource) -> None:
+        resource.unload()
+        resource.delete()
@@ -0,0 +1,59 @@
+from __future__ import annotations
+import ctypes
+import sys
+import numpy as np
+import sdl2
+
+
+class RuntimeProfile:
+    """
+    This class configures PyOpenGL for a debug or a release run.
+
+    PyOpenGL reads its flags when OpenGL.GL is imported, so apply() must
+    run before anything imports gl_backend. The debug profile keeps
+    PyOpenGL's defaults (glGetError after every call, array size checks,
+    logging). The release profile turns those off, and loads the array
+    handlers for the types the engine passes to GL up front, instead of
+    on first use in the middle of the first frames.
+    """
+
+    # PyOpenGL flag -> value, by profile name
+    PROFILES = {
+        "debug": {"ERROR_CHECKING": True, "ERROR_LOGGING": True,
+                  "ARRAY_SIZE_CHECKING": True},
+        "release": {"ERROR_CHECKING": False, "ERROR_LOGGING": False,
+                    "ARRAY_SIZE_CHECKING": False, "CONTEXT_CHECKING": False},
+    }
+
+    # Samples of every type given to GL calls (NumPy arrays, bytes, ctypes
+    # arrays/pointers/byref, None offsets, numbers)
+    @staticmethod
+    def _array_samples() -> list:
+        value: ctypes.c_uint = ctypes.c_uint(0)
+        return [np.zeros(1, np.float32), b"\0", (ctypes.c_float * 4)(),
+                ctypes.c_void_p(0), ctypes.byref(value), ctypes.pointer(value), None, 0, 0.0]
+
+    # Set the PyOpenGL flags of a profile; False if it is unknown or too late
+    @staticmethod
+    def apply(name: str) -> bool:
+        flags: dict = RuntimeProfile.PROFILES.get(name)
+        if flags is None:
+            sdl2.SDL_Log(b"Unknown runtime profile: ", name.encode())
+            return False
+        if "OpenGL.GL" in sys.modules:
+            sdl2.SDL_Log(b"Runtime profile must be applied before OpenGL.GL is imported")
+            return False
+        import OpenGL
+        for flag, value in flags.items():
+            setattr(OpenGL, flag, value)
+        if name == "release":
+            RuntimeProfile.load_array_handlers()
+        return True
+
+    # Resolve the array handler of every type the engine uses now
+    @staticmethod
+    def load_array_handlers() -> None:
+        from OpenGL.arrays.arraydatatype import ArrayDatatype
+        registry = ArrayDatatype.getRegistry()
+        for sample in RuntimeProfile._array_samples():
+            registry(sample)
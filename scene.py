@@ -0,0 +1,295 @@
+from __future__ import annotations
+import json
+import mmap
+import struct
+import sys
+import numpy as np
+import sdl2
+from maths import Vector3D, Quaternion, Matrix4
+from actor import Actor
+from mesh_component import MeshComponent
+from point_light_actor import PointLightActor
+from json_parser import json_parser
+
+
+class Scene:
+    """
+    This class is a scene file: the placed actors and the lights of a level.
+
+    Authoring form (.gpscene, JSON):
+        {"version": 1, "ambientLight": [r, g, b],
+         "directionalLight": {"direction": [x, y, z], "diffuseColor": [r, g, b],
+                              "specColor": [r, g, b]},
+         "actors": [{"type": "mesh" | "pointLight" | "empty",
+                     "position": [x, y, z], "rotation": [x, y, z, w], "scale": s,
+                     "mesh": file, "color": [r, g, b], "radius": r}, ...]}
+    (actor entries are the same as in world chunk files)
+
+    Compiled form (.gpsceneb, little endian):
+        header      magic "GPSC", version, number of actors, light flags,
+                    ambient rgb, light direction xyz, diffuse rgb, specular rgb
+        strings     number of assets, then each (u32 length + utf-8)
+        actors      ACTOR_DTYPE records, 16-byte aligned
+
+    Either way the actors are held as columns (one array per field), so
+    instantiate() resolves each unique mesh once and computes all world
+    transforms with a few array operations instead of per actor.
+    """
+
+    MAGIC = b"GPSC"
+    VERSION = 1
+    HEADER = struct.Struct("<4sIII3f3f3f3f")
+    ALIGNMENT = 16
+
+    # Actor types
+    EMPTY = 0
+    MESH = 1
+    POINT_LIGHT = 2
+    TYPE_NAMES = {"empty": EMPTY, "mesh": MESH, "pointLight": POINT_LIGHT}
+
+    # Light flags
+    HAS_AMBIENT = 1
+    HAS_DIRECTIONAL = 2
+
+    # Per actor [asset: index into the asset table, -1 for none]
+    ACTOR_DTYPE = np.dtype([("type", "<u4"), ("asset", "<i4"), ("position", "<f4", 3),
+                            ("rotation", "<f4", 4), ("scale", "<f4"), ("color", "<f4", 3),
+                            ("radius", "<f4")])
+
+    # Actors created per instantiate_batch() in instantiate()
+    BATCH_SIZE = 4096
+
+    def __init__(self) -> None:
+        self._m_file_obj = None
+        self._m_map: mmap.mmap = None
+        # Mesh files, referenced by index
+        self._m_assets: list = []
+        self._m_actors: np.ndarray = np.zeros(0, Scene.ACTOR_DTYPE)
+        self._m_ambient_light: tuple = None
+        # (direction, diffuse color, specular color)
+        self._m_directional_light: tuple = None
+
+    # Read a .gpscene or .gpsceneb file; returns None if it is not valid
+    @staticmethod
+    def load(file_name: str) -> Scene:
+        if file_name.endswith(".gpsceneb"):
+            return Scene._open_binary(file_name)
+        data = json_parser.load(file_name)
+        if not data:
+            sdl2.SDL_Log(b"Scene not found or not valid JSON: ", file_name.encode())
+            return None
+        if data.get("version") != 1:
+            sdl2.SDL_Log(b"Scene is not version 1: ", file_name.encode())
+            return None
+        return Scene.from_json(data)
+
+    # Parsed .gpscene data to columns
+    @staticmethod
+    def from_json(data: dict) -> Scene:
+        scene = Scene()
+        entries: list = data.get("actors", [])
+        actors: np.ndarray = np.zeros(len(entries), Scene.ACTOR_DTYPE)
+        asset_index: dict = {}
+        types: list = []
+        assets: list = []
+        for entry in entries:
+            types.append(Scene.TYPE_NAMES.get(entry.get("type", "mesh"), Scene.EMPTY))
+            mesh: str = entry.get("mesh")
+            if mesh is None:
+                assets.append(-1)
+                continue
+            if mesh not in asset_index:
+                asset_index[mesh] = len(scene._m_assets)
+                scene._m_assets.append(mesh)
+            assets.append(asset_index[mesh])
+        actors["type"] = types
+        actors["asset"] = assets
+        actors["position"] = [entry.get("position", (0.0, 0.0, 0.0)) for entry in entries]
+        actors["rotation"] = [entry.get("rotation", (0.0, 0.0, 0.0, 1.0)) for entry in entries]
+        actors["scale"] = [entry.get("scale", 1.0) for entry in entries]
+        actors["color"] = [entry.get("color", (1.0, 1.0, 1.0)) for entry in entries]
+        actors["radius"] = [entry.get("radius", 200.0) for entry in entries]
+        scene._m_actors = actors
+
+        if "ambientLight" in data:
+            scene._m_ambient_light = tuple(data["ambientLight"])
+        if "directionalLight" in data:
+            light: dict = data["directionalLight"]
+            scene._m_directional_light = (tuple(light["direction"]),
+                                          tuple(light.get("diffuseColor", (1.0, 1.0, 1.0))),
+                                          tuple(light.get("specColor", (0.0, 0.0, 0.0))))
+        return scene
+
+    # Serialize to the compiled form
+    def compile(self) -> bytes:
+        flags: int = 0
+        ambient: tuple = (0.0, 0.0, 0.0)
+        light: tuple = ((0.0, 0.0, 0.0),) * 3
+        if self._m_ambient_light is not None:
+            flags |= Scene.HAS_AMBIENT
+            ambient = self._m_ambient_light
+        if self._m_directional_light is not None:
+            flags |= Scene.HAS_DIRECTIONAL
+            light = self._m_directional_light
+        out: bytearray = bytearray(Scene.HEADER.pack(
+            Scene.MAGIC, Scene.VERSION, len(self._m_actors), flags,
+            *ambient, *light[0], *light[1], *light[2]))
+        out += struct.pack("<I", len(self._m_assets))
+        for asset in self._m_assets:
+            encoded: bytes = asset.encode("utf-8")
+            out += struct.pack("<I", len(encoded)) + encoded
+        out += bytes(Scene._align(len(out)) - len(out))
+        out += self._m_actors.tobytes()
+        return bytes(out)
+
+    def close(self) -> None:
+        self._m_actors = np.zeros(0, Scene.ACTOR_DTYPE)
+        if self._m_map is not None:
+            self._m_map.close()
+            self._m_map = None
+        if self._m_file_obj is not None:
+            self._m_file_obj.close()
+            self._m_file_obj = None
+
+    # Create every actor and set the scene's lights
+    def instantiate(self, game: Game) -> list:
+        self.apply_lights(game.get_renderer())
+        handles: list = self.resolve_assets(game.get_renderer())
+        actors: list = []
+        for start in range(0, len(self._m_actors), Scene.BATCH_SIZE):
+            actors += self.instantiate_batch(game, handles, start, Scene.BATCH_SIZE)
+        return actors
+
+    # Start loading each unique mesh once; handles by asset index
+    def resolve_assets(self, renderer: Renderer) -> list:
+        return [renderer.get_mesh_async(asset) for asset in self._m_assets]
+
+    # Create actors [start, start + count) [can be spread over frames]
+    def instantiate_batch(self, game: Game, handles: list, start: int, count: int) -> list:
+        batch: np.ndarray = self._m_actors[start:start + count]
+        worlds: list = Matrix4.create_from_array(Scene.compute_world_transforms(
+            batch["position"], batch["rotation"], batch["scale"]))
+        positions: list = batch["position"].tolist()
+        rotations: list = batch["rotation"].tolist()
+        scales: list = batch["scale"].tolist()
+        types: list = batch["type"].tolist()
+        assets: list = batch["asset"].tolist()
+        actors: list = []
+        for i in range(len(batch)):
+            if types[i] == Scene.POINT_LIGHT:
+                actor: Actor = PointLightActor(game)
+                actor.set_diffuse_color(Vector3D(*batch["color"][i].tolist()))
+                actor.set_radius(float(batch["radius"][i]))
+            else:
+                actor = Actor(game)
+            if types[i] == Scene.MESH and assets[i] >= 0:
+                MeshComponent(actor).set_mesh_handle(handles[assets[i]])
+            rotation: Quaternion = Quaternion()
+            rotation.x, rotation.y, rotation.z, rotation.w = rotations[i]
+            actor.set_transform(Vector3D(*positions[i]), rotation, scales[i], worlds[i])
+            actors.append(actor)
+        return actors
+
+    def apply_lights(self, renderer: Renderer) -> None:
+        if self._m_ambient_light is not None:
+            renderer.set_ambient_light(Vector3D(*self._m_ambient_light))
+        if self._m_directional_light is not None:
+            direction, diffuse, spec = self._m_directional_light
+            dir_light: DirectionalLight = renderer.get_directional_light()
+            dir_light._m_direction = Vector3D(*direction)
+            dir_light._m_diffuse_color = Vector3D(*diffuse)
+            dir_light._m_spec_color = Vector3D(*spec)
+
+    # World matrices (n, 4, 4) float32, as Actor.compute_world_transform()
+    # builds them: scale * rotation * translation (row vectors)
+    @staticmethod
+    def compute_world_transforms(positions: np.ndarray, rotations: np.ndarray,
+                                 scales: np.ndarray) -> np.ndarray:
+        x, y, z, w = (rotations[:, i].astype(np.float64) for i in range(4))
+        s: np.ndarray = scales.astype(np.float64)
+        worlds: np.ndarray = np.zeros((len(positions), 4, 4), np.float32)
+        worlds[:, 0, 0] = (1.0 - 2.0 * y * y - 2.0 * z * z) * s
+        worlds[:, 0, 1] = (2.0 * x * y + 2.0 * w * z) * s
+        worlds[:, 0, 2] = (2.0 * x * z - 2.0 * w * y) * s
+        worlds[:, 1, 0] = (2.0 * x * y - 2.0 * w * z) * s
+        worlds[:, 1, 1] = (1.0 - 2.0 * x * x - 2.0 * z * z) * s
+        worlds[:, 1, 2] = (2.0 * y * z + 2.0 * w * x) * s
+        worlds[:, 2, 0] = (2.0 * x * z + 2.0 * w * y) * s
+        worlds[:, 2, 1] = (2.0 * y * z - 2.0 * w * x) * s
+        worlds[:, 2, 2] = (1.0 - 2.0 * x * x - 2.0 * y * y) * s
+        worlds[:, 3, 0:3] = positions
+        worlds[:, 3, 3] = 1.0
+        return worlds
+
+    def get_assets(self) -> list:
+        return self._m_assets
+
+    def get_num_actors(self) -> int:
+        return len(self._m_actors)
+
+    # Actor records (ACTOR_DTYPE)
+    def get_actors(self) -> np.ndarray:
+        return self._m_actors
+
+    @staticmethod
+    def _open_binary(file_name: str) -> Scene:
+        scene = Scene()
+        try:
+            scene._m_file_obj = open(file_name, "rb")
+            scene._m_map = mmap.mmap(scene._m_file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            sdl2.SDL_Log(b"Scene not found: ", file_name.encode())
+            scene.close()
+            return None
+        if len(scene._m_map) < Scene.HEADER.size:
+            sdl2.SDL_Log(b"Scene is not a compiled scene: ", file_name.encode())
+            scene.close()
+            return None
+
+        magic, version, num_actors, flags, *lights = Scene.HEADER.unpack_from(scene._m_map, 0)
+        if magic != Scene.MAGIC or version != Scene.VERSION:
+            sdl2.SDL_Log(b"Scene is not a compiled scene: ", file_name.encode())
+            scene.close()
+            return None
+        if flags & Scene.HAS_AMBIENT:
+            scene._m_ambient_light = tuple(lights[0:3])
+        if flags & Scene.HAS_DIRECTIONAL:
+            scene._m_directional_light = (tuple(lights[3:6]), tuple(lights[6:9]),
+                                          tuple(lights[9:12]))
+
+        offset: int = Scene.HEADER.size
+        num_assets: int = struct.unpack_from("<I", scene._m_map, offset)[0]
+        offset += 4
+        for _ in range(num_assets):
+            length: int = struct.unpack_from("<I", scene._m_map, offset)[0]
+            offset += 4
+            scene._m_assets.append(bytes(scene._m_map[offset:offset + length]).decode("utf-8"))
+            offset += length
+        offset = Scene._align(offset)
+        if offset + num_actors * Scene.ACTOR_DTYPE.itemsize > len(scene._m_map):
+            sdl2.SDL_Log(b"Scene is truncated: ", file_name.encode())
+            scene.close()
+            return None
+        # View into the mapping [no per-actor parsing]
+        scene._m_actors = np.frombuffer(scene._m_map, Scene.ACTOR_DTYPE, num_actors, offset)
+        return scene
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return (offset + Scene.ALIGNMENT - 1) // Scene.ALIGNMENT * Scene.ALIGNMENT
+
+
+# Offline: python scene.py <in.gpscene> <out.gpsceneb>
+def main(argv: list) -> int:
+    if len(argv) != 3:
+        print("usage: python scene.py <in.gpscene> <out.gpsceneb>")
+        return 1
+    with open(argv[1], "r") as file_obj:
+        data: dict = json.load(file_obj)
+    with open(argv[2], "wb") as file_obj:
+        file_obj.write(Scene.from_json(data).compile())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
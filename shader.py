@@ -1,7 +1,9 @@
 from __future__ import annotations
-import OpenGL.GL as GL
+from gl_backend import GL
 import sdl2
 import ctypes
+from gl_state import state_cache
+from program_cache import ProgramCache
 
 
 class Shader:
@@ -12,48 +14,113 @@ class Shader:
     a final 'shader program'.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, cache: ProgramCache = None) -> None:
         # Store shader object IDs
         self._m_vertex_shader_id: ctypes.c_uint = ctypes.c_uint()
         self._m_frag_shader_id: ctypes.c_uint = ctypes.c_uint()
         self._m_shader_program_id: ctypes.c_uint = ctypes.c_uint()
 
+        # Optional on-disk cache of linked program binaries
+        self._m_cache: ProgramCache = cache
+        # State between begin_load() and end_load()
+        self._m_names: tuple = ()
+        self._m_sources: list = []
+        self._m_cache_key: str = None
+        self._m_from_cache: bool = False
+        # Uniform name -> location [valid for the current program]
+        self._m_uniform_locations: dict = {}
+
     def delete(self) -> None:
         # TODO: Perhaps self.unload()? Currently unused
         pass
 
-    # Load vertex & frag shaders
-    def load(self, vert_name: str, frag_name: str) -> bool:
-        # Compile vertex & frag shaders
-        if (self._compile_shader(vert_name, GL.GL_VERTEX_SHADER, "vertex") == False
-                or self._compile_shader(frag_name, GL.GL_FRAGMENT_SHADER, "frag") == False):
+    # Load vertex & frag shaders [defines: variant macros, name -> value]
+    def load(self, vert_name: str, frag_name: str, defines: dict = None) -> bool:
+        if not self.begin_load(vert_name, frag_name, defines):
             return False
+        return self.end_load()
+
+    # Load many shaders: all compiles/links are submitted before any
+    # status is queried, so the driver can work on them in parallel
+    # [loads: list of (shader, vert_name, frag_name, defines)]
+    @staticmethod
+    def load_batch(loads: list) -> bool:
+        started: list = []
+        submitted: bool = True
+        for shader, vert_name, frag_name, defines in loads:
+            if not shader.begin_load(vert_name, frag_name, defines):
+                # Stop submitting, but finish the ones already started
+                submitted = False
+                break
+            started.append(shader)
+        # Query every shader even after a failure, to log all errors
+        results: list = [shader.end_load() for shader in started]
+        return submitted and all(results)
+
+    # Submit compile & link (or a cached binary) without querying status
+    def begin_load(self, vert_name: str, frag_name: str, defines: dict = None) -> bool:
+        self._m_names = (vert_name, frag_name)
+        self._m_sources = []
+        for file_name in self._m_names:
+            source: bytes = Shader._read_source(file_name, defines)
+            if source == None:
+                return False
+            self._m_sources.append(source)
 
-        # Link them together to create a 'shader program'
         self._m_shader_program_id = GL.glCreateProgram()
-        GL.glAttachShader(self._m_shader_program_id, self._m_vertex_shader_id)
-        GL.glAttachShader(self._m_shader_program_id, self._m_frag_shader_id)
-        GL.glLinkProgram(self._m_shader_program_id)
+        self._m_uniform_locations = {}
+        self._m_from_cache = False
+        if self._m_cache:
+            self._m_cache_key = self._m_cache.get_key(self._m_sources)
+            if self._m_cache.load(self._m_shader_program_id, self._m_cache_key):
+                self._m_from_cache = True
+                return True
+        self._submit_compile_and_link()
+        return True
+
+    # Query compile/link status of a begin_load(); True if usable
+    def end_load(self) -> bool:
+        if self._m_from_cache:
+            return True
+
+        vert_name, frag_name = self._m_names
+        if (not self._is_compiled(self._m_vertex_shader_id, vert_name)
+                or not self._is_compiled(self._m_frag_shader_id, frag_name)):
+            return False
 
         # Verify that program linked
-        if not self._is_valid_program:
+        if not self._is_valid_program():
             return False
+
+        if self._m_cache:
+            self._m_cache.save(self._m_shader_program_id, self._m_cache_key)
         return True
 
+    def is_from_cache(self) -> bool:
+        return self._m_from_cache
+
     def unload(self) -> None:
         # Delete shader program along with two other shaders
+        state_cache.forget_program(self._m_shader_program_id)
         GL.glDeleteProgram(self._m_shader_program_id)
         GL.glDeleteShader(self._m_vertex_shader_id)
         GL.glDeleteShader(self._m_frag_shader_id)
 
     # Sets active shader program
     def set_active(self) -> None:
-        GL.glUseProgram(self._m_shader_program_id)
+        state_cache.use_program(self._m_shader_program_id)
+
+    # Location of a uniform variable (looked up once per program)
+    def get_uniform_location(self, name: str) -> int:
+        loc: int = self._m_uniform_locations.get(name)
+        if loc is None:
+            loc = GL.glGetUniformLocation(self._m_shader_program_id, name)
+            self._m_uniform_locations[name] = loc
+        return loc
 
     def set_matrix_uniform(self, name: str, matrix: Matrix4) -> None:
         # Find uniform shader variable
-        loc: GL.GLuint = GL.glGetUniformLocation(
-            self._m_shader_program_id, name)
+        loc: GL.GLuint = self.get_uniform_location(name)
 
         # Send matrix data to uniform variable
         GL.glUniformMatrix4fv(
@@ -69,76 +136,80 @@ class Shader:
         # GL.glGetUniformfv(self._m_shader_program_id, loc, p)
         # print(list(p[0]))
 
+    # [values go as ctypes arrays, which the GL fast path accepts too]
     def set_vector_uniform(self, name: str, vector: Vector3D) -> None:
-        loc: GL.GLuint = GL.glGetUniformLocation(
-            self._m_shader_program_id, name)
+        loc: GL.GLuint = self.get_uniform_location(name)
         # Send vector data
-        GL.glUniform3fv(loc, 1, (vector.x, vector.y, vector.z))
+        GL.glUniform3fv(loc, 1, (ctypes.c_float * 3)(vector.x, vector.y, vector.z))
+
+    def set_vector4_uniform(self, name: str, values: tuple) -> None:
+        loc: GL.GLuint = self.get_uniform_location(name)
+        # Send vec4 data
+        GL.glUniform4fv(loc, 1, (ctypes.c_float * 4)(*values))
+
+    def set_int_uniform(self, name: str, value: int) -> None:
+        loc: GL.GLuint = self.get_uniform_location(name)
+        # Send int data (also used for sampler units)
+        GL.glUniform1i(loc, value)
 
     def set_float_uniform(self, name: str, value: float) -> None:
-        loc: GL.GLuint = GL.glGetUniformLocation(
-            self._m_shader_program_id, name)
+        loc: GL.GLuint = self.get_uniform_location(name)
         # Send float data
         GL.glUniform1f(loc, value)
 
-    # Compile specified shader, [TODO simplify this func.]
-    def _compile_shader(self, file_name: str, shader_type: GL.GLenum, name: str) -> bool:
-        if name == "vertex":
-            # Open file
-            source_file_obj = open(file_name, "r")
-            if source_file_obj:
-                # Read file to byte object
-                source_byte_obj = source_file_obj.read().encode()
-                source_file_obj.close()
-
-                # Create a shader of specific type
-                self._m_vertex_shader_id = GL.glCreateShader(shader_type)
-                # Set a source code for this shader
-                GL.glShaderSource(self._m_vertex_shader_id, source_byte_obj)
-                # Try to compile this shader
-                GL.glCompileShader(self._m_vertex_shader_id)
-
-                if not self._is_compiled(self._m_vertex_shader_id):
-                    sdl2.SDL_Log(b"Failed to compile shader: ", file_name)
-                    return False
-            else:
-                sdl2.SDL_Log(b"Shader file not found: ", file_name)
-                return False
-            return True
+    # Compile vertex & frag shaders and link them into a 'shader program'
+    def _submit_compile_and_link(self) -> None:
+        self._m_vertex_shader_id = Shader._compile_shader(
+            self._m_sources[0], GL.GL_VERTEX_SHADER)
+        self._m_frag_shader_id = Shader._compile_shader(
+            self._m_sources[1], GL.GL_FRAGMENT_SHADER)
 
-        elif name == "frag":
-            # Open file
-            source_file_obj = open(file_name, "r")
-            if source_file_obj:
-                # Read file to byte object
-                source_byte_obj = source_file_obj.read().encode()
-                source_file_obj.close()
-
-                # Create a shader of specific type
-                self._m_frag_shader_id = GL.glCreateShader(shader_type)
-                # Set a source code for this shader
-                GL.glShaderSource(self._m_frag_shader_id, source_byte_obj)
-                # Try to compile this shader
-                GL.glCompileShader(self._m_frag_shader_id)
-
-                if not self._is_compiled(self._m_frag_shader_id):
-                    sdl2.SDL_Log(b"Failed to compile shader: ", file_name)
-                    return False
-            else:
-                sdl2.SDL_Log(b"Shader file not found: ", file_name)
-                return False
+        GL.glAttachShader(self._m_shader_program_id, self._m_vertex_shader_id)
+        GL.glAttachShader(self._m_shader_program_id, self._m_frag_shader_id)
+        if self._m_cache:
+            # Ask the driver to keep a binary we can save
+            GL.glProgramParameteri(self._m_shader_program_id,
+                                   GL.GL_PROGRAM_BINARY_RETRIEVABLE_HINT, GL.GL_TRUE)
+        GL.glLinkProgram(self._m_shader_program_id)
 
-            return True
-        else:
-            raise NotImplementedError()
+    # Create and compile one shader (status is queried later)
+    @staticmethod
+    def _compile_shader(source: bytes, shader_type: GL.GLenum) -> int:
+        # Create a shader of specific type
+        shader_id = GL.glCreateShader(shader_type)
+        # Set a source code for this shader
+        GL.glShaderSource(shader_id, source)
+        # Try to compile this shader
+        GL.glCompileShader(shader_id)
+        return shader_id
+
+    # Read source file, inserting variant #defines after '#version'
+    @staticmethod
+    def _read_source(file_name: str, defines: dict) -> bytes:
+        try:
+            with open(file_name, "r") as source_file_obj:
+                source: str = source_file_obj.read()
+        except OSError:
+            sdl2.SDL_Log(b"Shader file not found: ", file_name.encode())
+            return None
+
+        if defines:
+            lines: list = source.split("\n")
+            version: int = next((i for i, line in enumerate(lines)
+                                 if line.strip().startswith("#version")), -1)
+            lines[version + 1:version + 1] = ["#define {} {}".format(name, value)
+                                              for name, value in sorted(defines.items())]
+            source = "\n".join(lines)
+        return source.encode()
 
     # Test whether shader is compiled
-    def _is_compiled(self, shader_id: ctypes.c_uint) -> bool:
+    def _is_compiled(self, shader_id: ctypes.c_uint, file_name: str) -> bool:
         # Query compile status
         status: int = GL.glGetShaderiv(shader_id, GL.GL_COMPILE_STATUS)
 
         if status != GL.GL_TRUE:
             err = GL.glGetShaderInfoLog(shader_id)
+            sdl2.SDL_Log(b"Failed to compile shader: ", file_name.encode())
             sdl2.SDL_Log(b"GLSL compile failed because: ", err)
             return False
         return True
@@ -0,0 +1,7 @@
+// Request GLSL 3.3
+#version 330
+
+// Depth pre-pass: color writes are masked, only depth is written
+void main()
+{
+}
\ No newline at end of file
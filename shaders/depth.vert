@@ -0,0 +1,20 @@
+// Request GLSL 3.3
+#version 330
+
+// Uniforms for world transform and view-proj
+uniform mat4 uWorldTransform;
+uniform mat4 uViewProj;
+
+// Same transform as phong.vert, so depths match exactly
+invariant gl_Position;
+
+// Only position is needed for depth
+layout(location = 0) in vec3 inPosition;
+
+void main()
+{
+	// Transform position to world space, then clip space
+	vec4 pos = vec4(inPosition, 1.0);
+	pos = pos * uWorldTransform;
+	gl_Position = pos * uViewProj;
+}
\ No newline at end of file
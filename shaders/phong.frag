@@ -14,6 +14,10 @@ out vec4 outColor;
 
 // This is used for the texture sampling
 uniform sampler2D uTexture;
+// Sub-rectangle of texture to sample (u0, v0, u1, v1) [atlas pages]
+uniform vec4 uTexRect;
+// Tile tex coords outside [0, 1] inside the rect (else clamp to its edges)
+uniform bool uTexRepeat;
 
 // Create a struct for directional light
 struct DirectionalLight
@@ -37,6 +41,64 @@ uniform vec3 uAmbientLight;
 // Directional Light
 uniform DirectionalLight uDirLight;
 
+#ifdef CLUSTERED_LIGHTS
+// Clustered point/spot lights
+// Per light 3 texels: (pos, radius), (color, cos outer), (dir, cos inner)
+uniform samplerBuffer uLightData;
+// Per cluster: (offset, count) into uLightIndices
+uniform usamplerBuffer uClusterGrid;
+uniform usamplerBuffer uLightIndices;
+// View matrix (for view-space depth)
+uniform mat4 uView;
+// Clusters in x, y (screen tiles) and z (exponential depth slices)
+uniform vec3 uClusterDims;
+// (x tiles / width, y tiles / height, z slices / log(far / near), near)
+uniform vec4 uClusterScale;
+
+// Sum diffuse + specular of this fragment's cluster lights
+vec3 ClusterLights(vec3 N, vec3 V)
+{
+	float Depth = (vec4(fragWorldPos, 1.0) * uView).z;
+	ivec3 Cluster = ivec3(
+		int(gl_FragCoord.x * uClusterScale.x),
+		int(gl_FragCoord.y * uClusterScale.y),
+		int(log(max(Depth, uClusterScale.w) / uClusterScale.w) * uClusterScale.z));
+	Cluster = clamp(Cluster, ivec3(0), ivec3(uClusterDims) - 1);
+	int ClusterIndex = (Cluster.z * int(uClusterDims.y) + Cluster.y) * int(uClusterDims.x) + Cluster.x;
+	uvec2 Range = texelFetch(uClusterGrid, ClusterIndex).xy;
+
+	vec3 Light = vec3(0.0);
+	for (uint i = 0u; i < Range.y; i++)
+	{
+		int Index = int(texelFetch(uLightIndices, int(Range.x + i)).x) * 3;
+		vec4 PosRadius = texelFetch(uLightData, Index);
+		vec4 ColorOuter = texelFetch(uLightData, Index + 1);
+		vec4 DirInner = texelFetch(uLightData, Index + 2);
+
+		vec3 ToLight = PosRadius.xyz - fragWorldPos;
+		float Dist = length(ToLight);
+		vec3 L = ToLight / max(Dist, 0.0001);
+		// Smooth falloff reaching zero at the radius
+		float Falloff = clamp(1.0 - (Dist * Dist) / (PosRadius.w * PosRadius.w), 0.0, 1.0);
+		Falloff *= Falloff;
+		// Spot cone (cos outer < -1 means point light)
+		if (ColorOuter.w > -1.5)
+		{
+			Falloff *= smoothstep(ColorOuter.w, DirInner.w, dot(-L, DirInner.xyz));
+		}
+
+		float NdotL = dot(N, L);
+		if (NdotL > 0 && Falloff > 0)
+		{
+			vec3 R = normalize(reflect(-L, N));
+			Light += ColorOuter.rgb * Falloff *
+				(NdotL + pow(max(0.0, dot(R, V)), uSpecPower));
+		}
+	}
+	return Light;
+}
+#endif
+
 void main()
 {
 	// Surface normal
@@ -57,7 +119,19 @@ void main()
 		vec3 Specular = uDirLight.mSpecColor * pow(max(0.0, dot(R, V)), uSpecPower);
 		Phong += Diffuse + Specular;
 	}
+#ifdef CLUSTERED_LIGHTS
+	Phong += ClusterLights(N, V);
+#endif
+
+	// Map tex coord into the sub-rectangle: clamped, so 1.0 stays on the
+	// far edge, or wrapped if the mesh repeats (gradients of the unwrapped
+	// coord keep filtering seamless across the wrap)
+	vec2 RectSize = uTexRect.zw - uTexRect.xy;
+	vec2 LocalCoord = uTexRepeat ? fract(fragTexCoord) : clamp(fragTexCoord, 0.0, 1.0);
+	vec2 TexCoord = uTexRect.xy + LocalCoord * RectSize;
+	vec4 TexColor = textureGrad(uTexture, TexCoord,
+		dFdx(fragTexCoord) * RectSize, dFdy(fragTexCoord) * RectSize);
 
 	// Final color is texture color times phong light (alpha = 1)
-    outColor = texture(uTexture, fragTexCoord) * vec4(Phong, 1.0f);
+    outColor = TexColor * vec4(Phong, 1.0f);
 }
\ No newline at end of file
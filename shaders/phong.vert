@@ -5,6 +5,9 @@
 uniform mat4 uWorldTransform;
 uniform mat4 uViewProj;
 
+// Must match depth.vert for the depth pre-pass
+invariant gl_Position;
+
 // Attribute 0 is position, 1 is normal, 2 is tex coords.
 layout(location = 0) in vec3 inPosition;
 layout(location = 1) in vec3 inNormal;
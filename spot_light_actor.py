@@ -0,0 +1,32 @@
+from __future__ import annotations
+import math
+from maths import to_radians
+from point_light_actor import PointLightActor
+
+
+class SpotLightActor(PointLightActor):
+    """
+    This class is a point light limited to a cone along its forward vector.
+    """
+
+    def __init__(self, game: Game) -> None:
+        super().__init__(game)
+
+        # Full intensity inside inner angle, zero outside outer angle (radians)
+        self._m_inner_angle: float = to_radians(20.0)
+        self._m_outer_angle: float = to_radians(30.0)
+
+    def get_cone_cosines(self) -> tuple:
+        return (math.cos(self._m_outer_angle), math.cos(self._m_inner_angle))
+
+    def get_inner_angle(self) -> float:
+        return self._m_inner_angle
+
+    def set_inner_angle(self, angle: float) -> None:
+        self._m_inner_angle = angle
+
+    def get_outer_angle(self) -> float:
+        return self._m_outer_angle
+
+    def set_outer_angle(self, angle: float) -> None:
+        self._m_outer_angle = angle
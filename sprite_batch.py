@@ -0,0 +1,180 @@
+from __future__ import annotations
+from gl_backend import GL
+import numpy as np
+import ctypes
+from maths import Matrix4
+from gl_state import state_cache
+
+
+class SpriteBatch:
+    """
+    This class draws all sprite components with a handful of draw calls.
+
+    Quad corners are transformed on the CPU in one vectorized pass and
+    streamed into a single vertex buffer. Each run of sprites that share
+    a texture (in draw order) is then drawn with one call.
+    """
+
+    # Floats per vertex (same PosNormTex layout as the sprite quad)
+    VERT_SIZE = 8
+    # Quad corners: (x, y, u, v) for top left, top right, bottom right, bottom left
+    QUAD_CORNERS = np.array([
+        [-0.5, 0.5, 0.0, 0.0],
+        [0.5, 0.5, 1.0, 0.0],
+        [0.5, -0.5, 1.0, 1.0],
+        [-0.5, -0.5, 0.0, 1.0]], dtype=np.float32)
+    # Two triangles per quad
+    QUAD_INDICES = np.array([0, 1, 2, 2, 3, 0], dtype=np.uint32)
+
+    def __init__(self, max_sprites: int = 1024) -> None:
+        # Number of sprites the buffers can hold before growing
+        self._m_max_sprites: int = 0
+        # OpenGL IDs
+        self._m_vertex_array_id: ctypes.c_uint = ctypes.c_uint(0)
+        self._m_vertex_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        self._m_index_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
+        # Sprites are already in world space
+        self._m_identity: Matrix4 = Matrix4()
+        # Stats of the last draw
+        self._m_num_sprites: int = 0
+        self._m_num_draw_calls: int = 0
+
+        # Create vertex array and buffers
+        GL.glGenVertexArrays(1, ctypes.byref(self._m_vertex_array_id))
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
+        GL.glGenBuffers(1, ctypes.byref(self._m_vertex_buffer_id))
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._m_vertex_buffer_id)
+        GL.glGenBuffers(1, ctypes.byref(self._m_index_buffer_id))
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self._m_index_buffer_id)
+
+        # Same attributes as VertexArray (pos, normal, texture coord.)
+        stride: int = ctypes.sizeof(ctypes.c_float) * SpriteBatch.VERT_SIZE
+        GL.glEnableVertexAttribArray(0)
+        GL.glVertexAttribPointer(0, 3, GL.GL_FLOAT, GL.GL_FALSE, stride, None)
+        GL.glEnableVertexAttribArray(1)
+        GL.glVertexAttribPointer(1, 3, GL.GL_FLOAT, GL.GL_FALSE, stride,
+                                 ctypes.c_void_p(ctypes.sizeof(ctypes.c_float) * 3))
+        GL.glEnableVertexAttribArray(2)
+        GL.glVertexAttribPointer(2, 2, GL.GL_FLOAT, GL.GL_FALSE, stride,
+                                 ctypes.c_void_p(ctypes.sizeof(ctypes.c_float) * 6))
+
+        self._reserve(max_sprites)
+
+    def delete(self) -> None:
+        # Delete in reverse
+        GL.glDeleteBuffers(1, ctypes.byref(self._m_vertex_buffer_id))
+        GL.glDeleteBuffers(1, ctypes.byref(self._m_index_buffer_id))
+        state_cache.forget_vertex_array(self._m_vertex_array_id)
+        GL.glDeleteVertexArrays(1, ctypes.byref(self._m_vertex_array_id))
+
+    # Draw sprites (already sorted by draw order) with the sprite shader active
+    def draw(self, sprites: list, shader: Shader) -> None:
+        vertices, runs = SpriteBatch.build(sprites)
+        self.draw_vertices(vertices, runs, shader)
+
+    # CPU half of draw: world-space quads and (texture, start, count) runs
+    # [touches no GL, so it can run on the update thread]
+    @staticmethod
+    def build(sprites: list) -> tuple:
+        sprites = [s for s in sprites if s.get_texture() is not None]
+        if not sprites:
+            return np.zeros((0, 4, SpriteBatch.VERT_SIZE), dtype=np.float32), ()
+        runs: tuple = tuple((sprites[start].get_texture(), start, count)
+                            for start, count in SpriteBatch.texture_runs(sprites))
+        return SpriteBatch.build_vertices(sprites), runs
+
+    # GL half of draw: stream quads and issue one draw per run
+    def draw_vertices(self, vertices: np.ndarray, runs: tuple, shader: Shader) -> None:
+        self._m_num_sprites = len(vertices)
+        self._m_num_draw_calls = 0
+        if not runs:
+            return
+
+        self._reserve(len(vertices))
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
+        # Orphan the old storage so the driver never waits on last frame's draws
+        GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._m_vertex_buffer_id)
+        GL.glBufferData(GL.GL_ARRAY_BUFFER, self._m_max_sprites * 4 * SpriteBatch.VERT_SIZE *
+                        ctypes.sizeof(ctypes.c_float), None, GL.GL_STREAM_DRAW)
+        GL.glBufferSubData(GL.GL_ARRAY_BUFFER, 0, vertices.nbytes, vertices)
+
+        # Corners are in world space already
+        shader.set_matrix_uniform("uWorldTransform", self._m_identity)
+
+        # One draw call per run of same-texture sprites
+        for texture, start, count in runs:
+            texture.set_active()
+            GL.glDrawElements(
+                GL.GL_TRIANGLES,
+                count * 6,
+                GL.GL_UNSIGNED_INT,
+                ctypes.c_void_p(start * 6 * ctypes.sizeof(ctypes.c_uint)))
+            self._m_num_draw_calls += 1
+
+    # Transform quad corners of all sprites to world space in one pass
+    @staticmethod
+    def build_vertices(sprites: list) -> np.ndarray:
+        num: int = len(sprites)
+        # Stack world transforms into (num, 4, 4) [row vectors: v * M]
+        mats: np.ndarray = np.frombuffer(
+            b"".join(bytes(s.get_owner().get_world_transform().m_mat) for s in sprites),
+            dtype=np.float32).reshape(num, 4, 4)
+        sizes: np.ndarray = np.array(
+            [(s.get_text_width(), s.get_text_height()) for s in sprites],
+            dtype=np.float32)
+        # (u0, v0, u1, v1) of each texture [atlas regions are sub-rects]
+        uv_rects: np.ndarray = np.array(
+            [s.get_texture().get_uv_rect() for s in sprites], dtype=np.float32)
+
+        corners: np.ndarray = SpriteBatch.QUAD_CORNERS
+        # Local corner x/y scaled by texture size: (num, 4)
+        xs: np.ndarray = corners[:, 0] * sizes[:, 0:1]
+        ys: np.ndarray = corners[:, 1] * sizes[:, 1:2]
+
+        vertices: np.ndarray = np.zeros(
+            (num, 4, SpriteBatch.VERT_SIZE), dtype=np.float32)
+        # Position: x * row0 + y * row1 + row3 (z = 0, w = 1)
+        vertices[:, :, 0:3] = (xs[:, :, None] * mats[:, None, 0, 0:3] +
+                               ys[:, :, None] * mats[:, None, 1, 0:3] +
+                               mats[:, None, 3, 0:3])
+        # Texture coords. mapped into each texture's UV rect
+        vertices[:, :, 6:8] = (uv_rects[:, None, 0:2] + corners[:, 2:4] *
+                               (uv_rects[:, None, 2:4] - uv_rects[:, None, 0:2]))
+        return vertices
+
+    # Split sprites into (start, count) runs sharing the same GL texture
+    # [Atlas regions of one page share it]
+    @staticmethod
+    def texture_runs(sprites: list) -> list:
+        runs: list = []
+        start: int = 0
+        tex_ids: list = [s.get_texture().get_texture_id() for s in sprites]
+        for i in range(1, len(sprites) + 1):
+            if i == len(sprites) or tex_ids[i] != tex_ids[start]:
+                runs.append((start, i - start))
+                start = i
+        return runs
+
+    # Grow buffers so they hold at least num_sprites quads
+    def _reserve(self, num_sprites: int) -> None:
+        if num_sprites <= self._m_max_sprites:
+            return
+        max_sprites: int = max(self._m_max_sprites, 1)
+        while max_sprites < num_sprites:
+            max_sprites *= 2
+        self._m_max_sprites = max_sprites
+
+        # Index buffer never changes between frames, so fill it once
+        indices: np.ndarray = (SpriteBatch.QUAD_INDICES[None, :] +
+                               4 * np.arange(max_sprites, dtype=np.uint32)[:, None])
+        indices = np.ascontiguousarray(indices, dtype=np.uint32)
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
+        GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self._m_index_buffer_id)
+        GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER,
+                        indices.nbytes, indices, GL.GL_STATIC_DRAW)
+
+    def get_num_sprites(self) -> int:
+        return self._m_num_sprites
+
+    def get_num_draw_calls(self) -> int:
+        return self._m_num_draw_calls
@@ -1,6 +1,6 @@
 from __future__ import annotations
 import sdl2
-import OpenGL.GL as GL
+from gl_backend import GL
 from maths import Matrix4
 import ctypes
 from component import Component
@@ -15,14 +15,18 @@ class SpriteComponent(Component):
         self.m_text_width: int = 0
         self.m_text_height: int = 0
 
-        self._m_owner.get_game().add_sprite(self)
+        self._m_owner.get_game().get_renderer().add_sprite(self)
 
     def delete(self) -> None:
         # Remove from owner's list
         super().delete()
         # Remove from game's list
-        self._m_owner.get_game().remove_sprite(self)
+        self._m_owner.get_game().get_renderer().remove_sprite(self)
+        if self.m_texture:
+            self._m_owner.get_game().get_renderer().release_resource(self.m_texture)
+            self.m_texture = None
 
+    # Draws this sprite alone [Renderer batches all sprites instead]
     def draw(self, shader: Shader) -> None:
         # Scale quad mesh by width/height of texture
         scale_mat: Matrix4 = Matrix4.create_scale_matrix_xyz(
@@ -49,13 +53,21 @@ class SpriteComponent(Component):
             None
         )
 
+    # [referenced while set, so it is never evicted in use]
     def set_texture(self, texture: Texture) -> None:
+        renderer: Renderer = self._m_owner.get_game().get_renderer()
+        renderer.acquire_resource(texture)
+        if self.m_texture:
+            renderer.release_resource(self.m_texture)
         self.m_texture = texture
 
         # Set width/height
         self.m_text_width = texture.get_width()
         self.m_text_height = texture.get_height()
 
+    def get_texture(self) -> Texture:
+        return self.m_texture
+
     def get_draw_order(self) -> int:
         return self.m_draw_order
 
@@ -0,0 +1,103 @@
+from __future__ import annotations
+import contextlib
+import threading
+import time
+
+
+class StartupProfiler:
+    """
+    This class times the steps from process start to the first frame.
+
+    Steps are timed with section() (nested sections are allowed) or
+    record(); asset loads record themselves from the loader threads, so
+    those overlap the main-thread steps instead of adding to them. Two
+    milestones end the profile: the first frame on screen and the first
+    frame with every requested asset uploaded.
+    """
+
+    def __init__(self) -> None:
+        self._m_start: float = time.perf_counter()
+        self._m_lock: threading.Lock = threading.Lock()
+        # (name, start s, duration s, thread name, depth)
+        self._m_sections: list = []
+        # Section nesting depth, per thread
+        self._m_local: threading.local = threading.local()
+        self._m_first_frame: float = None
+        self._m_assets_ready: float = None
+
+    # Start the clock again [it starts when this module is imported]
+    def reset(self) -> None:
+        with self._m_lock:
+            self._m_start = time.perf_counter()
+            self._m_sections.clear()
+            self._m_first_frame = None
+            self._m_assets_ready = None
+
+    @contextlib.contextmanager
+    def section(self, name: str):
+        start: float = time.perf_counter()
+        depth: int = self._get_depth()
+        self._m_local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._m_local.depth = depth
+            self._add(name, start, time.perf_counter() - start, depth)
+
+    # A step timed elsewhere (ends now) [any thread]
+    def record(self, name: str, seconds: float) -> None:
+        self._add(name, time.perf_counter() - seconds, seconds, self._get_depth())
+
+    def mark_first_frame(self) -> None:
+        if self._m_first_frame is None:
+            self._m_first_frame = time.perf_counter() - self._m_start
+
+    def mark_assets_ready(self) -> None:
+        if self._m_assets_ready is None:
+            self._m_assets_ready = time.perf_counter() - self._m_start
+
+    def is_finished(self) -> bool:
+        return self._m_assets_ready is not None
+
+    # Seconds from reset() to the first frame (None until then)
+    def get_time_to_first_frame(self) -> float:
+        return self._m_first_frame
+
+    # Seconds from reset() to the first frame with all assets (None until then)
+    def get_time_to_assets_ready(self) -> float:
+        return self._m_assets_ready
+
+    # Name -> total seconds (a name timed several times is summed)
+    def get_totals(self) -> dict:
+        totals: dict = {}
+        with self._m_lock:
+            for name, _, seconds, _, _ in self._m_sections:
+                totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+    # One line per step in start order, for logging
+    def format_summary(self) -> str:
+        with self._m_lock:
+            sections: list = sorted(self._m_sections, key=lambda section: section[1])
+        lines: list = ["{:<40}{:>10}{:>10}  {}".format("step", "start ms", "ms", "thread")]
+        for name, start, seconds, thread, depth in sections:
+            lines.append("{:<40}{:>10.1f}{:>10.1f}  {}".format(
+                "  " * depth + name, start * 1000.0, seconds * 1000.0, thread))
+        if self._m_first_frame is not None:
+            lines.append("{:<40}{:>10.1f}".format("first frame", self._m_first_frame * 1000.0))
+        if self._m_assets_ready is not None:
+            lines.append("{:<40}{:>10.1f}".format("all assets ready",
+                                                   self._m_assets_ready * 1000.0))
+        return "\n".join(lines)
+
+    def _get_depth(self) -> int:
+        return getattr(self._m_local, "depth", 0)
+
+    def _add(self, name: str, start: float, seconds: float, depth: int) -> None:
+        with self._m_lock:
+            self._m_sections.append((name, start - self._m_start, seconds,
+                                     threading.current_thread().name, depth))
+
+
+# Shared by main, Game, Renderer and AssetLoader
+startup_profiler: StartupProfiler = StartupProfiler()
@@ -0,0 +1,58 @@
+from __future__ import annotations
+import os
+import sys
+
+# Headless: no display or audio device needed
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytest
+
+import gl_backend
+from gl_backend import RecordingBackend, set_backend
+from gl_state import state_cache
+
+
+@pytest.fixture(autouse=True)
+def root_dir(monkeypatch) -> str:
+    # Asset paths are relative to the repository root
+    monkeypatch.chdir(ROOT)
+    return ROOT
+
+
+@pytest.fixture
+def recorder() -> RecordingBackend:
+    backend: RecordingBackend = RecordingBackend()
+    set_backend(backend)
+    state_cache.invalidate()
+    yield backend
+    set_backend(gl_backend._pyopengl)
+    state_cache.invalidate()
+
+
+# make_game(build): headless Game whose scene is build(game), run until
+# every asset is uploaded
+@pytest.fixture
+def make_game(recorder: RecordingBackend):
+    from scene_game import SceneGame
+    games: list = []
+
+    def make(build, max_frames: int = 500) -> SceneGame:
+        game: SceneGame = SceneGame(build)
+        games.append(game)
+        assert game.initialize()
+        game.set_fixed_delta_time(1.0 / 60.0)
+        loader = game.get_renderer().get_asset_loader()
+        frames: int = 0
+        # At least one frame, so pending actors are added
+        while frames == 0 or loader.get_num_pending() != 0:
+            assert frames < max_frames, "assets did not finish loading"
+            game.run_frame()
+            frames += 1
+        return game
+
+    yield make
+    for game in games:
+        game.shutdown()
@@ -0,0 +1,24 @@
+from __future__ import annotations
+from camera_actor import CameraActor
+from game import Game
+from scene import Scene
+
+
+class SceneGame(Game):
+    """
+    This class is a headless Game whose actors come from a callback.
+    """
+
+    def __init__(self, build) -> None:
+        super().__init__(headless=True)
+        # build(game) creates the scene's actors
+        self._m_build = build
+
+    # Implements: lights from the scene file, actors from build
+    def _load_data(self) -> None:
+        scene: Scene = Scene.load(Game.SCENE_FILE)
+        if scene:
+            scene.apply_lights(self._m_renderer)
+            scene.close()
+        self._m_build(self)
+        self._m_camera_actor = CameraActor(self)
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import numpy as np
+
+from maths import Matrix4, Vector3D, to_radians
+from mesh import Mesh
+from occlusion_culler import OcclusionCuller
+
+WIDTH = 64
+HEIGHT = 32
+# Square occluder facing the camera at x = 100, |y|, |z| <= 50
+QUAD_POSITIONS = np.array([[100.0, -50.0, -50.0], [100.0, 50.0, -50.0],
+                           [100.0, 50.0, 50.0], [100.0, -50.0, 50.0]], dtype=np.float32)
+QUAD_INDICES = np.array([[0, 1, 2], [2, 3, 0]], dtype=np.int64)
+
+
+# Camera as the renderer sets it: at the origin, looking down +x, z up
+def make_culler() -> OcclusionCuller:
+    culler: OcclusionCuller = OcclusionCuller(WIDTH, HEIGHT)
+    view: Matrix4 = Matrix4.create_look_at(
+        Vector3D(0.0, 0.0, 0.0), Vector3D(1.0, 0.0, 0.0), Vector3D(0.0, 0.0, 1.0))
+    projection: Matrix4 = Matrix4.create_perspective_FOV(
+        to_radians(70.0), 1024.0, 768.0, 25.0, 10000.0)
+    culler.begin_frame(view, projection)
+    culler.rasterize(QUAD_POSITIONS, QUAD_INDICES, Matrix4())
+    culler.build_hiz()
+    return culler
+
+
+# z/w of a world point with the culler's view-projection
+def project_depth(culler: OcclusionCuller, point: tuple) -> float:
+    clip: np.ndarray = np.append(np.array(point, dtype=np.float32), 1.0) @ culler._m_view_proj
+    return float(clip[2] / clip[3])
+
+
+def test_rasterize_quad_depth():
+    culler: OcclusionCuller = make_culler()
+    depth: np.ndarray = culler.get_depth()
+    assert culler.get_num_occluder_triangles() == 2
+
+    # Flat quad facing the camera: one depth where it covers the screen
+    covered: np.ndarray = depth < 1.0
+    assert covered[HEIGHT // 2, WIDTH // 2]
+    assert np.allclose(depth[covered], project_depth(culler, (100.0, 0.0, 0.0)), atol=1e-5)
+    # Corners are beyond the quad
+    assert depth[0, 0] == 1.0 and depth[-1, -1] == 1.0
+    # Screen-aligned: the covered pixels form a rectangle
+    rows: np.ndarray = np.flatnonzero(covered.any(axis=1))
+    cols: np.ndarray = np.flatnonzero(covered.any(axis=0))
+    assert covered[rows[0]:rows[-1] + 1, cols[0]:cols[-1] + 1].all()
+    assert covered.sum() == len(rows) * len(cols)
+
+
+def test_hiz_keeps_max_depth():
+    culler: OcclusionCuller = make_culler()
+    hiz: list = culler._m_hiz
+    assert hiz[0] is culler.get_depth()
+    assert hiz[-1].shape == (1, 1)
+    for finer, coarser in zip(hiz, hiz[1:]):
+        assert coarser.shape == ((finer.shape[0] + 1) // 2, (finer.shape[1] + 1) // 2)
+        # Odd sizes are padded with the far plane
+        padded: np.ndarray = np.ones((coarser.shape[0] * 2, coarser.shape[1] * 2),
+                                     dtype=np.float32)
+        padded[:finer.shape[0], :finer.shape[1]] = finer
+        assert np.array_equal(coarser, padded.reshape(
+            coarser.shape[0], 2, coarser.shape[1], 2).max(axis=(1, 3)))
+    # Partly covered: the whole screen is as far as its farthest texel
+    assert hiz[-1][0, 0] == 1.0
+
+
+def test_spheres_behind_beside_and_near():
+    culler: OcclusionCuller = make_culler()
+    centers: np.ndarray = np.array([
+        [300.0, 0.0, 0.0],      # Behind the quad
+        [300.0, 190.0, 0.0],    # Beside it, still on screen
+        [0.0, 0.0, 0.0]],       # Around the camera: crosses the near plane
+        dtype=np.float32)
+    radii: np.ndarray = np.array([10.0, 10.0, 40.0], dtype=np.float32)
+    visible: np.ndarray = culler.test_spheres(centers, radii)
+
+    assert visible.tolist() == [False, True, True]
+    assert culler.get_num_tested() == 3
+    assert culler.get_num_occluded() == 1
+    assert culler.get_time_ms() > 0.0
+
+
+def test_sphere_in_front_of_quad_is_visible():
+    culler: OcclusionCuller = make_culler()
+    visible: np.ndarray = culler.test_spheres(
+        np.array([[60.0, 0.0, 0.0]], dtype=np.float32), np.array([5.0], dtype=np.float32))
+    assert visible.tolist() == [True]
+    assert culler.get_num_occluded() == 0
+
+
+def test_begin_frame_clears():
+    culler: OcclusionCuller = make_culler()
+    culler.test_spheres(np.zeros((1, 3), dtype=np.float32), np.ones(1, dtype=np.float32))
+    culler.begin_frame(Matrix4(), Matrix4())
+    assert (culler.get_depth() == 1.0).all()
+    assert culler.get_num_occluder_triangles() == 0
+    assert culler.get_num_tested() == 0
+
+
+# Simplified LODs can stick out past the surface: full detail by default
+def test_occluder_proxy_is_full_detail(recorder, monkeypatch):
+    data: dict = Mesh.read("assets/sphere.gpmesh")
+    full, coarse = data["sets"][0][1], data["sets"][-1][1]
+    assert coarse.size < full.size
+
+    mesh: Mesh = Mesh()
+    mesh.create(data, [])
+    assert len(mesh.get_proxy()[1]) * 3 == full.size
+
+    monkeypatch.setattr(Mesh, "COARSE_OCCLUDER_PROXY", True)
+    mesh = Mesh()
+    mesh.create(data, [])
+    assert len(mesh.get_proxy()[1]) * 3 == coarse.size
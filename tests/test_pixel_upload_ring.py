@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import numpy as np
+
+from gl_backend import GL
+from pixel_upload_ring import PixelBuffer, PixelUploadRing
+
+
+# Record the access flags of every glMapBufferRange
+def record_maps(recorder) -> list:
+    flags: list = []
+
+    def map_buffer_range(target, offset, size, access):
+        flags.append(access)
+        return recorder.glMapBufferRange(target, offset, size, access)
+    GL.override("glMapBufferRange", map_buffer_range)
+    return flags
+
+
+# Fences never signal: every wait runs into its timeout
+def never_signal() -> None:
+    GL.override("glClientWaitSync", lambda sync, flags, timeout: GL.GL_TIMEOUT_EXPIRED)
+
+
+def test_wait_timeout_keeps_fence(recorder):
+    buffer: PixelBuffer = PixelBuffer(64)
+    buffer.set_fence()
+    never_signal()
+    recorder.reset()
+    assert buffer.wait(PixelUploadRing.WAIT_TIMEOUT_NS) is False
+    assert buffer.is_busy()
+    assert not buffer.is_free()
+    assert recorder.get_num_calls("glDeleteSync") == 0
+
+
+def test_wait_signaled_frees(recorder):
+    buffer: PixelBuffer = PixelBuffer(64)
+    buffer.set_fence()
+    assert buffer.wait(PixelUploadRing.WAIT_TIMEOUT_NS) is True
+    assert not buffer.is_busy()
+    assert recorder.get_num_calls("glDeleteSync") == 1
+
+
+# 16 rows of 16 bytes through two 64-byte buffers: four bands of 4 rows
+def upload_bands(ring: PixelUploadRing) -> None:
+    pixels: np.ndarray = np.zeros((16, 4, 4), dtype=np.uint8)
+    ring.upload(1, 0, 0, 0, pixels)
+
+
+def test_upload_timeout_maps_synchronized(recorder):
+    flags: list = record_maps(recorder)
+    never_signal()
+    ring: PixelUploadRing = PixelUploadRing(num_buffers=2, buffer_size=64)
+    upload_bands(ring)
+
+    assert len(flags) == 4
+    # Fresh buffers: no driver sync
+    assert all(access & GL.GL_MAP_UNSYNCHRONIZED_BIT for access in flags[:2])
+    # Still in flight after the timeout: never unsynchronized
+    assert not any(access & GL.GL_MAP_UNSYNCHRONIZED_BIT for access in flags[2:])
+    assert ring.get_num_waits() == 2
+    assert ring.get_num_timeouts() == 2
+    assert ring.get_num_uploads() == 4
+
+
+def test_upload_wait_reuses_unsynchronized(recorder):
+    flags: list = record_maps(recorder)
+    ring: PixelUploadRing = PixelUploadRing(num_buffers=2, buffer_size=64)
+    upload_bands(ring)
+
+    # Fences signal at once, so no wait and no synchronized map
+    assert len(flags) == 4
+    assert all(access & GL.GL_MAP_UNSYNCHRONIZED_BIT for access in flags)
+    assert ring.get_num_waits() == 0
+    assert ring.get_num_timeouts() == 0
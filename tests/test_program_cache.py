@@ -0,0 +1,64 @@
+from __future__ import annotations
+import os
+
+import pytest
+
+from gl_backend import GL
+from program_cache import ProgramCache
+from shader import Shader
+
+SOURCES = [b"void main() {}", b"void main() {}"]
+
+
+# Cache with program binaries "supported" by the recording backend
+@pytest.fixture
+def cache(recorder, tmp_path) -> ProgramCache:
+    GL.override("glGetIntegerv", lambda name: 1)
+    cache: ProgramCache = ProgramCache(str(tmp_path))
+    cache.initialize()
+    assert cache.is_enabled()
+    return cache
+
+
+@pytest.mark.parametrize("contents", [b"", b"\x01\x02"])
+def test_truncated_entry_is_a_miss(cache, contents):
+    key: str = cache.get_key(SOURCES)
+    with open(cache._path(key), "wb") as file_obj:
+        file_obj.write(contents)
+    assert cache.load(GL.glCreateProgram(), key) is False
+    assert cache.get_num_misses() == 1
+    assert cache.get_num_hits() == 0
+
+
+def test_save_replaces_entry(cache, recorder, tmp_path):
+    GL.override("glGetProgramiv", lambda program, name: 16)
+    key: str = cache.get_key(SOURCES)
+    cache.save(GL.glCreateProgram(), key)
+    # Binary format, then the binary the driver wrote (none here)
+    assert os.listdir(str(tmp_path)) == [key + ".bin"]
+    assert os.path.getsize(cache._path(key)) == 4
+
+    GL.override("glGetProgramiv", lambda program, name: GL.GL_TRUE)
+    assert cache.load(GL.glCreateProgram(), key) is True
+    assert cache.get_num_hits() == 1
+
+
+# A failed begin_load() stops the batch, but started shaders are finished
+def test_load_batch_finishes_started_shaders(recorder, monkeypatch):
+    finished: list = []
+    end_load = Shader.end_load
+
+    def record_end_load(shader: Shader) -> bool:
+        finished.append(shader)
+        return end_load(shader)
+    monkeypatch.setattr(Shader, "end_load", record_end_load)
+
+    first: Shader = Shader()
+    second: Shader = Shader()
+    never: Shader = Shader()
+    loads: list = [(first, "shaders/sprite.vert", "shaders/sprite.frag", None),
+                   (second, "shaders/missing.vert", "shaders/sprite.frag", None),
+                   (never, "shaders/sprite.vert", "shaders/sprite.frag", None)]
+    assert Shader.load_batch(loads) is False
+    assert finished == [first]
+    assert recorder.get_num_calls("glGetProgramiv") >= 1
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from actor import Actor
+from gl_state import state_cache
+from maths import Vector3D
+from mesh_component import MeshComponent
+from sprite_component import SpriteComponent
+
+MESH_FILE = "assets/cube.gpmesh"
+TEXTURE_UPLOADS = ("glTexImage2D", "glTexSubImage2D",
+                   "glCompressedTexImage2D", "glCompressedTexSubImage2D")
+
+
+def add_meshes(game, count: int) -> None:
+    for i in range(count):
+        actor: Actor = Actor(game)
+        actor.set_position(Vector3D(500.0, (i - count / 2) * 60.0, 0.0))
+        actor.set_scale(20.0)
+        MeshComponent(actor).set_mesh_handle(
+            game.get_renderer().get_mesh_async(MESH_FILE))
+
+
+def add_sprites(game, texture_files: list) -> None:
+    for i, file_name in enumerate(texture_files):
+        actor: Actor = Actor(game)
+        actor.set_position(Vector3D(i * 40.0, 0.0, 0.0))
+        SpriteComponent(actor).set_texture(game.get_renderer().get_texture(file_name))
+
+
+# Record exactly one frame
+def record_frame(game, recorder) -> dict:
+    recorder.reset()
+    state_cache.reset_stats()
+    game.run_frame()
+    return recorder.get_call_counts()
+
+
+def test_one_draw_per_mesh(make_game, recorder):
+    game = make_game(lambda game: add_meshes(game, 5))
+    calls: dict = record_frame(game, recorder)
+    assert calls.get("glDrawElementsBaseVertex", 0) == 5
+    assert recorder.get_num_draw_calls() == 5
+    assert game.get_renderer().get_num_draw_calls() == 5
+
+
+def test_steady_frame_uploads(make_game, recorder):
+    game = make_game(lambda game: add_meshes(game, 5))
+    record_frame(game, recorder)
+    num_bytes: int = recorder.get_num_bytes_uploaded()
+    calls: dict = record_frame(game, recorder)
+    # Assets are in: only per-frame buffers (lights) are streamed
+    assert not any(calls.get(name, 0) for name in TEXTURE_UPLOADS)
+    assert recorder.get_num_bytes_uploaded() == num_bytes
+
+
+def test_state_cache_saves_repeated_binds(make_game, recorder):
+    game = make_game(lambda game: add_meshes(game, 5))
+    record_frame(game, recorder)
+    calls: dict = record_frame(game, recorder)
+    stats: dict = state_cache.get_stats()
+    # Pooled meshes share one vertex array and one (default) texture
+    assert calls.get("glBindVertexArray", 0) == 0
+    assert stats["glBindVertexArray"] == (0, 5)
+    assert stats["glBindTexture"][0] == calls.get("glBindTexture", 0)
+    assert stats["glBindTexture"][1] >= 5
+    # Pass states are set every frame, but only changed where they differ
+    assert state_cache.get_num_saved() > 0
+
+
+def test_sprite_batch_one_draw_per_texture_run(make_game, recorder):
+    files: list = ["assets/cube.png", "assets/cube.png", "assets/sphere.png",
+                   "assets/sphere.png", "assets/cube.png", "assets/default.png"]
+    game = make_game(lambda game: add_sprites(game, files))
+    renderer = game.get_renderer()
+    calls: dict = record_frame(game, recorder)
+
+    # Runs of the same texture in draw order
+    textures: list = [sprite.get_texture() for sprite in renderer._m_sprite_comps]
+    num_runs: int = 1 + sum(1 for a, b in zip(textures, textures[1:])
+                            if a.get_texture_id() != b.get_texture_id())
+    assert num_runs >= 3
+    assert calls.get("glDrawElements", 0) == num_runs
+    assert renderer.get_sprite_batch().get_num_draw_calls() == num_runs
+    assert renderer.get_num_draw_calls() == num_runs
+    # One vertex stream for all sprites
+    assert calls.get("glBufferSubData", 0) >= 1
+    assert renderer.get_sprite_batch().get_num_sprites() == len(files)
+
+
+def test_sprites_sharing_a_texture_are_one_draw(make_game, recorder):
+    game = make_game(lambda game: add_sprites(game, ["assets/cube.png"] * 50))
+    calls: dict = record_frame(game, recorder)
+    assert calls.get("glDrawElements", 0) == 1
+    assert game.get_renderer().get_num_draw_calls() == 1
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from actor import Actor
+from maths import Vector3D
+from mesh_component import MeshComponent
+
+MESH_FILE = "assets/cube.gpmesh"
+
+
+def run_until(game, done, max_frames: int = 200) -> None:
+    for _ in range(max_frames):
+        if done():
+            return
+        game.run_frame()
+    assert done(), "gave up after {} frames".format(max_frames)
+
+
+# A handle resolved before its mesh was evicted (as Scene.instantiate_batch
+# keeps them across frames) loads the mesh again instead of drawing it
+def test_stale_handle_reloads_evicted_mesh(make_game, recorder):
+    game = make_game(lambda game: None)
+    renderer = game.get_renderer()
+    resources = renderer.get_resource_manager()
+
+    handle = renderer.get_mesh_async(MESH_FILE)
+    run_until(game, handle.is_done)
+    stale = handle.get()
+    assert stale is not None
+
+    # Nobody references it: gone under a tiny budget
+    resources.set_budget(1, 1)
+    run_until(game, lambda: MESH_FILE not in resources.get_names())
+    assert stale.get_vertex_array() is None
+    assert renderer.acquire_resource(stale) is False
+
+    actor: Actor = Actor(game)
+    actor.set_position(Vector3D(500.0, 0.0, 0.0))
+    actor.set_scale(20.0)
+    mesh_comp: MeshComponent = MeshComponent(actor)
+    mesh_comp.set_mesh_handle(handle)
+    run_until(game, lambda: mesh_comp.get_mesh() is not None)
+
+    mesh = mesh_comp.get_mesh()
+    assert mesh is not stale
+    assert mesh.get_vertex_array() is not None
+    # Referenced while in use: kept under the same budget
+    for _ in range(5):
+        game.run_frame()
+    assert resources.get_ref_count(MESH_FILE) == 1
+    assert mesh_comp.get_mesh() is mesh
+    recorder.reset()
+    game.run_frame()
+    assert recorder.get_call_counts().get("glDrawElementsBaseVertex", 0) == 1
@@ -0,0 +1,29 @@
+from __future__ import annotations
+import threading
+import time
+
+import sdl2.sdlimage as sdlimage
+
+from texture import Texture
+
+
+# Loader threads decoding at once initialize SDL_image once
+def test_image_module_initialized_once(monkeypatch):
+    calls: list = []
+
+    def img_init(flags: int) -> int:
+        calls.append(flags)
+        time.sleep(0.01)
+        return flags
+    monkeypatch.setattr(sdlimage, "IMG_Init", img_init)
+    monkeypatch.setattr(Texture, "_image_module", None)
+
+    modules: list = []
+    threads: list = [threading.Thread(target=lambda: modules.append(Texture.get_image_module()))
+                     for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert modules == [sdlimage] * 8
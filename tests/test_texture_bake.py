@@ -0,0 +1,62 @@
+from __future__ import annotations
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from texture_bake import BakedTexture
+
+
+def write_baked(path, size: int = 8) -> bytes:
+    pixels: np.ndarray = np.arange(size * size * 4, dtype=np.uint8).reshape(size, size, 4)
+    data: bytes = BakedTexture.bake(pixels)
+    with open(path, "wb") as file_obj:
+        file_obj.write(data)
+    return data
+
+
+def test_open_full_file(tmp_path):
+    path = str(tmp_path / "image.gptex")
+    write_baked(path)
+    baked: BakedTexture = BakedTexture.open(path)
+    assert baked is not None
+    assert baked.get_num_levels() == 4
+    assert baked.get_level(0).shape == (8, 8, 4)
+    assert baked.get_level(3).shape == (1, 1, 4)
+    baked.close()
+
+
+# Cut inside the header, the level table, and the last blob
+@pytest.mark.parametrize("cut", ["empty", "header", "table", "blob"])
+def test_truncated_file_is_not_opened(tmp_path, cut):
+    path = str(tmp_path / "image.gptex")
+    data: bytes = write_baked(path)
+    table_end: int = BakedTexture.HEADER.size + 4 * BakedTexture.LEVEL_ENTRY.size
+    length: int = {"empty": 0, "header": BakedTexture.HEADER.size - 2,
+                   "table": table_end - 3, "blob": len(data) - 1}[cut]
+    with open(path, "wb") as file_obj:
+        file_obj.write(data[:length])
+    assert BakedTexture.open(path) is None
+
+
+# The loader falls back to decoding the image next to a broken bake
+def test_loader_decodes_image_behind_truncated_bake(make_game, tmp_path):
+    image: str = str(tmp_path / "cube.png")
+    shutil.copy("assets/cube.png", image)
+    baked: str = str(tmp_path / "cube.gptex")
+    data: bytes = write_baked(baked)
+    with open(baked, "wb") as file_obj:
+        file_obj.write(data[:BakedTexture.HEADER.size + 5])
+    stat = os.stat(image)
+    os.utime(baked, (stat.st_atime + 10, stat.st_mtime + 10))
+    assert BakedTexture.find(image) == baked
+
+    game = make_game(lambda game: None)
+    handle = game.get_renderer().get_texture_async(image)
+    for _ in range(200):
+        if handle.is_done():
+            break
+        game.run_frame()
+    assert handle.is_ready()
+    assert handle.get().get_width() > 8
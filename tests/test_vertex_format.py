@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from json_parser import json_parser
+from mesh import Mesh
+from vertex_format import VertexFormat
+
+MESH_FILES = ("assets/cube.gpmesh", "assets/sphere.gpmesh")
+# Format -> largest tex coord error
+UV_TOLERANCES = {"PosNormTexSnorm": 1.6e-5, "PosNormTexHalf": 1e-3}
+# Degrees, under either normalization rule [0.08 with a packing for one rule]
+NORMAL_TOLERANCE = 0.1
+
+
+# Float (n, 8) vertices of every LOD in a .gpmesh file
+def read_vertices(file_name: str) -> np.ndarray:
+    data: dict = json_parser.load(file_name)
+    return np.concatenate([
+        Mesh._read_vertex_data(set_data["vertices"], set_data["indices"], file_name)[0]
+        for set_data in [data] + data.get("lods", [])])
+
+
+# GL_INT_2_10_10_10_REV, normalized: signed 10-bit codes of x, y, z
+def normal_codes(encoded: np.ndarray) -> np.ndarray:
+    packed: np.ndarray = encoded["normal"][:, 0].astype(np.int64)
+    c: np.ndarray = np.stack([(packed >> shift) & 0x3FF for shift in (0, 10, 20)], axis=1)
+    return np.where(c >= 512, c - 1024, c)
+
+
+# Signed normalized integer -> float, as the GL version decodes it
+def decode_snorm(c: np.ndarray, bits: int, gl42: bool) -> np.ndarray:
+    max_code: int = (1 << (bits - 1)) - 1
+    if gl42:
+        return np.maximum(c / max_code, -1.0)
+    return (2.0 * c + 1.0) / (2 * max_code + 1)
+
+
+def angles(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    cosine: np.ndarray = np.einsum("ij,ij->i", a, b) / (
+        np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+@pytest.mark.parametrize("file_name", MESH_FILES)
+@pytest.mark.parametrize("format_name", sorted(UV_TOLERANCES))
+def test_compact_format_error(file_name, format_name):
+    vertices: np.ndarray = read_vertices(file_name)
+    vertex_format: VertexFormat = VertexFormat.get(format_name)
+    encoded: np.ndarray = vertex_format.encode(vertices)
+    assert encoded.dtype.itemsize == 20
+
+    assert np.array_equal(encoded["position"], vertices[:, 0:3])
+
+    codes: np.ndarray = normal_codes(encoded)
+    for gl42 in (False, True):
+        normals: np.ndarray = decode_snorm(codes, 10, gl42)
+        assert angles(normals, vertices[:, 3:6]).max() <= NORMAL_TOLERANCE
+
+    texcoords: np.ndarray = encoded["texcoord"]
+    if texcoords.dtype == np.int16:
+        # Shorts: both rules, the GL 4.2+ one is what the encoder targets
+        for gl42 in (False, True):
+            error: float = np.abs(decode_snorm(texcoords, 16, gl42) - vertices[:, 6:8]).max()
+            if gl42:
+                assert error <= UV_TOLERANCES[format_name]
+            else:
+                # (2c + 1) / 65535 is off by at most half a step more
+                assert error <= UV_TOLERANCES[format_name] + 0.5 / 32767.0
+    else:
+        error = np.abs(texcoords.astype(np.float32) - vertices[:, 6:8]).max()
+        assert error <= UV_TOLERANCES[format_name]
+
+
+# decode() is the GL 3.3 view of encode()
+@pytest.mark.parametrize("format_name", sorted(UV_TOLERANCES))
+def test_decode_matches_gl33(format_name):
+    vertices: np.ndarray = read_vertices("assets/sphere.gpmesh")
+    vertex_format: VertexFormat = VertexFormat.get(format_name)
+    encoded: np.ndarray = vertex_format.encode(vertices)
+    decoded: np.ndarray = vertex_format.decode(encoded)
+    assert np.allclose(decoded[:, 3:6], decode_snorm(normal_codes(encoded), 10, False))
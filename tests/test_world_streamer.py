@@ -0,0 +1,66 @@
+from __future__ import annotations
+import time
+
+from maths import Vector3D
+from world_streamer import SyntheticChunkSource, WorldStreamer, spawn_actor
+
+MESH_FILE = "assets/cube.gpmesh"
+
+
+def make_source() -> SyntheticChunkSource:
+    return SyntheticChunkSource(chunk_size=500.0, extent=8, actors_per_chunk=8,
+                                meshes=(MESH_FILE,))
+
+
+def streamed_actors(streamer: WorldStreamer) -> list:
+    return [actor for chunk in streamer._m_chunks.values() for actor in chunk.get_actors()]
+
+
+# Run frames until no chunk is loading (reads are on a worker thread)
+def settle(game, streamer: WorldStreamer, max_frames: int = 500) -> None:
+    for _ in range(max_frames):
+        game.run_frame()
+        if streamer.get_num_loading() == 0 and \
+                game.get_renderer().get_asset_loader().get_num_pending() == 0:
+            return
+        time.sleep(0.001)
+    assert False, "chunks did not finish streaming"
+
+
+# Spawned actors are drawable on their first frame (the mesh is already
+# loaded, so they are drawn straight away) while the camera moves
+def test_streamed_actors_have_world_transforms(make_game, recorder):
+    # Mesh in before anything streams
+    game = make_game(lambda game: game.get_renderer().get_mesh_async(MESH_FILE))
+    streamer: WorldStreamer = WorldStreamer(game, make_source(), 1000.0)
+    game.set_world_streamer(streamer)
+    camera = game._m_camera_actor
+
+    num_deleted: int = 0
+    for step in range(6):
+        camera.set_position(Vector3D(step * 400.0, step * 100.0, 0.0))
+        game.run_frame()
+        num_deleted += streamer.get_num_deleted()
+        settle(game, streamer)
+        num_deleted += streamer.get_num_deleted()
+
+        actors: list = streamed_actors(streamer)
+        assert actors
+        assert streamer.get_num_actors() == len(actors)
+        for actor in actors:
+            assert actor in game.get_actors()
+            world = actor.get_world_transform()
+            assert world is not None
+            translation: Vector3D = world.get_translation()
+            assert abs(translation.x - actor.get_position().x) < 1e-3
+            assert abs(translation.y - actor.get_position().y) < 1e-3
+    # The camera left the first chunks behind
+    assert num_deleted > 0
+
+
+def test_spawn_actor_outside_update(make_game, recorder):
+    game = make_game(lambda game: None)
+    actor = spawn_actor(game, {"type": "mesh", "mesh": MESH_FILE,
+                               "position": [100.0, 200.0, 0.0], "scale": 2.0})
+    assert actor.get_world_transform() is not None
+    game.run_frame()
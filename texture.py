@@ -1,8 +1,11 @@
 from __future__ import annotations
-import OpenGL.GL as GL
+from gl_backend import GL
 import sdl2
-import sdl2.sdlimage as sdlimage
 import ctypes
+import threading
+import numpy as np
+from gl_state import state_cache
+from texture_bake import BakedTexture
 
 
 class Texture:
@@ -10,42 +13,111 @@ class Texture:
     This class uses SDL_Image library to load texture files for PyOpenGL.
     """
 
+    # SDL_image module, once get_image_module() loaded it
+    _image_module = None
+    # Loader threads may be first to decode
+    _image_lock: threading.Lock = threading.Lock()
+    # UV rect of a whole texture
+    FULL_UV_RECT = (0.0, 0.0, 1.0, 1.0)
+
     def __init__(self) -> None:
         # OpenGL ID of texture
         self._m_texture_id: ctypes.c_uint = ctypes.c_uint(0)
         # Width/hegith of texture
         self._m_width: int = 0
         self._m_height: int = 0
+        # Bytes per texel on the GPU
+        self._m_bytes_per_pixel: int = 4
+        # Mip levels uploaded (baked textures have a full chain)
+        self._m_num_levels: int = 1
+        # Sub-rectangle in UV space (u0, v0, u1, v1) [atlas regions]
+        self._m_uv_rect: tuple = Texture.FULL_UV_RECT
+        # Sub-textures share their page's GL texture
+        self._m_owns_texture: bool = True
 
     def delete(self) -> None:
         # TODO: Not used, perhaps self.unload()?
         pass
 
-    def load(self, file_name: str) -> bool:
-        # Python string -> C string (char*)
-        file_name = ctypes.c_char_p(file_name.encode())
-
-        # Load image from a file
-        surface: sdl2.SDL_Surface = sdlimage.IMG_Load(file_name)
+    # [an up-to-date baked .gptex next to the image is used instead]
+    # [ring: stream pixels through pixel buffers instead of a blocking copy]
+    def load(self, file_name: str, ring: PixelUploadRing = None) -> bool:
+        baked_name: str = file_name
+        if not file_name.endswith(BakedTexture.EXTENSION):
+            baked_name = BakedTexture.find(file_name)
+        if baked_name != None:
+            baked: BakedTexture = BakedTexture.open(baked_name)
+            if baked != None:
+                self.load_baked(baked, ring)
+                baked.close()
+                return True
+            sdl2.SDL_Log(b"Baked texture not valid: ", baked_name.encode())
+
+        surface: sdl2.SDL_Surface = Texture.decode(file_name)
         if surface == None:
-            sdl2.SDL_Log(b"Failed to load image file: ", file_name)
             return False
 
+        self.load_from_surface(surface, ring)
+
+        # Free image data
+        sdl2.SDL_FreeSurface(surface)
+
+        return True
+
+    # SDL_image, imported and initialized on first use [startup with
+    # baked textures only never needs it]
+    @staticmethod
+    def get_image_module():
+        if Texture._image_module is None:
+            with Texture._image_lock:
+                if Texture._image_module is None:
+                    import sdl2.sdlimage as sdlimage
+                    if sdlimage.IMG_Init(sdlimage.IMG_INIT_PNG) == 0:
+                        sdl2.SDL_Log(b"Image initialization failed: ", sdl2.SDL_GetError())
+                    Texture._image_module = sdlimage
+        return Texture._image_module
+
+    @staticmethod
+    def quit_image_module() -> None:
+        with Texture._image_lock:
+            if Texture._image_module is not None:
+                Texture._image_module.IMG_Quit()
+                Texture._image_module = None
+
+    # Load image from a file, no GL calls [safe on a worker thread]
+    # Caller frees the surface with SDL_FreeSurface
+    @staticmethod
+    def decode(file_name: str) -> sdl2.SDL_Surface:
+        # Python string -> C string (char*)
+        c_file_name = ctypes.c_char_p(file_name.encode())
+
+        surface: sdl2.SDL_Surface = Texture.get_image_module().IMG_Load(c_file_name)
+        if not surface:
+            sdl2.SDL_Log(b"Failed to load image file: ", c_file_name)
+            return None
+        return surface
+
+    # Upload pixels of an SDL surface (caller still owns the surface)
+    def load_from_surface(self, surface: sdl2.SDL_Surface, ring: PixelUploadRing = None) -> None:
         format = GL.GL_RGB
+        self._m_bytes_per_pixel = 3
         if surface.contents.format.contents.BytesPerPixel == 4:
             format = GL.GL_RGBA
+            self._m_bytes_per_pixel = 4
 
         self._m_width = surface.contents.w
         self._m_height = surface.contents.h
 
         GL.glGenTextures(1, ctypes.byref(self._m_texture_id))
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self._m_texture_id)
+        state_cache.bind_texture(GL.GL_TEXTURE_2D, self._m_texture_id)
 
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, format, surface.contents.w,
-                        surface.contents.h, 0, format, GL.GL_UNSIGNED_BYTE, ctypes.c_char_p(surface.contents.pixels))
-
-        # Free image data
-        sdl2.SDL_FreeSurface(surface)
+        if ring != None:
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, format, surface.contents.w,
+                            surface.contents.h, 0, format, GL.GL_UNSIGNED_BYTE, None)
+            ring.upload(self._m_texture_id, 0, 0, 0, Texture._surface_pixels(surface))
+        else:
+            GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, format, surface.contents.w,
+                            surface.contents.h, 0, format, GL.GL_UNSIGNED_BYTE, ctypes.c_char_p(surface.contents.pixels))
 
         # Enable bilinear filtering
         GL.glTexParameteri(
@@ -53,16 +125,110 @@ class Texture:
         GL.glTexParameteri(
             GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
 
-        return True
+    # Upload every mip level of a baked texture, sampled trilinearly
+    # [no decode: levels are views into the file mapping]
+    def load_baked(self, baked: BakedTexture, ring: PixelUploadRing = None) -> None:
+        self._m_width = baked.get_width()
+        self._m_height = baked.get_height()
+        self._m_bytes_per_pixel = 4
+        self._m_num_levels = baked.get_num_levels()
+
+        GL.glGenTextures(1, ctypes.byref(self._m_texture_id))
+        state_cache.bind_texture(GL.GL_TEXTURE_2D, self._m_texture_id)
+        for level in range(self._m_num_levels):
+            width, height = baked.get_level_size(level)
+            if ring != None:
+                GL.glTexImage2D(GL.GL_TEXTURE_2D, level, GL.GL_RGBA8, width, height, 0,
+                                GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+                ring.upload(self._m_texture_id, level, 0, 0, baked.get_level(level))
+            else:
+                GL.glTexImage2D(GL.GL_TEXTURE_2D, level, GL.GL_RGBA8, width, height, 0,
+                                GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, baked.get_level(level))
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAX_LEVEL, self._m_num_levels - 1)
+
+        # Enable trilinear filtering
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR_MIPMAP_LINEAR)
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+
+    # Empty RGBA8 texture whose pixels are streamed with update()
+    def create_dynamic(self, width: int, height: int) -> None:
+        self._m_width = width
+        self._m_height = height
+        self._m_bytes_per_pixel = 4
+        GL.glGenTextures(1, ctypes.byref(self._m_texture_id))
+        state_cache.bind_texture(GL.GL_TEXTURE_2D, self._m_texture_id)
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA8, width, height, 0,
+                        GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MIN_FILTER, GL.GL_LINEAR)
+        GL.glTexParameteri(
+            GL.GL_TEXTURE_2D, GL.GL_TEXTURE_MAG_FILTER, GL.GL_LINEAR)
+
+    # Stream RGBA8 pixels (height, width, 4) into a rectangle of level 0
+    def update(self, ring: PixelUploadRing, pixels: np.ndarray, x: int = 0, y: int = 0) -> None:
+        ring.upload(self._m_texture_id, 0, x, y, pixels)
+
+    # (height, width, bytes per pixel) view of a surface's pixels [no copy]
+    @staticmethod
+    def _surface_pixels(surface: sdl2.SDL_Surface) -> np.ndarray:
+        width: int = surface.contents.w
+        height: int = surface.contents.h
+        bytes_per_pixel: int = surface.contents.format.contents.BytesPerPixel
+        rows: np.ndarray = np.ctypeslib.as_array(
+            ctypes.cast(surface.contents.pixels, ctypes.POINTER(ctypes.c_ubyte)),
+            (height, surface.contents.pitch))
+        return rows[:, 0:width * bytes_per_pixel].reshape(height, width, bytes_per_pixel)
+
+    # Create a texture referencing a pixel rectangle of another texture
+    @staticmethod
+    def create_sub_texture(texture: Texture, x: int, y: int, width: int, height: int) -> Texture:
+        sub: Texture = Texture()
+        sub._m_texture_id = texture._m_texture_id
+        sub._m_owns_texture = False
+        sub._m_width = width
+        sub._m_height = height
+
+        # Pixel rect -> UV rect of parent's UV rect
+        u0, v0, u1, v1 = texture._m_uv_rect
+        du: float = (u1 - u0) / texture._m_width
+        dv: float = (v1 - v0) / texture._m_height
+        sub._m_uv_rect = (u0 + x * du, v0 + y * dv,
+                          u0 + (x + width) * du, v0 + (y + height) * dv)
+        return sub
 
     def unload(self) -> None:
-        GL.glDeleteTextures(1, self._m_texture_id)
+        if self._m_owns_texture:
+            state_cache.forget_texture(self._m_texture_id)
+            GL.glDeleteTextures(1, self._m_texture_id)
 
     def set_active(self) -> None:
-        GL.glBindTexture(GL.GL_TEXTURE_2D, self._m_texture_id)
+        state_cache.bind_texture(GL.GL_TEXTURE_2D, self._m_texture_id)
 
     def get_width(self) -> int:
         return self._m_width
 
     def get_height(self) -> int:
         return self._m_height
+
+    # Estimated GPU memory [sub-textures use their page's]
+    def get_gpu_size(self) -> int:
+        if not self._m_owns_texture:
+            return 0
+        size: int = 0
+        width, height = self._m_width, self._m_height
+        for _ in range(self._m_num_levels):
+            size += width * height * self._m_bytes_per_pixel
+            width, height = max(width // 2, 1), max(height // 2, 1)
+        return size
+
+    def get_num_levels(self) -> int:
+        return self._m_num_levels
+
+    def get_uv_rect(self) -> tuple:
+        return self._m_uv_rect
+
+    def get_texture_id(self) -> int:
+        return self._m_texture_id.value
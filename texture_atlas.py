@@ -0,0 +1,266 @@
+from __future__ import annotations
+import sdl2dll      # SDL DLLs
+import sdl2         # SDL
+import json
+import os
+import sys
+from texture import Texture
+from json_parser import json_parser
+
+
+class SkylinePacker:
+    """
+    This class packs rectangles into one page with the skyline bottom-left rule.
+
+    The skyline is a list of [x, y, width] segments describing the top edge
+    of everything packed so far. A rectangle goes where its top ends lowest.
+    """
+
+    def __init__(self, width: int, height: int) -> None:
+        self._m_width: int = width
+        self._m_height: int = height
+        self._m_skyline: list = [[0, 0, width]]
+
+    # Returns (x, y) of the packed rectangle, or None if it does not fit
+    def insert(self, width: int, height: int) -> tuple:
+        best_index: int = -1
+        best_x: int = 0
+        best_y: int = 0
+        best_top: int = self._m_height + 1
+        best_width: int = self._m_width + 1
+
+        for i, (x, _, seg_width) in enumerate(self._m_skyline):
+            y: int = self._fit(i, width, height)
+            if y < 0:
+                continue
+            top: int = y + height
+            # Lowest top edge first, then narrowest segment
+            if top < best_top or (top == best_top and seg_width < best_width):
+                best_index, best_x, best_y = i, x, y
+                best_top, best_width = top, seg_width
+
+        if best_index < 0:
+            return None
+        self._add_segment(best_index, best_x, best_y + height, width)
+        return (best_x, best_y)
+
+    # Height a rectangle would rest at when placed on segment index (or -1)
+    def _fit(self, index: int, width: int, height: int) -> int:
+        x: int = self._m_skyline[index][0]
+        if x + width > self._m_width:
+            return -1
+        y: int = 0
+        remaining: int = width
+        while remaining > 0:
+            _, seg_y, seg_width = self._m_skyline[index]
+            y = max(y, seg_y)
+            if y + height > self._m_height:
+                return -1
+            remaining -= seg_width
+            index += 1
+        return y
+
+    def _add_segment(self, index: int, x: int, y: int, width: int) -> None:
+        self._m_skyline.insert(index, [x, y, width])
+
+        # Shrink or remove segments now covered by the new one
+        i: int = index + 1
+        while i < len(self._m_skyline):
+            seg = self._m_skyline[i]
+            prev = self._m_skyline[i - 1]
+            overlap: int = prev[0] + prev[2] - seg[0]
+            if overlap <= 0:
+                break
+            seg[0] += overlap
+            seg[2] -= overlap
+            if seg[2] > 0:
+                break
+            del self._m_skyline[i]
+
+        # Merge neighbours at the same height
+        i = 0
+        while i < len(self._m_skyline) - 1:
+            if self._m_skyline[i][1] == self._m_skyline[i + 1][1]:
+                self._m_skyline[i][2] += self._m_skyline[i + 1][2]
+                del self._m_skyline[i + 1]
+            else:
+                i += 1
+
+
+class TextureAtlas:
+    """
+    This class packs many small images into a few large atlas pages.
+
+    Atlases are built either at load time (pages stay in memory) or offline
+    with 'python texture_atlas.py', which writes page PNGs plus a JSON
+    manifest of pixel rectangles that Renderer.load_atlas reads back.
+    """
+
+    def __init__(self, page_size: int = 2048, padding: int = 2) -> None:
+        self._m_page_size: int = page_size
+        self._m_padding: int = padding
+        # SDL surfaces of atlas pages (RGBA32)
+        self._m_pages: list = []
+        # Image name -> (page index, x, y, width, height)
+        self._m_regions: dict = {}
+
+    def delete(self) -> None:
+        for page in self._m_pages:
+            sdl2.SDL_FreeSurface(page)
+        self._m_pages.clear()
+
+    # Pack image files into pages [False if any failed to load or fit;
+    # the ones that fit are still packed]
+    def build(self, file_names: list) -> bool:
+        images: list = []
+        for file_name in file_names:
+            surface = TextureAtlas._load_rgba(file_name)
+            if surface == None:
+                sdl2.SDL_Log(b"Failed to load image file: ", file_name.encode())
+                for _, image in images:
+                    sdl2.SDL_FreeSurface(image)
+                return False
+            images.append((file_name, surface))
+
+        # Tallest first packs tighter
+        images.sort(key=lambda item: (item[1].contents.h, item[1].contents.w),
+                    reverse=True)
+
+        packers: list = []
+        num_too_large: int = 0
+        for file_name, image in images:
+            width: int = image.contents.w + 2 * self._m_padding
+            height: int = image.contents.h + 2 * self._m_padding
+            if width > self._m_page_size or height > self._m_page_size:
+                sdl2.SDL_Log(b"Image is larger than atlas page: ",
+                             file_name.encode())
+                sdl2.SDL_FreeSurface(image)
+                num_too_large += 1
+                continue
+
+            # First page with room, else start a new page
+            pos: tuple = None
+            page_index: int = 0
+            for page_index, packer in enumerate(packers):
+                pos = packer.insert(width, height)
+                if pos:
+                    break
+            if not pos:
+                packers.append(SkylinePacker(
+                    self._m_page_size, self._m_page_size))
+                self._m_pages.append(sdl2.SDL_CreateRGBSurfaceWithFormat(
+                    0, self._m_page_size, self._m_page_size, 32,
+                    sdl2.SDL_PIXELFORMAT_RGBA32))
+                page_index = len(packers) - 1
+                pos = packers[page_index].insert(width, height)
+
+            x: int = pos[0] + self._m_padding
+            y: int = pos[1] + self._m_padding
+            self._blit(image, self._m_pages[page_index], x, y)
+            self._m_regions[file_name] = (page_index, x, y,
+                                          image.contents.w, image.contents.h)
+            sdl2.SDL_FreeSurface(image)
+        return num_too_large == 0
+
+    # Write page images and a manifest (pages are named after the manifest)
+    def save(self, manifest_name: str) -> bool:
+        base: str = os.path.splitext(manifest_name)[0]
+        page_names: list = []
+        for i, page in enumerate(self._m_pages):
+            page_name: str = "{}_{}.png".format(base, i)
+            if Texture.get_image_module().IMG_SavePNG(page, page_name.encode()) != 0:
+                sdl2.SDL_Log(b"Failed to save atlas page: ", page_name.encode())
+                return False
+            page_names.append(os.path.basename(page_name))
+
+        manifest: dict = {
+            "version": 1,
+            "pageSize": self._m_page_size,
+            "pages": page_names,
+            "regions": {name: {"page": page, "x": x, "y": y, "width": w, "height": h}
+                        for name, (page, x, y, w, h) in self._m_regions.items()}
+        }
+        with open(manifest_name, "w") as file_obj:
+            json.dump(manifest, file_obj, indent=1)
+        return True
+
+    # Upload pages and create one sub-texture per packed image
+    def create_textures(self) -> tuple:
+        pages: list = []
+        for page in self._m_pages:
+            texture = Texture()
+            texture.load_from_surface(page)
+            pages.append(texture)
+        regions: dict = {}
+        for name, (page, x, y, w, h) in self._m_regions.items():
+            regions[name] = Texture.create_sub_texture(pages[page], x, y, w, h)
+        return pages, regions
+
+    def get_regions(self) -> dict:
+        return self._m_regions
+
+    def get_num_pages(self) -> int:
+        return len(self._m_pages)
+
+    # Read a manifest written by save(): returns (page files, regions) or None
+    @staticmethod
+    def read_manifest(manifest_name: str) -> tuple:
+        data = json_parser.load(manifest_name)
+        if data is None:
+            sdl2.SDL_Log(b"Atlas manifest not valid: ", manifest_name.encode())
+            return None
+        if data.get("version") != 1:
+            sdl2.SDL_Log(b"Atlas manifest is not version 1: ",
+                         manifest_name.encode())
+            return None
+
+        folder: str = os.path.dirname(manifest_name)
+        page_files: list = [os.path.join(folder, p) for p in data["pages"]]
+        regions: dict = {name: (r["page"], r["x"], r["y"], r["width"], r["height"])
+                         for name, r in data["regions"].items()}
+        return page_files, regions
+
+    @staticmethod
+    def _load_rgba(file_name: str) -> sdl2.SDL_Surface:
+        surface = Texture.get_image_module().IMG_Load(file_name.encode())
+        if surface == None:
+            return None
+        rgba = sdl2.SDL_ConvertSurfaceFormat(
+            surface, sdl2.SDL_PIXELFORMAT_RGBA32, 0)
+        sdl2.SDL_FreeSurface(surface)
+        return rgba
+
+    # Copy image into page, extruding its edges into the padding
+    def _blit(self, image: sdl2.SDL_Surface, page: sdl2.SDL_Surface, x: int, y: int) -> None:
+        w: int = image.contents.w
+        h: int = image.contents.h
+        sdl2.SDL_SetSurfaceBlendMode(image, sdl2.SDL_BLENDMODE_NONE)
+        sdl2.SDL_BlitSurface(image, None, page, sdl2.SDL_Rect(x, y, w, h))
+
+        # Extruded edges stop bilinear filtering bleeding in neighbours
+        for p in range(1, self._m_padding + 1):
+            edges: list = [
+                (sdl2.SDL_Rect(0, 0, w, 1), sdl2.SDL_Rect(x, y - p, w, 1)),
+                (sdl2.SDL_Rect(0, h - 1, w, 1), sdl2.SDL_Rect(x, y + h - 1 + p, w, 1)),
+                (sdl2.SDL_Rect(0, 0, 1, h), sdl2.SDL_Rect(x - p, y, 1, h)),
+                (sdl2.SDL_Rect(w - 1, 0, 1, h), sdl2.SDL_Rect(x + w - 1 + p, y, 1, h))]
+            for src, dst in edges:
+                sdl2.SDL_BlitSurface(image, src, page, dst)
+
+
+# Offline: python texture_atlas.py <manifest.json> <image> [<image> ...]
+def main(argv: list) -> int:
+    if len(argv) < 3:
+        print("usage: texture_atlas.py <manifest.json> <image> [<image> ...]")
+        return 1
+    atlas = TextureAtlas()
+    ok: bool = atlas.build(argv[2:]) and atlas.save(argv[1])
+    print("{} images in {} pages".format(
+        len(atlas.get_regions()), atlas.get_num_pages()))
+    atlas.delete()
+    Texture.quit_image_module()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,239 @@
+from __future__ import annotations
+import ctypes
+import mmap
+import os
+import struct
+import sys
+import sdl2
+import numpy as np
+
+
+class BakedTexture:
+    """
+    This class reads and writes baked textures (.gptex).
+
+    Layout (little endian):
+        header      magic "GPTX", version, width, height, number of levels,
+                    bytes per pixel (4: RGBA8)
+        level table per level: width, height, blob offset, blob size
+        blobs       tightly packed RGBA8 rows, 16-byte aligned
+
+    Images are decoded and their full mip chain (2x2 box filter down to
+    1x1) generated once by bake(). open() maps the file, and get_level()
+    returns NumPy views straight into the mapping for glTexImage2D.
+    """
+
+    MAGIC = b"GPTX"
+    VERSION = 1
+    HEADER = struct.Struct("<4sIIIII")
+    LEVEL_ENTRY = struct.Struct("<IIQQ")
+    ALIGNMENT = 16
+    EXTENSION = ".gptex"
+
+    def __init__(self) -> None:
+        self._m_file_obj = None
+        self._m_map: mmap.mmap = None
+        self._m_width: int = 0
+        self._m_height: int = 0
+        # Per level: (width, height, offset, size)
+        self._m_levels: list = []
+
+    # Map a .gptex file; returns None if it is not one
+    @staticmethod
+    def open(file_name: str) -> BakedTexture:
+        texture = BakedTexture()
+        try:
+            texture._m_file_obj = open(file_name, "rb")
+            texture._m_map = mmap.mmap(texture._m_file_obj.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            texture.close()
+            return None
+        if len(texture._m_map) < BakedTexture.HEADER.size:
+            texture.close()
+            return None
+
+        magic, version, width, height, num_levels, bytes_per_pixel = \
+            BakedTexture.HEADER.unpack_from(texture._m_map, 0)
+        if magic != BakedTexture.MAGIC or version != BakedTexture.VERSION or bytes_per_pixel != 4:
+            texture.close()
+            return None
+        # Truncated files fail here, not on the reader
+        offset: int = BakedTexture.HEADER.size
+        if num_levels == 0 or \
+                offset + num_levels * BakedTexture.LEVEL_ENTRY.size > len(texture._m_map):
+            texture.close()
+            return None
+        texture._m_width = width
+        texture._m_height = height
+        for _ in range(num_levels):
+            level: tuple = BakedTexture.LEVEL_ENTRY.unpack_from(texture._m_map, offset)
+            offset += BakedTexture.LEVEL_ENTRY.size
+            level_width, level_height, level_offset, level_size = level
+            if (level_size != level_width * level_height * 4 or
+                    level_offset + level_size > len(texture._m_map)):
+                texture.close()
+                return None
+            texture._m_levels.append(level)
+        return texture
+
+    # Unmap [views from get_level() must be released first]
+    def close(self) -> None:
+        if self._m_map is not None:
+            self._m_map.close()
+            self._m_map = None
+        if self._m_file_obj is not None:
+            self._m_file_obj.close()
+            self._m_file_obj = None
+
+    # Zero-copy (height, width, 4) uint8 view of a mip level
+    def get_level(self, level: int) -> np.ndarray:
+        width, height, offset, size = self._m_levels[level]
+        return np.frombuffer(self._m_map, dtype=np.uint8, count=size,
+                             offset=offset).reshape(height, width, 4)
+
+    # (width, height) of a mip level
+    def get_level_size(self, level: int) -> tuple:
+        return self._m_levels[level][0:2]
+
+    def get_num_levels(self) -> int:
+        return len(self._m_levels)
+
+    def get_width(self) -> int:
+        return self._m_width
+
+    def get_height(self) -> int:
+        return self._m_height
+
+    # Bytes of all levels
+    def get_data_size(self) -> int:
+        return sum(level[3] for level in self._m_levels)
+
+    # Baked file of an image, if it exists and is not older than the image
+    @staticmethod
+    def find(file_name: str) -> str:
+        baked_name: str = os.path.splitext(file_name)[0] + BakedTexture.EXTENSION
+        try:
+            if os.path.getmtime(baked_name) >= os.path.getmtime(file_name):
+                return baked_name
+        except OSError:
+            pass
+        return None
+
+    # Serialize RGBA8 pixels (height, width, 4) with a full mip chain
+    @staticmethod
+    def bake(pixels: np.ndarray) -> bytes:
+        levels: list = BakedTexture.generate_mips(pixels)
+        offset: int = BakedTexture._align(BakedTexture.HEADER.size +
+                                          BakedTexture.LEVEL_ENTRY.size * len(levels))
+        table: bytes = b""
+        blobs: list = []
+        for level in levels:
+            table += BakedTexture.LEVEL_ENTRY.pack(level.shape[1], level.shape[0],
+                                                   offset, level.nbytes)
+            blobs.append((offset, level.tobytes()))
+            offset = BakedTexture._align(offset + level.nbytes)
+
+        header: bytes = BakedTexture.HEADER.pack(
+            BakedTexture.MAGIC, BakedTexture.VERSION, pixels.shape[1], pixels.shape[0],
+            len(levels), 4)
+        out: bytearray = bytearray(header + table)
+        for blob_offset, blob in blobs:
+            out += bytes(blob_offset - len(out))
+            out += blob
+        return bytes(out)
+
+    # Level 0 and every 2x2 box-filtered level down to 1x1
+    # [sizes follow GL: floor(size / 2), at least 1]
+    @staticmethod
+    def generate_mips(pixels: np.ndarray) -> list:
+        levels: list = [np.ascontiguousarray(pixels, dtype=np.uint8)]
+        level: np.ndarray = levels[0].astype(np.float32)
+        while level.shape[0] > 1 or level.shape[1] > 1:
+            height: int = max(level.shape[0] // 2, 1)
+            width: int = max(level.shape[1] // 2, 1)
+            # Odd edge: the last row/column is folded into its neighbour
+            level = BakedTexture._half(level, 0, height)
+            level = BakedTexture._half(level, 1, width)
+            levels.append(np.clip(np.round(level), 0, 255).astype(np.uint8))
+        return levels
+
+    # Decode an image to RGBA8 (height, width, 4); None if it cannot be read
+    @staticmethod
+    def decode(file_name: str) -> np.ndarray:
+        import sdl2.sdlimage as sdlimage    # Only needed to bake
+        surface: sdl2.SDL_Surface = sdlimage.IMG_Load(file_name.encode())
+        if not surface:
+            sdl2.SDL_Log(b"Failed to load image file: ", file_name.encode())
+            return None
+        rgba: sdl2.SDL_Surface = sdl2.SDL_ConvertSurfaceFormat(
+            surface, sdl2.SDL_PIXELFORMAT_RGBA32, 0)
+        sdl2.SDL_FreeSurface(surface)
+        if not rgba:
+            sdl2.SDL_Log(b"Failed to convert image file: ", file_name.encode())
+            return None
+        width: int = rgba.contents.w
+        height: int = rgba.contents.h
+        pitch: int = rgba.contents.pitch
+        data: bytes = ctypes.string_at(rgba.contents.pixels, pitch * height)
+        sdl2.SDL_FreeSurface(rgba)
+        rows: np.ndarray = np.frombuffer(data, dtype=np.uint8).reshape(height, pitch)
+        return rows[:, 0:width * 4].reshape(height, width, 4).copy()
+
+    # Average pairs along an axis down to size
+    @staticmethod
+    def _half(level: np.ndarray, axis: int, size: int) -> np.ndarray:
+        if level.shape[axis] == size:
+            return level
+        even: int = size * 2
+        pairs: np.ndarray = np.take(level, range(even), axis=axis)
+        shape: list = list(pairs.shape)
+        shape[axis:axis + 1] = [size, 2]
+        result: np.ndarray = pairs.reshape(shape).mean(axis=axis + 1)
+        if level.shape[axis] > even:
+            # Odd size: average the leftover into the last texel
+            last: tuple = tuple(slice(None) if i != axis else slice(size - 1, size)
+                                for i in range(level.ndim))
+            extra: np.ndarray = np.take(level, [even], axis=axis)
+            result[last] = (result[last] * 2.0 + extra) / 3.0
+        return result
+
+    @staticmethod
+    def _align(offset: int) -> int:
+        return (offset + BakedTexture.ALIGNMENT - 1) // BakedTexture.ALIGNMENT * BakedTexture.ALIGNMENT
+
+
+# Offline: python texture_bake.py <image or folder>...
+# [writes <name>.gptex next to each image; Texture.load() then prefers it]
+def main(argv: list) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(
+        description="Decode images and bake their mip chains to .gptex files")
+    parser.add_argument("inputs", nargs="+")
+    parser.add_argument("--force", action="store_true", help="rebake up-to-date files")
+    args = parser.parse_args(argv[1:])
+
+    file_names: list = []
+    for path in args.inputs:
+        if os.path.isdir(path):
+            file_names += sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith((".png", ".jpg", ".bmp", ".tga")))
+        else:
+            file_names.append(path)
+
+    failed: int = 0
+    for file_name in file_names:
+        if not args.force and BakedTexture.find(file_name) is not None:
+            continue
+        pixels: np.ndarray = BakedTexture.decode(file_name)
+        if pixels is None:
+            failed += 1
+            continue
+        baked_name: str = os.path.splitext(file_name)[0] + BakedTexture.EXTENSION
+        with open(baked_name, "wb") as file_obj:
+            file_obj.write(BakedTexture.bake(pixels))
+        print("{} -> {} ({}x{})".format(file_name, baked_name, pixels.shape[1], pixels.shape[0]))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
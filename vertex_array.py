@@ -1,6 +1,9 @@
 from __future__ import annotations
-import OpenGL.GL as GL
+from gl_backend import GL
 import ctypes
+import numpy as np
+from gl_state import state_cache
+from vertex_format import VertexFormat
 
 
 class VertexArray:
@@ -8,10 +11,19 @@ class VertexArray:
     This class encapsulates a mesh (AKA model).
     """
 
-    def __init__(self, vertices: ctypes.Array, num_verts: int, indices: ctypes.Array, num_indices: int) -> None:
+    def __init__(self, vertices: ctypes.Array, num_verts: int, indices: ctypes.Array, num_indices: int,
+                 vertex_format: VertexFormat = None) -> None:
+        # Layout of one vertex (8 floats unless given)
+        self._m_vertex_format: VertexFormat = vertex_format or VertexFormat.get("PosNormTex")
         # Number of vertices & indices in the buffers
         self._m_num_verts: int = num_verts
         self._m_num_indices: int = num_indices
+        # 16-bit indices for NumPy uint16 arrays, otherwise 32-bit
+        self._m_index_type: GL.GLenum = GL.GL_UNSIGNED_INT
+        index_size: int = ctypes.sizeof(ctypes.c_uint)
+        if isinstance(indices, np.ndarray) and indices.dtype == np.uint16:
+            self._m_index_type = GL.GL_UNSIGNED_SHORT
+            index_size = 2
         # OpenGL IDs of the buffers
         self._m_vertex_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
         self._m_index_buffer_id: ctypes.c_uint = ctypes.c_uint(0)
@@ -20,49 +32,49 @@ class VertexArray:
 
         # Create a GL vertex array object (GL returns ID not ref to object!)
         GL.glGenVertexArrays(1, ctypes.byref(self._m_vertex_array_id))
-        GL.glBindVertexArray(self._m_vertex_array_id)
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
 
         # Create vertex buffer, copy vertices to it
         GL.glGenBuffers(1, ctypes.byref(self._m_vertex_buffer_id))
         GL.glBindBuffer(GL.GL_ARRAY_BUFFER, self._m_vertex_buffer_id)
         GL.glBufferData(GL.GL_ARRAY_BUFFER, self._m_num_verts *
-                        8 * ctypes.sizeof(ctypes.c_float), vertices, GL.GL_STATIC_DRAW)
+                        self._m_vertex_format.get_stride(), vertices, GL.GL_STATIC_DRAW)
         # Create index buffer, copy indices to it
         GL.glGenBuffers(1, ctypes.byref(self._m_index_buffer_id))
         GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, self._m_index_buffer_id)
         GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, self._m_num_indices *
-                        ctypes.sizeof(ctypes.c_uint), indices, GL.GL_STATIC_DRAW)
+                        index_size, indices, GL.GL_STATIC_DRAW)
 
         # Identify attributes in the vertex array (pos, normal, texture coord.)
-        # Position attribute
-        GL.glEnableVertexAttribArray(0)
-        GL.glVertexAttribPointer(
-            0, 3, GL.GL_FLOAT, GL.GL_FALSE,
-            ctypes.sizeof(ctypes.c_float) * 8,  # Stride is 5 floats
-            None)
-        # Normal attribute
-        GL.glEnableVertexAttribArray(1)
-        GL.glVertexAttribPointer(
-            1, 3, GL.GL_FLOAT, GL.GL_FALSE,
-            ctypes.sizeof(ctypes.c_float) * 8,
-            ctypes.c_void_p(ctypes.sizeof(ctypes.c_float) * 3))  # Offset is 3 floats from start
-        # Texture coord. attribute
-        GL.glEnableVertexAttribArray(2)
-        GL.glVertexAttribPointer(2, 2, GL.GL_FLOAT, GL.GL_FALSE, ctypes.sizeof(
-            ctypes.c_float) * 8, ctypes.c_void_p(ctypes.sizeof(ctypes.c_float) * 6))
+        self._m_vertex_format.set_attributes()
 
     def delete(self) -> None:
         # Delete in reverse
         GL.glDeleteBuffers(1, ctypes.byref(self._m_vertex_buffer_id))
         GL.glDeleteBuffers(1, ctypes.byref(self._m_index_buffer_id))
+        state_cache.forget_vertex_array(self._m_vertex_array_id)
         GL.glDeleteVertexArrays(1, ctypes.byref(self._m_vertex_array_id))
 
     # Which vertex array object to use
     def set_active(self) -> None:
-        GL.glBindVertexArray(self._m_vertex_array_id)
+        state_cache.bind_vertex_array(self._m_vertex_array_id)
 
     def get_num_indices(self) -> int:
         return self._m_num_indices
 
+    # GL_UNSIGNED_SHORT or GL_UNSIGNED_INT, for glDrawElements
+    def get_index_type(self) -> GL.GLenum:
+        return self._m_index_type
+
+    # Indices start the buffer [a GeometryRange has offsets]
+    def get_index_offset(self) -> int:
+        return 0
+
+    def get_base_vertex(self) -> int:
+        return 0
+
     def get_num_vertices(self) -> int:
         return self._m_num_verts
+
+    def get_vertex_format(self) -> VertexFormat:
+        return self._m_vertex_format
@@ -0,0 +1,177 @@
+from __future__ import annotations
+from gl_backend import GL
+import ctypes
+import itertools
+import numpy as np
+
+
+class VertexFormat:
+    """
+    This class describes how one vertex is laid out in a vertex buffer.
+
+    Every format holds the same logical attributes (position, normal, tex
+    coord at locations 0, 1, 2) as a NumPy structured dtype, so encoded
+    vertices can be uploaded as they are and read back by field name.
+    Compact formats keep float32 positions but pack normals as
+    GL_INT_2_10_10_10_REV and tex coords as half floats or normalized
+    shorts: 20 bytes per vertex instead of 32.
+    """
+
+    # Name -> VertexFormat (filled below)
+    _formats: dict = {}
+    # Normals packed per pass of _pack_normals()
+    PACK_CHUNK = 16384
+    # Code offsets tried per normal, no offset first
+    _CODE_OFFSETS: np.ndarray = np.array(sorted(
+        itertools.product((-1, 0, 1), repeat=3), key=lambda offset: offset != (0, 0, 0)))
+
+    def __init__(self, name: str, fields: list) -> None:
+        # fields: (name, NumPy type, components, GL type, normalized)
+        self._m_name: str = name
+        self._m_dtype: np.dtype = np.dtype([(field, np_type, (components,))
+                                            for field, np_type, components, _, _ in fields])
+        # (location, components, GL type, normalized, byte offset)
+        self._m_attributes: list = []
+        for location, (field, _, components, gl_type, normalized) in enumerate(fields):
+            if gl_type == GL.GL_INT_2_10_10_10_REV:
+                # One packed int holds x, y, z, w
+                components = 4
+            self._m_attributes.append((location, components, gl_type, normalized,
+                                       self._m_dtype.fields[field][1]))
+
+    @staticmethod
+    def get(name: str) -> VertexFormat:
+        return VertexFormat._formats.get(name)
+
+    # GPU format for a mesh file's "vertexformat" [None if unknown]
+    # [compact: float PosNormTex meshes are packed at import]
+    @staticmethod
+    def select(name: str, vertices: np.ndarray, compact: bool = True) -> VertexFormat:
+        if name == "PosNormTex" and compact:
+            return VertexFormat.choose_compact(vertices)
+        return VertexFormat.get(name)
+
+    # Smallest format that keeps tex coords accurate for these vertices
+    # [vertices: float (n, 8) pos, normal, tex coord]
+    @staticmethod
+    def choose_compact(vertices: np.ndarray) -> VertexFormat:
+        if len(vertices) == 0 or np.abs(vertices[:, 6:8]).max() <= 1.0:
+            return VertexFormat._formats["PosNormTexSnorm"]
+        return VertexFormat._formats["PosNormTexHalf"]
+
+    # Float (n, 8) vertices -> structured array of this format
+    def encode(self, vertices: np.ndarray) -> np.ndarray:
+        vertices = np.asarray(vertices, dtype=np.float32)
+        encoded: np.ndarray = np.zeros(len(vertices), dtype=self._m_dtype)
+        encoded["position"] = vertices[:, 0:3]
+        for field, (start, end) in (("normal", (3, 6)), ("texcoord", (6, 8))):
+            values: np.ndarray = vertices[:, start:end]
+            field_type: np.dtype = self._m_dtype.fields[field][0].base
+            if field == "normal" and field_type == np.uint32:
+                encoded[field] = VertexFormat._pack_normals(values)[:, None]
+            elif field_type == np.int16:
+                encoded[field] = np.clip(np.round(values * 32767.0), -32767, 32767)
+            else:
+                encoded[field] = values
+        return encoded
+
+    # Structured array -> float (n, 8) as the vertex shader sees it
+    def decode(self, encoded: np.ndarray) -> np.ndarray:
+        vertices: np.ndarray = np.empty((len(encoded), 8), dtype=np.float32)
+        vertices[:, 0:3] = encoded["position"]
+        normal: np.ndarray = encoded["normal"]
+        if normal.dtype == np.uint32:
+            vertices[:, 3:6] = VertexFormat._unpack_normals(normal[:, 0])
+        else:
+            vertices[:, 3:6] = normal
+        texcoord: np.ndarray = encoded["texcoord"]
+        if texcoord.dtype == np.int16:
+            vertices[:, 6:8] = np.maximum(texcoord / 32767.0, -1.0)
+        else:
+            vertices[:, 6:8] = texcoord
+        return vertices
+
+    # Set attribute pointers of the bound vertex array & buffer
+    def set_attributes(self) -> None:
+        for location, components, gl_type, normalized, offset in self._m_attributes:
+            GL.glEnableVertexAttribArray(location)
+            GL.glVertexAttribPointer(
+                location, components, gl_type,
+                GL.GL_TRUE if normalized else GL.GL_FALSE,
+                self._m_dtype.itemsize, ctypes.c_void_p(offset) if offset else None)
+
+    def get_name(self) -> str:
+        return self._m_name
+
+    def get_dtype(self) -> np.dtype:
+        return self._m_dtype
+
+    # Bytes per vertex
+    def get_stride(self) -> int:
+        return self._m_dtype.itemsize
+
+    # 10-bit signed normalized x, y, z
+    # [GL 3.3 decodes f = (2c + 1) / 1023, GL 4.2+ (and most 3.3 drivers)
+    # f = max(c / 511, -1): of the 27 codes around the 3.3 rounding, each
+    # normal takes the one with the smallest worst-case angle under both]
+    @staticmethod
+    def _pack_normals(normals: np.ndarray) -> np.ndarray:
+        normals = np.asarray(normals, dtype=np.float64)
+        lengths: np.ndarray = np.linalg.norm(normals, axis=1, keepdims=True)
+        units: np.ndarray = normals / np.maximum(lengths, 1e-12)
+        base: np.ndarray = np.round((normals * 1023.0 - 1.0) * 0.5)
+        c: np.ndarray = np.empty(normals.shape, dtype=np.int64)
+        # Chunked: candidates take 27 times the memory of the normals
+        for start in range(0, len(normals), VertexFormat.PACK_CHUNK):
+            end: int = start + VertexFormat.PACK_CHUNK
+            candidates: np.ndarray = np.clip(
+                base[start:end, None, :] + VertexFormat._CODE_OFFSETS, -512, 511)
+            cosine: np.ndarray = np.minimum(
+                VertexFormat._cosine(VertexFormat._snorm10_gl33(candidates), units[start:end]),
+                VertexFormat._cosine(VertexFormat._snorm10_gl42(candidates), units[start:end]))
+            # Ties (zero normals) keep the plain rounding, the first candidate
+            c[start:end] = np.take_along_axis(
+                candidates, cosine.argmax(axis=1)[:, None, None], axis=1)[:, 0]
+        c &= 0x3FF
+        return (c[:, 0] | (c[:, 1] << 10) | (c[:, 2] << 20)).astype(np.uint32)
+
+    # As GL 3.3 decodes them
+    @staticmethod
+    def _unpack_normals(packed: np.ndarray) -> np.ndarray:
+        packed = packed.astype(np.int64)
+        c: np.ndarray = np.stack([(packed >> shift) & 0x3FF for shift in (0, 10, 20)], axis=1)
+        c = np.where(c >= 512, c - 1024, c)
+        return VertexFormat._snorm10_gl33(c)
+
+    @staticmethod
+    def _snorm10_gl33(c: np.ndarray) -> np.ndarray:
+        return (2.0 * c + 1.0) / 1023.0
+
+    @staticmethod
+    def _snorm10_gl42(c: np.ndarray) -> np.ndarray:
+        return np.maximum(c / 511.0, -1.0)
+
+    # Cosine of the angle between candidate normals (n, k, 3) and units (n, 3)
+    @staticmethod
+    def _cosine(candidates: np.ndarray, units: np.ndarray) -> np.ndarray:
+        lengths: np.ndarray = np.linalg.norm(candidates, axis=2)
+        return np.einsum("nkj,nj->nk", candidates, units) / np.maximum(lengths, 1e-12)
+
+
+VertexFormat._formats = {
+    # 32 bytes: the original layout
+    "PosNormTex": VertexFormat("PosNormTex", [
+        ("position", np.float32, 3, GL.GL_FLOAT, False),
+        ("normal", np.float32, 3, GL.GL_FLOAT, False),
+        ("texcoord", np.float32, 2, GL.GL_FLOAT, False)]),
+    # 20 bytes: packed normal, half float tex coords (any range)
+    "PosNormTexHalf": VertexFormat("PosNormTexHalf", [
+        ("position", np.float32, 3, GL.GL_FLOAT, False),
+        ("normal", np.uint32, 1, GL.GL_INT_2_10_10_10_REV, True),
+        ("texcoord", np.float16, 2, GL.GL_HALF_FLOAT, False)]),
+    # 20 bytes: packed normal, normalized short tex coords (in [-1, 1])
+    "PosNormTexSnorm": VertexFormat("PosNormTexSnorm", [
+        ("position", np.float32, 3, GL.GL_FLOAT, False),
+        ("normal", np.uint32, 1, GL.GL_INT_2_10_10_10_REV, True),
+        ("texcoord", np.int16, 2, GL.GL_SHORT, True)]),
+}
@@ -0,0 +1,350 @@
+from __future__ import annotations
+import math
+import os
+import queue
+import random
+import time
+import sdl2
+from concurrent.futures import ThreadPoolExecutor
+from maths import Vector3D, Quaternion
+from actor import Actor
+from mesh_component import MeshComponent
+from point_light_actor import PointLightActor
+from json_parser import json_parser
+
+
+# Create one actor from its chunk manifest entry:
+# {"type": "mesh" | "pointLight", "position": [x, y, z],
+#  "rotation": [x, y, z, w], "scale": s, "mesh": file, "color": [r, g, b], "radius": r}
+def spawn_actor(game: Game, data: dict) -> Actor:
+    kind: str = data.get("type", "mesh")
+    if kind == "pointLight":
+        actor: Actor = PointLightActor(game)
+        actor.set_diffuse_color(Vector3D(*data.get("color", (1.0, 1.0, 1.0))))
+        actor.set_radius(data.get("radius", 200.0))
+    else:
+        actor = Actor(game)
+    actor.set_position(Vector3D(*data.get("position", (0.0, 0.0, 0.0))))
+    actor.set_scale(data.get("scale", 1.0))
+    if "rotation" in data:
+        rotation: Quaternion = Quaternion()
+        rotation.x, rotation.y, rotation.z, rotation.w = data["rotation"]
+        actor.set_rotation(rotation)
+    if kind == "mesh":
+        mesh_comp: MeshComponent = MeshComponent(actor)
+        mesh_comp.set_mesh_handle(game.get_renderer().get_mesh_async(data["mesh"]))
+    # Drawable even if spawned outside Game's update (not added as pending)
+    actor.compute_world_transform()
+    return actor
+
+
+class FileChunkSource:
+    """
+    This class reads world chunks from a world manifest and chunk files.
+
+    World manifest: {"version": 1, "chunkSize": size,
+    "chunks": {"x,y": "chunk file", ...}} with chunk files relative to it.
+    Chunk file: {"version": 1, "assets": [files], "actors": [entries]}.
+    """
+
+    def __init__(self) -> None:
+        self._m_chunk_size: float = 1.0
+        # (x, y) -> chunk file
+        self._m_chunks: dict = {}
+
+    def load(self, manifest_name: str) -> bool:
+        data = json_parser.load(manifest_name)
+        if data is None or data.get("version") != 1:
+            sdl2.SDL_Log(b"World manifest not valid: ", manifest_name.encode())
+            return False
+        folder: str = os.path.dirname(manifest_name)
+        self._m_chunk_size = float(data["chunkSize"])
+        for key, file_name in data["chunks"].items():
+            x, y = (int(v) for v in key.split(","))
+            self._m_chunks[(x, y)] = os.path.join(folder, file_name)
+        return True
+
+    def get_chunk_size(self) -> float:
+        return self._m_chunk_size
+
+    def has_chunk(self, coord: tuple) -> bool:
+        return coord in self._m_chunks
+
+    # Chunk data, or None [worker thread]
+    def read_chunk(self, coord: tuple) -> dict:
+        data = json_parser.load(self._m_chunks[coord])
+        if data is None or data.get("version") != 1:
+            return None
+        return data
+
+
+class SyntheticChunkSource:
+    """
+    This class makes up chunks (random mesh actors), for tests and benchmarks.
+
+    Chunks exist within extent chunks of the origin; each chunk's content
+    depends only on its coordinates.
+    """
+
+    def __init__(self, chunk_size: float = 1000.0, extent: int = 64,
+                 actors_per_chunk: int = 32, meshes: list = ("assets/cube.gpmesh",),
+                 read_delay: float = 0.0) -> None:
+        self._m_chunk_size: float = chunk_size
+        self._m_extent: int = extent
+        self._m_actors_per_chunk: int = actors_per_chunk
+        self._m_meshes: list = list(meshes)
+        # Seconds each read takes (simulated disk)
+        self._m_read_delay: float = read_delay
+
+    def get_chunk_size(self) -> float:
+        return self._m_chunk_size
+
+    def has_chunk(self, coord: tuple) -> bool:
+        return abs(coord[0]) <= self._m_extent and abs(coord[1]) <= self._m_extent
+
+    def read_chunk(self, coord: tuple) -> dict:
+        if self._m_read_delay > 0.0:
+            time.sleep(self._m_read_delay)
+        rng: random.Random = random.Random(hash(coord))
+        size: float = self._m_chunk_size
+        actors: list = [{"type": "mesh", "mesh": rng.choice(self._m_meshes),
+                         "position": [(coord[0] + rng.random()) * size,
+                                      (coord[1] + rng.random()) * size, 0.0],
+                         "scale": rng.uniform(10.0, 50.0)}
+                        for _ in range(self._m_actors_per_chunk)]
+        return {"version": 1, "assets": self._m_meshes, "actors": actors}
+
+
+class WorldChunk:
+    """
+    This class is one chunk of the world and the actors spawned from it.
+    """
+
+    LOADING = 0
+    SPAWNING = 1
+    RESIDENT = 2
+
+    def __init__(self, coord: tuple) -> None:
+        self._m_coord: tuple = coord
+        self._m_state: int = WorldChunk.LOADING
+        self._m_data: dict = None
+        # Index of the next actor entry to spawn
+        self._m_next_actor: int = 0
+        self._m_actors: list = []
+        # Set when it leaves the radius while still loading
+        self._m_cancelled: bool = False
+
+    # Read finished [None: failed, the chunk stays empty]
+    def set_data(self, data: dict) -> None:
+        self._m_data = data
+        self._m_state = WorldChunk.SPAWNING if data else WorldChunk.RESIDENT
+
+    # Spawn the next actor; returns False once all are spawned
+    def spawn_next(self, game: Game, spawn) -> bool:
+        entries: list = self._m_data.get("actors", [])
+        if self._m_next_actor < len(entries):
+            self._m_actors.append(spawn(game, entries[self._m_next_actor]))
+            self._m_next_actor += 1
+        if self._m_next_actor >= len(entries):
+            self._m_state = WorldChunk.RESIDENT
+            return False
+        return True
+
+    def cancel(self) -> None:
+        self._m_cancelled = True
+
+    def is_cancelled(self) -> bool:
+        return self._m_cancelled
+
+    def get_coord(self) -> tuple:
+        return self._m_coord
+
+    def get_state(self) -> int:
+        return self._m_state
+
+    def get_actors(self) -> list:
+        return self._m_actors
+
+    def get_assets(self) -> list:
+        return self._m_data.get("assets", []) if self._m_data else []
+
+
+class WorldStreamer:
+    """
+    This class keeps the chunks around the camera loaded.
+
+    update() runs once per frame on the game thread. Chunk files within
+    load_radius of the camera are read on a worker thread; their actors
+    are then spawned nearest chunk first, and chunks beyond unload_radius
+    have their actors deleted (releasing their meshes and textures to the
+    resource manager). Spawning and deleting share a per-frame budget of
+    actors and milliseconds, with at least one actor per frame.
+    """
+
+    def __init__(self, game: Game, source, load_radius: float, unload_radius: float = None,
+                 max_actors_per_frame: int = 64, budget_ms: float = 2.0,
+                 num_workers: int = 1, spawn=spawn_actor) -> None:
+        self._m_game: Game = game
+        self._m_source = source
+        self._m_load_radius: float = load_radius
+        # Farther than the load radius so chunks at the edge do not thrash
+        self._m_unload_radius: float = unload_radius or load_radius * 1.25
+        self._m_max_actors_per_frame: int = max_actors_per_frame
+        self._m_budget_ms: float = budget_ms
+        self._m_spawn = spawn
+        self._m_pool: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=num_workers, thread_name_prefix="WorldStreamer")
+        # (x, y) -> WorldChunk
+        self._m_chunks: dict = {}
+        # Chunks whose read finished: (chunk, data)
+        self._m_reads: queue.Queue = queue.Queue()
+        # Chunks being torn down: (chunk, actors left)
+        self._m_unloading: list = []
+
+        # Stats of the last update()
+        self._m_num_spawned: int = 0
+        self._m_num_deleted: int = 0
+
+    # Stop workers, delete every streamed actor
+    def shutdown(self) -> None:
+        self._m_pool.shutdown(wait=True, cancel_futures=True)
+        for chunk in self._m_chunks.values():
+            for actor in chunk.get_actors():
+                actor.delete()
+        for actors in self._m_unloading:
+            for actor in actors:
+                actor.delete()
+        self._m_chunks.clear()
+        self._m_unloading.clear()
+
+    def update(self, camera_pos: Vector3D) -> None:
+        start: float = time.perf_counter()
+        self._m_num_spawned = 0
+        self._m_num_deleted = 0
+        wanted: list = self._find_chunks(camera_pos, self._m_load_radius)
+        keep: set = set(self._find_chunks(camera_pos, self._m_unload_radius))
+
+        # Request missing chunks, nearest first
+        for coord in wanted:
+            if coord not in self._m_chunks:
+                chunk: WorldChunk = WorldChunk(coord)
+                self._m_chunks[coord] = chunk
+                self._m_pool.submit(self._read, chunk)
+
+        # Unload far chunks (actors are deleted within the budget below)
+        for coord in [c for c in self._m_chunks if c not in keep]:
+            chunk = self._m_chunks.pop(coord)
+            chunk.cancel()
+            if chunk.get_actors():
+                self._m_unloading.append(list(chunk.get_actors()))
+
+        # Finished reads: start asset loads, queue for spawning
+        while True:
+            try:
+                chunk, data = self._m_reads.get_nowait()
+            except queue.Empty:
+                break
+            if chunk.is_cancelled():
+                continue
+            chunk.set_data(data)
+            if data is None:
+                sdl2.SDL_Log("World chunk {} failed to load".format(
+                    chunk.get_coord()).encode())
+                continue
+            for asset in data.get("assets", []):
+                if asset.endswith((".gpmesh", ".gpmeshb")):
+                    self._m_game.get_renderer().get_mesh_async(asset)
+                else:
+                    self._m_game.get_renderer().get_texture_async(asset)
+
+        # Spend the budget: deletes first (frees memory), then spawns nearest first
+        spawning: list = [self._m_chunks[c] for c in wanted if c in self._m_chunks and
+                          self._m_chunks[c].get_state() == WorldChunk.SPAWNING]
+        while self._has_budget(start):
+            if self._m_unloading:
+                actors: list = self._m_unloading[-1]
+                actors.pop().delete()
+                if not actors:
+                    self._m_unloading.pop()
+                self._m_num_deleted += 1
+            elif spawning:
+                chunk = spawning[0]
+                num_actors: int = len(chunk.get_actors())
+                if not chunk.spawn_next(self._m_game, self._m_spawn):
+                    spawning.pop(0)
+                self._m_num_spawned += len(chunk.get_actors()) - num_actors
+            else:
+                break
+
+    def get_chunk(self, coord: tuple) -> WorldChunk:
+        return self._m_chunks.get(coord)
+
+    # Chunk coordinates containing a point
+    def get_chunk_coord(self, pos: Vector3D) -> tuple:
+        size: float = self._m_source.get_chunk_size()
+        return (math.floor(pos.x / size), math.floor(pos.y / size))
+
+    def get_num_resident(self) -> int:
+        return sum(1 for chunk in self._m_chunks.values()
+                   if chunk.get_state() == WorldChunk.RESIDENT)
+
+    def get_num_loading(self) -> int:
+        return sum(1 for chunk in self._m_chunks.values()
+                   if chunk.get_state() != WorldChunk.RESIDENT)
+
+    def get_num_actors(self) -> int:
+        return sum(len(chunk.get_actors()) for chunk in self._m_chunks.values())
+
+    # Estimated (GPU, CPU) bytes of the assets loaded chunks use
+    def get_memory(self) -> tuple:
+        resources: ResourceManager = self._m_game.get_renderer().get_resource_manager()
+        assets: set = set()
+        for chunk in self._m_chunks.values():
+            assets.update(chunk.get_assets())
+        gpu_bytes: int = 0
+        cpu_bytes: int = 0
+        for asset in assets:
+            gpu, cpu = resources.get_size(asset)
+            gpu_bytes += gpu
+            cpu_bytes += cpu
+        return gpu_bytes, cpu_bytes
+
+    def get_num_spawned(self) -> int:
+        return self._m_num_spawned
+
+    def get_num_deleted(self) -> int:
+        return self._m_num_deleted
+
+    def _has_budget(self, start: float) -> bool:
+        done: int = self._m_num_spawned + self._m_num_deleted
+        if done == 0:
+            return True
+        return (done < self._m_max_actors_per_frame and
+                (time.perf_counter() - start) * 1000.0 < self._m_budget_ms)
+
+    # Existing chunks whose centre is within radius (2D), nearest first
+    def _find_chunks(self, pos: Vector3D, radius: float) -> list:
+        size: float = self._m_source.get_chunk_size()
+        reach: int = int(math.ceil(radius / size))
+        cx, cy = self.get_chunk_coord(pos)
+        found: list = []
+        for x in range(cx - reach, cx + reach + 1):
+            for y in range(cy - reach, cy + reach + 1):
+                dx: float = (x + 0.5) * size - pos.x
+                dy: float = (y + 0.5) * size - pos.y
+                dist_sq: float = dx * dx + dy * dy
+                if dist_sq <= radius * radius and self._m_source.has_chunk((x, y)):
+                    found.append((dist_sq, (x, y)))
+        found.sort()
+        return [coord for _, coord in found]
+
+    # Worker: read chunk data
+    def _read(self, chunk: WorldChunk) -> None:
+        data: dict = None
+        if not chunk.is_cancelled():
+            try:
+                data = self._m_source.read_chunk(chunk.get_coord())
+            except Exception as error:
+                sdl2.SDL_Log("World chunk read failed: {} ({})".format(
+                    chunk.get_coord(), error).encode())
+        self._m_reads.put((chunk, data))